@@ -1,43 +1,51 @@
-import matplotlib.pyplot as plt
-from dateutil.parser import parse
+from datetime import date
+
 import networkx as nx
+import numpy as np
 import pandas as pd
 import seaborn as sns
+from matplotlib.figure import Figure
+from networkx.algorithms import bipartite
+
+from models import Order
+from orderframe import OrderFrame
 
-from models import OrderItem, Product
+# Функции возвращают matplotlib.figure.Figure и не используют pyplot: графики не открывают
+# отдельных окон и строятся одинаково в GUI (FigureCanvasTkAgg) и без дисплея (savefig).
 
+# Граф больше этого числа узлов рисуется по самым связанным узлам, подписи — только у небольших графов
+MAX_DRAW_NODES = 300
+MAX_LABELS = 60
+# Позиций корзин клиентов в одной порции при подсчёте co_purchase_degree
+CO_PURCHASE_CHUNK = 100_000
 
-def sales_over_time(orders):
+
+def sales_over_time(daily_sales):
     """
-    Построение графика продаж по дням на основе списка заказов.
+    Построение графика продаж по дням.
 
     Args:
-        orders: Список - список продаж.
+        daily_sales: Список пар (день 'YYYY-MM-DD', выручка) - результат DB.get_daily_sales,
+            или OrderFrame.
 
     Returns:
-        визуализация графика
+        Figure: график.
     """
-    sales_by_date = {}
-    for order in orders:
-        date = parse(order.created_at).date()
-
-        #date = order.created_at
-        sales_by_date.setdefault(date, 0.0)
-        sales_by_date[date] += order.total()
-
-    dates = sorted(sales_by_date.keys())
-    sales = [sales_by_date[d] for d in dates]
-
-    plt.figure(figsize=(10,5))
-    plt.plot(dates, sales, marker='o')
-    #plt.plot([10,20,30,40,50], [1,2,3,4,5], marker='o')
-    plt.title("Динамика продаж по дням")
-    plt.xlabel("Дата")
-    plt.ylabel("Сумма продаж")
-    plt.grid(True)
-    plt.tight_layout()
-    plt.show()
-
+    if isinstance(daily_sales, OrderFrame):
+        daily_sales = daily_sales.daily_sales()
+    dates = [date.fromisoformat(day) for day, _ in daily_sales]
+    sales = [revenue for _, revenue in daily_sales]
+
+    fig = Figure(figsize=(10, 5))
+    ax = fig.subplots()
+    ax.plot(dates, sales, marker='o')
+    ax.set_title("Динамика продаж по дням")
+    ax.set_xlabel("Дата")
+    ax.set_ylabel("Сумма продаж")
+    ax.grid(True)
+    fig.autofmt_xdate()
+    fig.tight_layout()
+    return fig
 
 
 def top5_products(df):
@@ -45,76 +53,198 @@ def top5_products(df):
     Построение гистограммы 5 самых продаваемых товаров на основе списка заказов.
 
     Args:
-        df (pd.DataFrame): DataFrame.
+        df (pd.DataFrame): DataFrame со столбцами name, order_count или OrderFrame.
 
     Returns:
-        визуализация гистограммы
+        Figure: гистограмма.
     """
-
-    if not df.empty:
-        plt.figure(figsize=(10, 6))
-        sns.barplot(x='name', y='order_count', data=df)
-        plt.title('Топ5 клиентов по количеству заказов')
-        plt.xlabel('Клиент')
-        plt.ylabel('Количество заказов')
-        plt.xticks(rotation=45, ha='right')
-        plt.tight_layout()
-        plt.show()
-    else:
-        print("Нет данных для визуализации.")
-
-
-def graph_relationship(orders):
+    if isinstance(df, OrderFrame):
+        df = df.top_clients(5)
+    if df.empty:
+        return _empty_figure()
+
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    sns.barplot(x='name', y='order_count', data=df, ax=ax)
+    ax.set_title('Топ5 клиентов по количеству заказов')
+    ax.set_xlabel('Клиент')
+    ax.set_ylabel('Количество заказов')
+    ax.tick_params(axis='x', labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment('right')
+    fig.tight_layout()
+    return fig
+
+
+def _empty_figure():
+    fig = Figure(figsize=(8, 6))
+    fig.text(0.5, 0.5, "Нет данных для визуализации.", ha="center", va="center")
+    return fig
+
+
+def relationship_graph(edges):
     """
-    Построение графа на основе списка заказов.
-    Узлы графа - клиенты и продукты.
-    Ребра соединяют клиентов с продуктами, которые они заказывали.
+    Двудольный граф «клиент — товар».
+
+    Узлы — пары ("client", id) и ("product", id) с атрибутами label (имя) и bipartite (0 — клиенты,
+    1 — товары); вес ребра — суммарное количество товара в заказах клиента.
 
     Args:
-        orders: Список - список продаж.
+        edges: кортежи (client_id, имя клиента, product_id, название товара, количество) —
+            результат DB.get_client_product_edges, либо OrderFrame, либо список Order.
 
     Returns:
-        визуализация графа.
+        nx.Graph: граф.
     """
+    if isinstance(edges, OrderFrame):
+        frame = edges
+        edges = frame.edges()
+        edges = edges[edges["client_id"].isin(frame.clients.index)]
+        edges = zip(edges["client_id"].tolist(), frame.clients.reindex(edges["client_id"]).tolist(),
+                    edges["product_id"].tolist(), frame.products.reindex(edges["product_id"]).tolist(),
+                    edges["quantity"].tolist())
+    elif isinstance(edges, list) and edges and isinstance(edges[0], Order):
+        # список заказов сначала сворачивается в рёбра, чтобы не добавлять их в граф по одному
+        totals = {}
+        for order in edges:
+            if order.client is None:
+                continue
+            for item in order.items:
+                key = (order.client.id, order.client.name, item.product.id, item.product.name)
+                totals[key] = totals.get(key, 0) + item.quantity
+        edges = [key + (quantity,) for key, quantity in totals.items()]
+
+    clients = {}
+    products = {}
+    weighted = []
+    for client_id, client_name, product_id, product_name, quantity in edges:
+        clients[("client", client_id)] = client_name
+        products[("product", product_id)] = product_name
+        weighted.append((("client", client_id), ("product", product_id), quantity))
 
-    # выделяем всех клиентов из orders
-    clients = set()
-    products = set()
     graph = nx.Graph()
+    graph.add_nodes_from((node, {"label": name, "bipartite": 0}) for node, name in clients.items())
+    graph.add_nodes_from((node, {"label": name, "bipartite": 1}) for node, name in products.items())
+    graph.add_weighted_edges_from(weighted)
+    return graph
+
+
+def co_purchase_graph(graph):
+    """
+    Проекция на товары: товары связаны, если их покупал один и тот же клиент;
+    вес ребра — число таких клиентов.
+    """
+    products = [node for node, part in graph.nodes(data="bipartite") if part == 1]
+    return bipartite.weighted_projected_graph(graph, products)
 
-    for order in orders:
-        client = order.client
-        clients.add(client.name)
-        graph.add_node(client.name, type="client")
 
-        for product in order.items:
-            pr =product.get_product_name()
-            products.add(pr)
-            graph.add_node(pr, type="product")
-            graph.add_edge(client.name, pr)
+def co_purchase_degree(graph):
+    """
+    Степень товаров в проекции co_purchase_graph — со сколькими товарами их покупают вместе.
 
-    pos = {}
-    y_offset = 0  # Смещение по вертикали для первого узла
-    y_spacing = 1.0 # Вертикальное расстояние между узлами
-    num_customers = len(clients)
-    num_products = len(products)
+    Считается без построения проекции: связи клиентов и товаров хранятся массивами смежности
+    (память растёт с числом рёбер), и для каждого товара объединяются корзины его клиентов
+    в одном массиве отметок на весь каталог, переиспользуемом для всех товаров. Клиенты перебираются от больших корзин к малым
+    порциями до CO_PURCHASE_CHUNK позиций; перебор останавливается, как только отмечен
+    весь каталог.
 
-    # помещаем продукты слева и центрируем по вертикали
-    for i, product in enumerate(products):
-        pos[product] = (-1, (num_products-1) * y_spacing / 2 - i*y_spacing - y_offset)
+    Returns:
+        pd.Series: степень по названию товара, по убыванию.
+    """
+    clients = [node for node, part in graph.nodes(data="bipartite") if part == 0]
+    products = [node for node, part in graph.nodes(data="bipartite") if part == 1]
+    index = {node: i for i, node in enumerate(products)}
+    n = len(products)
+    # корзины клиентов подряд в одном массиве: клиент k — basket[starts[k]:starts[k] + sizes[k]]
+    sizes = np.fromiter((len(graph[client]) for client in clients), dtype=np.int64, count=len(clients))
+    basket = np.fromiter((index[node] for client in clients for node in graph[client]), dtype=np.int64,
+                         count=int(sizes.sum()))
+    starts = np.cumsum(sizes) - sizes
+    # клиенты каждого товара, от больших корзин к малым
+    by_size = np.argsort(-sizes, kind="stable")
+    owner = np.repeat(np.arange(len(clients)), sizes)
+    order = np.lexsort((np.argsort(by_size)[owner], basket))
+    buyers = owner[order]
+    bounds = np.searchsorted(basket[order], np.arange(n + 1))
+
+    marked = np.zeros(n, dtype=bool)
+    degree = np.zeros(n, dtype=np.int64)
+    for product in range(n):
+        marked.fill(False)
+        count = 0
+        product_buyers = buyers[bounds[product]:bounds[product + 1]]
+        taken = np.cumsum(sizes[product_buyers])
+        position = 0
+        while position < len(product_buyers) and count < n:
+            # порция клиентов: их корзины в сумме не больше CO_PURCHASE_CHUNK позиций (хотя бы один клиент)
+            done = taken[position - 1] if position else 0
+            end = max(position + 1, int(np.searchsorted(taken, done + CO_PURCHASE_CHUNK, side="right")))
+            batch = product_buyers[position:end]
+            position = end
+            batch_sizes = sizes[batch]
+            lines = np.repeat(starts[batch] - (np.cumsum(batch_sizes) - batch_sizes), batch_sizes)
+            marked[basket[lines + np.arange(len(lines))]] = True
+            count = np.count_nonzero(marked)
+        degree[product] = max(count - 1, 0)  # сам товар тоже в корзинах своих клиентов
+    result = pd.Series(degree, index=[graph.nodes[node]["label"] for node in products])
+    return result.sort_values(ascending=False, kind="stable")
+
+
+def _largest_nodes(graph, limit):
+    """Подграф из limit узлов с наибольшей взвешенной степенью."""
+    degree = sorted(graph.degree(weight="weight"), key=lambda pair: pair[1], reverse=True)
+    return graph.subgraph(node for node, _ in degree[:limit]).copy()
+
+
+def graph_relationship(orders, max_nodes=MAX_DRAW_NODES, max_labels=MAX_LABELS):
+    """
+    Построение графа связей клиентов и товаров.
+    Товары располагаются слева, клиенты - справа; толщина ребра зависит от количества.
 
-    # клиенты - справа и центрируем
-    for i, customer in enumerate(clients):
-        pos[customer] = (1, (num_customers-1) * y_spacing / 2 - i*y_spacing - y_offset)
+    Большие графы не рисуются целиком: остаются max_nodes узлов с наибольшей взвешенной
+    степенью, подписи выводятся только если узлов не больше max_labels.
 
-    plt.figure(figsize=(8, 6))
+    Args:
+        orders: nx.Graph из relationship_graph или всё, что он принимает
+            (рёбра из DB.get_client_product_edges, OrderFrame, список Order).
+        max_nodes (int): максимум отображаемых узлов.
+        max_labels (int): максимум узлов, при котором выводятся подписи.
+
+    Returns:
+        Figure: граф.
+    """
+    graph = orders if isinstance(orders, nx.Graph) else relationship_graph(orders)
+    if graph.number_of_nodes() == 0:
+        return _empty_figure()
+    title = f"Связи клиентов и товаров: {graph.number_of_nodes()} узлов, {graph.number_of_edges()} связей"
+    if graph.number_of_nodes() > max_nodes:
+        graph = _largest_nodes(graph, max_nodes)
+        title += f" (показаны {max_nodes} крупнейших)"
+
+    pos = {}
+    y_spacing = 1.0  # Вертикальное расстояние между узлами
+    for x, part in ((-1, 1), (1, 0)):
+        # товары (part 1) - слева, клиенты - справа, центрируем по вертикали
+        nodes = [node for node, p in graph.nodes(data="bipartite") if p == part]
+        for i, node in enumerate(nodes):
+            pos[node] = (x, (len(nodes) - 1) * y_spacing / 2 - i * y_spacing)
+
+    weights = [w for _, _, w in graph.edges(data="weight", default=1)]
+    max_weight = max(weights, default=1) or 1
+    small = graph.number_of_nodes() <= max_labels
+
+    fig = Figure(figsize=(8, 6))
+    ax = fig.subplots()
     nx.draw(
         graph,
         pos,
-        with_labels=True,
-        node_size=1500,
+        ax=ax,
+        with_labels=small,
+        labels=dict(graph.nodes(data="label")) if small else None,
+        node_size=1500 if small else max(5, 30000 // graph.number_of_nodes()),
         font_size=10,
-        width=0.5,
+        width=[0.2 + 2.8 * w / max_weight for w in weights],
         edgecolors="gray",
     )
-    plt.show()
\ No newline at end of file
+    ax.set_title(title)
+    return fig
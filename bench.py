@@ -0,0 +1,502 @@
+"""
+Бенчмарки производительности работы с базой данных.
+
+Запуск:
+    python bench.py                      # загрузка заказов: 10k, 100k, 1M
+    python bench.py orders 10000 50000   # свои размеры
+    python bench.py search 1000000       # поиск по подстроке среди клиентов
+    python bench.py memory 1000000       # память заказов: модели на __slots__ против классов с __dict__
+    python bench.py frame 1000000        # OrderFrame против графа объектов get_orders
+    python bench.py startup              # импорт gui и время до первого окна (нужен дисплей)
+    python bench.py suite 1000 10000     # набор замеров запросов, импорта, экспорта и аналитики
+
+Результаты набора в JSON и сравнение с прошлым запуском — через командную строку:
+    python cli.py bench suite 10000 100000 --json new.json --baseline old.json
+"""
+import itertools
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from datagen import generate
+from db import DB
+from models import Client, Product, Order, OrderItem, from_timestamp
+
+def get_orders_legacy(db):
+    """Исходная реализация DB.get_orders: отдельный запрос позиций на каждый заказ."""
+    cur = db.conn.cursor()
+    order_rows = cur.execute("""SELECT o.id, o.client_id, o.created_at, c.name as client_name
+                                FROM orders o
+                                LEFT JOIN clients c ON o.client_id = c.id""").fetchall()
+    client_ids = list(set(row["client_id"] for row in order_rows if row["client_id"] is not None))
+    clients = {}
+    if client_ids:
+        q = "SELECT * FROM clients WHERE id IN ({})".format(",".join("?" * len(client_ids)))
+        for r in cur.execute(q, client_ids):
+            clients[r["id"]] = Client(id=r["id"], name=r["name"], email=r["email"], phone=r["phone"],
+                                      created_at=r["created_at"])
+    products = {row["id"]: Product(id=row["id"], name=row["name"], price=row["price"],
+                                   created_at=row["created_at"])
+                for row in cur.execute("SELECT * FROM products").fetchall()}
+    orders = []
+    for order_row in order_rows:
+        items = []
+        for irow in cur.execute("SELECT * FROM order_items WHERE order_id=?", (order_row["id"],)).fetchall():
+            p = products.get(irow["product_id"])
+            if p:
+                items.append(OrderItem(p, irow["quantity"]))
+        orders.append(Order(id=order_row["id"], client=clients.get(order_row["client_id"]), items=items,
+                            created_at=order_row["created_at"]))
+    return orders
+
+
+class DictClient:
+    """Клиент в виде прежней модели: атрибуты в __dict__ экземпляра — эталон для bench_memory."""
+
+    def __init__(self, id=None, name="", email="", phone="", created_at=None):
+        self._id = id
+        self._created_at = from_timestamp(created_at)
+        self.name = name
+        self.email = email
+        self.phone = phone
+
+
+class DictProduct:
+    def __init__(self, id=None, name="", price=0.0, created_at=None):
+        self._id = id
+        self._created_at = from_timestamp(created_at)
+        self.name = name
+        self.price = price
+
+
+class DictOrderItem:
+    def __init__(self, product, quantity=1):
+        self.product = product
+        self.quantity = quantity
+
+
+class DictOrder:
+    def __init__(self, id=None, client=None, items=None, created_at=None):
+        self._id = id
+        self._created_at = from_timestamp(created_at)
+        self.client = client
+        self.items = items or []  # список DictOrderItem
+
+    def total(self):
+        return sum(item.product.price * item.quantity for item in self.items)
+
+
+def get_orders_dict(db):
+    """Те же заказы, что у DB.get_orders (тем же числом запросов), из классов с __dict__."""
+    cur = db.conn.cursor()
+    clients = {row["id"]: DictClient(row["id"], row["name"], row["email"], row["phone"], row["created_at"])
+               for row in cur.execute("SELECT * FROM clients")}
+    products = {row["id"]: DictProduct(row["id"], row["name"], row["price"], row["created_at"])
+                for row in cur.execute("SELECT * FROM products")}
+    orders = {row["id"]: DictOrder(row["id"], clients.get(row["client_id"]), created_at=row["created_at"])
+              for row in cur.execute("SELECT id, client_id, created_at FROM orders ORDER BY id")}
+    for row in cur.execute("SELECT order_id, product_id, quantity FROM order_items"):
+        order, product = orders.get(row["order_id"]), products.get(row["product_id"])
+        if order and product:
+            order.items.append(DictOrderItem(product, row["quantity"]))
+    return list(orders.values())
+
+
+def timed(func, *args, **kwargs):
+    """Время выполнения func в секундах и её результат."""
+    t0 = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - t0, result
+
+
+def bench_get_orders(sizes):
+    """Сравнение исходной и пакетной загрузки заказов на нескольких объёмах."""
+    print(f"{'orders':>10} {'legacy, s':>12} {'get_orders, s':>14} {'speedup':>8}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DB(os.path.join(tmp, "bench.db"))
+            generate(db, n)
+            elapsed, orders = timed(db.get_orders)
+            assert len(orders) == n
+            del orders
+            legacy, orders = timed(get_orders_legacy, db)
+            assert len(orders) == n
+            del orders
+            print(f"{n:>10} {legacy:>12.3f} {elapsed:>14.3f} {legacy / elapsed:>8.2f}")
+            db.close()
+
+
+def bench_search(sizes):
+    """
+    Поиск клиентов по подстроке: LIKE '%...%' против FTS5 trigram. Кроме редких подстрок —
+    частые слова, которые есть почти у всех клиентов (в том числе в паре с редким).
+    """
+    queries = ["4242", "client9999", "00012345", "client", "example", "Клиент", "client 4242"]
+    print(f"{'clients':>10} {'query':>12} {'LIKE, ms':>10} {'FTS, ms':>10}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DB(os.path.join(tmp, "bench.db"))
+            generate(db, 0, n_clients=n)
+            for text in queries:
+                like, _ = timed(lambda: db.conn.execute(  # прежний способ фильтрации
+                    "SELECT * FROM clients WHERE name LIKE ? OR email LIKE ? OR phone LIKE ? LIMIT 50",
+                    [f"%{text}%"] * 3).fetchall())
+                db.search_clients(text)  # прогрев кэша страниц
+                fts, _ = timed(db.search_clients, text)
+                print(f"{n:>10} {text:>12} {like * 1000:>10.2f} {fts * 1000:>10.2f}")
+            db.close()
+
+
+def measure_orders(load, n):
+    """Память графа заказов load() в байтах и время трёх проходов total() по нему."""
+    tracemalloc.start()
+    orders = load()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(orders) == n
+    elapsed, _ = timed(lambda: [o.total() for o in orders for _ in range(3)])
+    return size, elapsed
+
+
+def bench_memory(sizes):
+    """
+    Память графа объектов заказов в байтах на заказ: классы с __dict__ (как прежние модели)
+    против моделей на __slots__ из get_orders; total() — три прохода по всем заказам.
+    """
+    print(f"{'':>10} {'__dict__':>33} {'__slots__':>33}")
+    print(f"{'orders':>10}" + f" {'MB':>8} {'bytes/order':>12} {'total(), s':>11}" * 2)
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DB(os.path.join(tmp, "bench.db"))
+            generate(db, n)
+            line = f"{n:>10}"
+            for load in (lambda: get_orders_dict(db), db.get_orders):
+                size, elapsed = measure_orders(load, n)
+                line += f" {size / 2 ** 20:>8.1f} {size / n:>12.0f} {elapsed:>11.3f}"
+            print(line)
+            db.close()
+
+
+def bench_frame(sizes):
+    """Загрузка и агрегирование: колоночный OrderFrame против списка Order из get_orders."""
+    print(f"{'orders':>10} {'lines':>10} {'get_orders, s':>14} {'MB':>8} {'frame, s':>9} {'MB':>8} {'aggregate, s':>13}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DB(os.path.join(tmp, "bench.db"))
+            generate(db, n)
+            tracemalloc.start()
+            orders_time, orders = timed(db.get_orders)
+            orders_size = tracemalloc.get_traced_memory()[0]
+            del orders
+            tracemalloc.stop()
+            tracemalloc.start()
+            frame_time, frame = timed(db.get_order_frame)
+            frame_size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            aggregate, _ = timed(lambda: (frame.order_totals(), frame.daily_sales(),
+                                          frame.top_clients(), frame.product_sales(), frame.edges()))
+            print(f"{n:>10} {len(frame):>10} {orders_time:>14.3f} {orders_size / 2 ** 20:>8.1f} "
+                  f"{frame_time:>9.3f} {frame_size / 2 ** 20:>8.1f} {aggregate:>13.3f}")
+            db.close()
+
+
+# Модули аналитики, которые не должны загружаться при запуске приложения
+HEAVY_MODULES = ("pandas", "numpy", "matplotlib", "seaborn", "networkx", "dateutil")
+
+STARTUP_SCRIPT = """
+import time
+t0 = time.perf_counter()
+from gui import App
+t1 = time.perf_counter()
+app = App()
+app.update()
+print(t1 - t0, time.perf_counter() - t0)
+app.destroy()
+"""
+
+
+def import_profile(module="gui"):
+    """
+    Импорт module в отдельном процессе с python -X importtime.
+
+    Returns:
+        tuple: (суммарное время импорта module в секундах, множество загруженных модулей)
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=here, capture_output=True, text=True, check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                modules[name.strip()] = int(cumulative)
+    return modules[module] / 1e6, set(modules)
+
+
+def startup_time(db_path):
+    """
+    Запуск приложения в отдельном процессе: (импорт gui, время до отрисованного окна) в секундах.
+    База создаётся в каталоге db_path; нужен дисплей.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [here, os.environ.get("PYTHONPATH")])))
+    result = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], cwd=db_path, env=env,
+                            capture_output=True, text=True, check=True)
+    import_s, window_s = map(float, result.stdout.split())
+    return import_s, window_s
+
+
+def bench_startup(sizes):
+    """Холодный запуск: импорт gui и время до первого окна (на пустой базе)."""
+    import_s, modules = import_profile("gui")
+    heavy = sorted(name for name in modules if name.split(".")[0] in HEAVY_MODULES)
+    print(f"import gui: {import_s:.3f} s, тяжёлые модули: {', '.join(heavy) or 'нет'}")
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            _, window_s = startup_time(tmp)
+        except subprocess.CalledProcessError as e:
+            print("окно не создано (нет дисплея?):", e.stderr.strip().splitlines()[-1])
+            return
+        print(f"первое окно: {window_s:.3f} s")
+
+
+# --- Набор замеров: запросы, запись, импорт, экспорт и аналитика на нескольких объёмах ---
+SUITE_SCALES = [1_000, 10_000, 100_000]
+SUITE_REPEAT = 3
+SUITE_FORMAT = 1
+# Замедление относительно базового запуска, считающееся регрессией: больше чем на долю
+# REGRESSION_THRESHOLD и больше чем на REGRESSION_MIN_DELTA секунд (шум коротких замеров)
+REGRESSION_THRESHOLD = 0.25
+REGRESSION_MIN_DELTA = 0.002
+# Заказов за один замер add_order
+ADD_ORDERS = 100
+
+
+def suite_data(db, scale):
+    """Данные набора: scale заказов по 1–5 позиций, клиентов в 10 раз меньше, товаров в 100, спрос по Ципфу."""
+    generate(db, scale, n_clients=max(scale // 10, 10), n_products=max(scale // 100, 50), items_per_order=(1, 5),
+             skew=1.0)
+
+
+# Замер: функция (db, каталог для файлов) -> функция без аргументов, время которой измеряется,
+# или пара (run, reset): reset() вызывается после каждого повтора вне замера и возвращает
+# исходное состояние. Подготовка выполняется один раз до замеров; замеры не меняют db.
+def case_add_order(db, workdir):
+    """Добавление заказов в копию базы набора; после каждого повтора копия заполняется заново."""
+    rnd = random.Random(0)
+    n_clients, n_products = (db.conn.execute(f"SELECT max(id) FROM {table}").fetchone()[0]
+                             for table in ("clients", "products"))
+    clients = [db.get_client(rnd.randint(1, n_clients)) for _ in range(ADD_ORDERS)]
+    lines = [[(db.get_product(rnd.randint(1, n_products)), rnd.randint(1, 5)) for _ in range(3)]
+             for _ in range(ADD_ORDERS)]
+
+    target = DB(os.path.join(workdir, "add_order.db"), template=db)
+
+    def run():
+        for client, items in zip(clients, lines):
+            target.add_order(Order(client=client, items=[OrderItem(product, quantity) for product, quantity in items]))
+    return run, lambda: target.load_template(db)
+
+
+def case_export(entity, fmt):
+    def case(db, workdir):
+        path = os.path.join(workdir, f"export_{entity}.{fmt}")
+        return lambda: db.export(entity, path)
+    return case
+
+
+def case_import(entity):
+    """Импорт выгрузки entity в новую базу; для заказов — в копию базы с клиентами и товарами."""
+    def case(db, workdir):
+        path = os.path.join(workdir, f"import_{entity}.jsonl")
+        db.export(entity, path)
+        template = None
+        if entity == "orders":
+            template = os.path.join(workdir, "import_template.db")
+            target = DB(template)
+            for dependency in ("clients", "products"):
+                dependency_path = os.path.join(workdir, f"import_{dependency}.jsonl")
+                db.export(dependency, dependency_path)
+                target.bulk_import(dependency, dependency_path)
+            target.close()
+        runs = itertools.count()
+
+        def run():
+            target = DB(os.path.join(workdir, f"import_{entity}_{next(runs)}.db"), template=template)
+            result = target.bulk_import(entity, path)
+            target.close()
+            assert not result.rejected, result
+        return run
+    return case
+
+
+def case_analysis(func_name, source):
+    """Функция analysis.func_name от source(db) — данных, подготовленных заранее."""
+    def case(db, workdir):
+        import analysis
+        func = getattr(analysis, func_name)
+        data = source(db)
+        return lambda: func(data)
+    return case
+
+
+def _graph(db, **limits):
+    import analysis
+    return analysis.relationship_graph(db.get_client_product_edges(**limits))
+
+
+def _chart_graph(db):
+    import charts
+    return _graph(db, top_clients=charts.GRAPH_TOP_CLIENTS, top_products=charts.GRAPH_TOP_PRODUCTS)
+
+
+SUITE = {
+    "add_order": case_add_order,
+    "get_orders": lambda db, workdir: db.get_orders,
+    "get_orders_client": lambda db, workdir: lambda: db.get_orders({"client_name": "Клиент 42"}),
+    "get_orders_page": lambda db, workdir: db.get_orders_page,
+    "get_orders_page_dates": lambda db, workdir: lambda: db.get_orders_page(
+        filters={"date_from": "2025-03-01", "date_to": "2025-03-31"}),
+    "get_clients_name": lambda db, workdir: lambda: db.get_clients({"name": "Клиент 42"}),
+    "get_clients_phone": lambda db, workdir: lambda: db.get_clients({"phone": "42"}),
+    "get_clients_page_email": lambda db, workdir: lambda: db.get_clients_page(sort="name",
+                                                                              filters={"email": "client4"}),
+    "search_clients": lambda db, workdir: lambda: db.search_clients("client42"),
+    "suggest_clients": lambda db, workdir: lambda: db.suggest_clients("Кл"),
+    "export_clients_csv": case_export("clients", "csv"),
+    "export_orders_jsonl": case_export("orders", "jsonl"),
+    "export_orders_json": case_export("orders", "json"),
+    "import_clients": case_import("clients"),
+    "import_orders": case_import("orders"),
+    "get_daily_sales": lambda db, workdir: db.get_daily_sales,
+    "get_top5_products": lambda db, workdir: db.get_top5_products,
+    "get_client_product_edges": lambda db, workdir: db.get_client_product_edges,
+    "get_order_frame": lambda db, workdir: db.get_order_frame,
+    "sales_over_time": case_analysis("sales_over_time", lambda db: db.get_daily_sales()),
+    "top5_products": case_analysis("top5_products", lambda db: db.get_top5_products()),
+    "relationship_graph": case_analysis("relationship_graph", lambda db: db.get_client_product_edges()),
+    "co_purchase_degree": case_analysis("co_purchase_degree", _graph),
+    "co_purchase_graph": case_analysis("co_purchase_graph", _chart_graph),
+    "graph_relationship": case_analysis("graph_relationship", _chart_graph),
+}
+
+
+def run_suite(scales, repeat=SUITE_REPEAT, cases=None, progress=None):
+    """
+    Выполнение набора замеров SUITE: на каждом объёме база заполняется suite_data,
+    каждый замер повторяется repeat раз (с reset замера между повторами, если он есть).
+
+    Args:
+        scales (list): объёмы (число заказов).
+        repeat (int): повторов каждого замера.
+        cases (list): названия замеров из SUITE; по умолчанию все.
+        progress (callable): вызывается с каждой готовой записью результата.
+
+    Returns:
+        dict: результаты в формате, пригодном для json и compare_results.
+    """
+    results = []
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DB(os.path.join(tmp, "suite.db"))
+            suite_data(db, scale)
+            db.refresh_analytics()
+            for name in cases or SUITE:
+                run = SUITE[name](db, tmp)
+                run, reset = run if isinstance(run, tuple) else (run, None)
+                times = []
+                for _ in range(repeat):
+                    times.append(timed(run)[0])
+                    if reset:
+                        reset()
+                record = {"case": name, "scale": scale, "min": min(times), "median": statistics.median(times),
+                          "runs": times}
+                results.append(record)
+                if progress:
+                    progress(record)
+            db.close()
+    return {
+        "format": SUITE_FORMAT,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare_results(baseline, current, threshold=REGRESSION_THRESHOLD, min_delta=REGRESSION_MIN_DELTA):
+    """
+    Сравнение двух результатов run_suite по лучшему времени (min) общих замеров.
+
+    Returns:
+        list: словари case, scale, before, after, ratio, regression — в порядке current.
+    """
+    before = {(r["case"], r["scale"]): r["min"] for r in baseline["results"]}
+    changes = []
+    for record in current["results"]:
+        key = (record["case"], record["scale"])
+        if key not in before:
+            continue
+        old, new = before[key], record["min"]
+        ratio = new / old if old else float("inf")
+        changes.append({"case": key[0], "scale": key[1], "before": old, "after": new, "ratio": ratio,
+                        "regression": ratio > 1 + threshold and new - old > min_delta})
+    return changes
+
+
+def _print_record(record):
+    print(f"{record['case']:<26} {record['scale']:>9} {record['median'] * 1000:>12.2f} {record['min'] * 1000:>10.2f}",
+          flush=True)
+
+
+def bench_suite(sizes, repeat=SUITE_REPEAT, cases=None, output=None, baseline=None, threshold=REGRESSION_THRESHOLD):
+    """
+    Набор замеров с таблицей на экране; результаты сохраняются в JSON (output)
+    и сравниваются с прошлым запуском (baseline — путь к его JSON).
+
+    Returns:
+        list: регрессии относительно baseline (пустой без baseline).
+    """
+    print(f"{'case':<26} {'scale':>9} {'median, ms':>12} {'min, ms':>10}")
+    report = run_suite(sizes, repeat=repeat, cases=cases, progress=_print_record)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+    if not baseline:
+        return []
+    with open(baseline, encoding="utf-8") as f:
+        changes = compare_results(json.load(f), report, threshold=threshold)
+    print(f"\n{'case':<26} {'scale':>9} {'before, ms':>12} {'after, ms':>10} {'change':>8}")
+    for change in changes:
+        mark = "  РЕГРЕССИЯ" if change["regression"] else ""
+        print(f"{change['case']:<26} {change['scale']:>9} {change['before'] * 1000:>12.2f} "
+              f"{change['after'] * 1000:>10.2f} {change['ratio'] - 1:>+8.0%}{mark}")
+    return [change for change in changes if change["regression"]]
+
+
+BENCHMARKS = {
+    "orders": (bench_get_orders, [10_000, 100_000, 1_000_000]),
+    "search": (bench_search, [100_000, 1_000_000]),
+    "memory": (bench_memory, [100_000, 1_000_000]),
+    "frame": (bench_frame, [100_000, 1_000_000]),
+    "startup": (bench_startup, []),
+    "suite": (bench_suite, SUITE_SCALES),
+}
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    name = args.pop(0) if args and args[0] in BENCHMARKS else "orders"
+    func, default_sizes = BENCHMARKS[name]
+    func([int(arg) for arg in args] or default_sizes)
@@ -0,0 +1,64 @@
+import threading
+from collections import OrderedDict
+
+
+class EntityCache:
+    """
+    Карта идентичности с вытеснением давно не использованных записей (LRU).
+
+    Ключ — (класс сущности, id), поэтому повторные чтения одной строки возвращают
+    один и тот же объект Client/Product. Безопасен для использования из нескольких потоков.
+
+    Args:
+        max_size (int): максимальное количество объектов в кэше.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, cls, id):
+        """Объект из кэша или None; учитывается в счётчиках попаданий/промахов."""
+        key = (cls, id)
+        with self._lock:
+            entity = self._items.get(key)
+            if entity is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entity
+
+    def peek(self, cls, id):
+        """Объект из кэша без учёта в счётчиках попаданий/промахов."""
+        return self._items.get((cls, id))
+
+    def put(self, entity):
+        """Добавление (или замена) объекта; при переполнении вытесняется самый старый."""
+        key = (type(entity), entity.id)
+        with self._lock:
+            self._items[key] = entity
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+        return entity
+
+    def invalidate(self, cls=None, id=None):
+        """Удаление одного объекта, всех объектов класса или (без аргументов) всего кэша."""
+        with self._lock:
+            if cls is None:
+                self._items.clear()
+            elif id is None:
+                for key in [key for key in self._items if key[0] is cls]:
+                    del self._items[key]
+            else:
+                self._items.pop((cls, id), None)
+
+    def stats(self):
+        return {"size": len(self._items), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+    def __len__(self):
+        return len(self._items)
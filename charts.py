@@ -0,0 +1,165 @@
+"""
+Графики вкладки «Анализ»: построение по данным базы, кэширование и сохранение в файлы.
+
+Запуск без интерфейса (например, по расписанию) — все отчёты строятся параллельно
+в отдельных процессах (run_reports):
+    python charts.py reports/                  # PNG всех графиков из shop.db
+    python charts.py reports/ svg png my.db    # свои форматы и база
+"""
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Размер графа связей: лидеры по заказам и продажам — на полном графе отдельные узлы не различить
+GRAPH_TOP_CLIENTS = 50
+GRAPH_TOP_PRODUCTS = 30
+
+
+# analysis (matplotlib, seaborn, pandas, networkx) импортируется только при построении графика:
+# сам модуль charts лёгкий, и интерфейс может импортировать его при запуске.
+def sales_chart(db):
+    import analysis
+    return analysis.sales_over_time(db.get_daily_sales())
+
+
+def top_clients_chart(db):
+    import analysis
+    return analysis.top5_products(db.get_top5_products())
+
+
+def graph_chart(db):
+    import analysis
+    edges = db.get_client_product_edges(top_clients=GRAPH_TOP_CLIENTS, top_products=GRAPH_TOP_PRODUCTS)
+    return analysis.graph_relationship(edges)
+
+
+# Название графика -> (заголовок, функция построения Figure по базе)
+CHARTS = {
+    "sales": ("Динамика продаж по дням", sales_chart),
+    "top_clients": ("Топ клиентов", top_clients_chart),
+    "graph": ("Граф связей клиентов", graph_chart),
+}
+
+
+class ChartCache:
+    """
+    Построенные графики с версией данных, по которой они строились (DB.data_version).
+
+    Повторный запрос графика при неизменных данных возвращает тот же объект Figure
+    без обращения к аналитике; после добавления или удаления строк график строится заново.
+
+    Args:
+        db (DB): база данных.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._figures = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        """Figure графика name из CHARTS."""
+        version = self.db.data_version()
+        with self._lock:
+            cached = self._figures.get(name)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+        figure = CHARTS[name][1](self.db)
+        with self._lock:
+            self._figures[name] = (version, figure)
+        return figure
+
+    def invalidate(self, name=None):
+        """Сброс одного графика или (без аргументов) всех."""
+        with self._lock:
+            if name is None:
+                self._figures.clear()
+            else:
+                self._figures.pop(name, None)
+
+
+def save_charts(db, directory, formats=("png",), names=None, cache=None):
+    """
+    Сохранение графиков в файлы <directory>/<название>.<формат>.
+
+    Args:
+        db (DB): база данных.
+        directory (str): каталог (создаётся при необходимости).
+        formats (tuple): форматы matplotlib: 'png', 'svg', 'pdf'.
+        names (list): графики из CHARTS; по умолчанию все.
+        cache (ChartCache): кэш графиков, если он уже есть.
+
+    Returns:
+        list: пути сохранённых файлов.
+    """
+    cache = cache or ChartCache(db)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for name in names or CHARTS:
+        paths += _save(cache.get(name), directory, name, formats)
+    return paths
+
+
+def _save(figure, directory, name, formats):
+    paths = []
+    for fmt in formats:
+        path = os.path.join(directory, f"{name}.{fmt}")
+        figure.savefig(path, format=fmt)
+        paths.append(path)
+    return paths
+
+
+def _render_report(db_path, directory, name, formats):
+    """Построение и сохранение одного отчёта в процессе пула; база открывается только для чтения."""
+    from db import DB
+    db = DB(db_path, readonly=True)
+    try:
+        return _save(CHARTS[name][1](db), directory, name, formats)
+    finally:
+        db.close()
+
+
+def run_reports(db_path, directory, formats=("png",), names=None, workers=None):
+    """
+    Параллельное построение отчётов: каждый график — в отдельном процессе со своим
+    соединением только для чтения (WAL позволяет читать, пока приложение пишет).
+
+    Args:
+        db_path (str): путь к файлу базы.
+        directory (str): каталог для файлов (создаётся при необходимости).
+        formats (tuple): форматы matplotlib: 'png', 'svg', 'pdf'.
+        names (list): графики из CHARTS; по умолчанию все.
+        workers (int): число процессов; по умолчанию — по процессу на отчёт, не больше числа ядер.
+
+    Returns:
+        dict: пути сохранённых файлов по названию графика.
+    """
+    from db import DB
+
+    names = list(names or CHARTS)
+    os.makedirs(directory, exist_ok=True)
+    # Накопительные агрегаты обновляются один раз здесь: процессам отчётов запись недоступна
+    db = DB(db_path)
+    try:
+        db.refresh_analytics()
+    finally:
+        db.close()
+
+    workers = workers or min(len(names), os.cpu_count() or 1)
+    # spawn вместо fork: безопасно и при вызове из многопоточного приложения
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = {name: pool.submit(_render_report, db_path, directory, name, tuple(formats)) for name in names}
+        return {name: future.result() for name, future in futures.items()}
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args:
+        sys.exit(__doc__)
+    directory = args.pop(0)
+    db_path = args.pop() if args and args[-1].endswith(".db") else "shop.db"
+    for paths in run_reports(db_path, directory, args or ("png",)).values():
+        print(*paths, sep="\n")
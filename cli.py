@@ -0,0 +1,165 @@
+"""
+Командная строка: импорт, экспорт, отчёты и бенчмарки без графического интерфейса.
+
+Модуль не импортирует tkinter, поэтому работает на сервере без дисплея.
+
+Запуск:
+    python cli.py import clients clients.csv --chunk-size 20000
+    python cli.py import orders orders.jsonl --atomic --db my.db
+    python cli.py export orders orders.jsonl.gz --batch-size 10000
+    python cli.py report reports/ --format png svg --chart sales graph --workers 2
+    python cli.py bench frame 100000
+    python cli.py generate 100000 --clients 10000 --items 1 5 --skew 1.0 --db big.db
+    python cli.py bench suite 1000 10000 --json new.json --baseline old.json
+
+Также: python main.py <команда> ... (без аргументов main.py запускает интерфейс).
+Код возврата: 0 — успех, 1 — ошибка, отклонённые при импорте записи или регрессии бенчмарков.
+"""
+import argparse
+import sqlite3
+import sys
+import time
+
+import bench
+import charts
+import datagen
+import exporter
+import importer
+from datetime import date
+
+from db import DB
+
+DEFAULT_DB = "shop.db"
+# Сколько отклонённых записей печатать при импорте
+MAX_REJECTED_SHOWN = 20
+
+
+def cmd_import(db, args):
+    def progress(result):
+        print(f"\r{result.entity}: {result.imported} ...", end="", file=sys.stderr, flush=True)
+
+    t0 = time.perf_counter()
+    result = db.bulk_import(args.entity, args.file, fmt=args.format, chunk_size=args.chunk_size,
+                            progress=None if args.quiet else progress, atomic=args.atomic)
+    elapsed = time.perf_counter() - t0
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"{result} за {elapsed:.2f} с ({result.imported / max(elapsed, 1e-9):.0f} записей/с)")
+    for number, reason in result.rejected[:MAX_REJECTED_SHOWN]:
+        print(f"  запись {number}: {reason}")
+    if len(result.rejected) > MAX_REJECTED_SHOWN:
+        print(f"  ... и ещё {len(result.rejected) - MAX_REJECTED_SHOWN}")
+    return 1 if result.rejected else 0
+
+
+def cmd_export(db, args):
+    t0 = time.perf_counter()
+    count = db.export(args.entity, args.file, fmt=args.format, compress=args.compress or None,
+                      batch_size=args.batch_size)
+    elapsed = time.perf_counter() - t0
+    print(f"{args.entity}: выгружено {count} в {args.file} за {elapsed:.2f} с")
+    return 0
+
+
+def cmd_report(args):
+    t0 = time.perf_counter()
+    reports = charts.run_reports(args.db, args.directory, formats=args.format, names=args.chart,
+                                 workers=args.workers)
+    for paths in reports.values():
+        print(*paths, sep="\n")
+    print(f"отчётов: {len(reports)} за {time.perf_counter() - t0:.2f} с", file=sys.stderr)
+    return 0
+
+
+def cmd_generate(db, args):
+    t0 = time.perf_counter()
+    counts = datagen.generate(db, args.orders, n_clients=args.clients, n_products=args.products,
+                              items_per_order=tuple(args.items), start=args.start, days=args.days,
+                              skew=args.skew, seed=args.seed)
+    print(", ".join(f"{table}: {count}" for table, count in counts.items()),
+          f"за {time.perf_counter() - t0:.2f} с")
+    return 0
+
+
+def cmd_bench(args):
+    func, default_sizes = bench.BENCHMARKS[args.name]
+    sizes = args.sizes or default_sizes
+    if args.name == "suite":
+        regressions = func(sizes, repeat=args.repeat, cases=args.case, output=args.json, baseline=args.baseline,
+                           threshold=args.threshold)
+        return 1 if regressions else 0
+    func(sizes)
+    return 0
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--db", default=DEFAULT_DB, help=f"файл базы (по умолчанию {DEFAULT_DB})")
+
+    parser = argparse.ArgumentParser(prog="cli.py", description="Учёт заказов без графического интерфейса.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("import", parents=[common], help="пакетный импорт из CSV/JSON/JSON Lines")
+    p.add_argument("entity", choices=importer.ENTITIES)
+    p.add_argument("file")
+    p.add_argument("--format", choices=("csv", "json", "jsonl"), help="по умолчанию — по расширению")
+    p.add_argument("--chunk-size", type=int, default=importer.DEFAULT_CHUNK_SIZE, help="записей в транзакции")
+    p.add_argument("--atomic", action="store_true", help="весь файл в одной транзакции")
+    p.add_argument("--quiet", action="store_true", help="без вывода прогресса")
+
+    p = commands.add_parser("export", parents=[common], help="потоковый экспорт в CSV/JSON/JSON Lines")
+    p.add_argument("entity", choices=exporter.ENTITIES)
+    p.add_argument("file", help="расширение .gz включает сжатие")
+    p.add_argument("--format", choices=("csv", "json", "jsonl"), help="по умолчанию — по расширению")
+    p.add_argument("--compress", action="store_true", help="gzip независимо от расширения")
+    p.add_argument("--batch-size", type=int, default=exporter.DEFAULT_BATCH_SIZE, help="строк в порции")
+
+    p = commands.add_parser("report", parents=[common], help="графики аналитики в файлы")
+    p.add_argument("directory")
+    p.add_argument("--format", nargs="+", default=["png"], choices=("png", "svg", "pdf"))
+    p.add_argument("--chart", nargs="+", choices=list(charts.CHARTS), help="по умолчанию все")
+    p.add_argument("--workers", type=int, help="число процессов")
+
+    p = commands.add_parser("generate", parents=[common], help="синтетические данные (см. datagen.py)")
+    p.add_argument("orders", type=int, help="количество заказов")
+    p.add_argument("--clients", type=int, default=1000)
+    p.add_argument("--products", type=int, default=200)
+    p.add_argument("--items", type=int, nargs=2, default=[3, 3], metavar=("MIN", "MAX"), help="позиций в заказе")
+    p.add_argument("--start", type=date.fromisoformat, default=datagen.DEFAULT_START, help="первый день, YYYY-MM-DD")
+    p.add_argument("--days", type=int, default=datagen.DEFAULT_DAYS, help="период заказов в днях")
+    p.add_argument("--skew", type=float, default=0.0, help="показатель Ципфа для спроса, 0 — равномерно")
+    p.add_argument("--seed", type=int, default=42)
+
+    p = commands.add_parser("bench", help="бенчмарки (см. bench.py)")
+    p.add_argument("name", choices=list(bench.BENCHMARKS))
+    p.add_argument("sizes", nargs="*", type=int)
+    suite = p.add_argument_group("набор замеров suite")
+    suite.add_argument("--case", nargs="+", choices=list(bench.SUITE), help="по умолчанию все")
+    suite.add_argument("--repeat", type=int, default=bench.SUITE_REPEAT, help="повторов каждого замера")
+    suite.add_argument("--json", help="файл для результатов")
+    suite.add_argument("--baseline", help="результаты прошлого запуска для сравнения")
+    suite.add_argument("--threshold", type=float, default=bench.REGRESSION_THRESHOLD,
+                       help="допустимое замедление, доля (0.25 — на 25%%)")
+    return parser
+
+
+def main(argv=None):
+    """Разбор аргументов и выполнение команды; возвращает код возврата."""
+    args = build_parser().parse_args(argv)
+    try:
+        if args.command == "report":
+            return cmd_report(args)
+        if args.command == "bench":
+            return cmd_bench(args)
+        db = DB(args.db)
+        try:
+            return {"import": cmd_import, "export": cmd_export, "generate": cmd_generate}[args.command](db, args)
+        finally:
+            db.close()
+    except (ValueError, OSError, sqlite3.Error) as e:
+        print(f"ошибка: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+Управление соединениями SQLite для многопоточной работы.
+
+База открывается в режиме WAL: читатели не блокируют писателя и друг друга. Каждый поток
+получает собственное соединение для чтения, а все записи идут через одно общее соединение
+под блокировкой, поэтому конкурирующих писателей (и ошибок «database is locked») не бывает.
+"""
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
+
+# Настройки соединений: WAL-журнал допускает синхронизацию NORMAL без риска повредить базу
+PRAGMAS = {
+    "synchronous": "NORMAL",
+    "cache_size": -64000,        # ~64 МБ страничного кэша на соединение
+    "mmap_size": 268435456,      # 256 МБ файла отображаются в память
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,        # мс ожидания блокировки (например, во время checkpoint)
+}
+
+
+class ConnectionManager:
+    """
+    Соединения с одной базой: по одному читателю на поток и один общий писатель.
+
+    Для базы в памяти (":memory:") отдельные соединения видели бы разные базы, поэтому
+    и чтение, и запись идут через соединение писателя под той же блокировкой.
+
+    В режиме readonly писателя нет: файл открывается с mode=ro (он должен существовать),
+    а write() выбрасывает sqlite3.OperationalError. Так базу читают процессы отчётов.
+
+    Args:
+        db_path (str): путь к файлу базы или ":memory:".
+        pragmas (dict): настройки PRAGMA поверх PRAGMAS.
+        readonly (bool): только чтение.
+    """
+
+    def __init__(self, db_path, pragmas=None, readonly=False):
+        self.db_path = db_path
+        self.memory = db_path == ":memory:"
+        self.readonly = readonly
+        if readonly and self.memory:
+            raise ValueError("база в памяти не может быть открыта только для чтения")
+        self.pragmas = dict(PRAGMAS, **(pragmas or {}))
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        self.writer = None
+        if not readonly:
+            self.writer = self._connect()
+            if not self.memory:
+                self.writer.execute("PRAGMA journal_mode=WAL")
+
+    def _connect(self, query_only=False):
+        if self.readonly:
+            conn = sqlite3.connect(f"file:{quote(self.db_path)}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        if query_only:
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    def reader(self):
+        """Соединение для чтения, принадлежащее текущему потоку."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect(query_only=True)
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    @contextmanager
+    def read(self):
+        """Соединение для чтения; для базы в памяти — писатель под блокировкой."""
+        if self.memory:
+            with self._lock:
+                yield self.writer
+        else:
+            yield self.reader()
+
+    @contextmanager
+    def write(self):
+        """
+        Эксклюзивный доступ к писателю. По выходу из блока транзакция фиксируется,
+        при исключении — откатывается.
+        """
+        if self.readonly:
+            raise sqlite3.OperationalError("база открыта только для чтения")
+        with self._lock:
+            try:
+                yield self.writer
+                self.writer.commit()
+            except BaseException:
+                self.writer.rollback()
+                raise
+
+    def close(self):
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+        self._local = threading.local()
+        with self._lock:
+            if self.writer is not None:
+                self.writer.close()
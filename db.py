@@ -1,14 +1,311 @@
 import sqlite3
-from models import Client, Product, Order, OrderItem
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import quote
+from models import Client, Product, Order, OrderItem, to_timestamp, from_timestamp
+from connection import ConnectionManager
+from cache import EntityCache
+from importer import BulkImporter, DEFAULT_CHUNK_SIZE, iter_records
+import exporter
+from exporter import DEFAULT_BATCH_SIZE
+
+# День заказа o в виде 'YYYY-MM-DD': created_at хранится в секундах эпохи (миграция 6)
+ORDER_DAY = "date(o.created_at, 'unixepoch')"
+
+
+def _summary_rebuild(order_day):
+    """Команды пересчёта сводных таблиц; order_day — SQL-выражение дня заказа o."""
+    return [
+        "DELETE FROM daily_sales",
+        "DELETE FROM product_sales",
+        "DELETE FROM client_order_counts",
+        f"""INSERT INTO daily_sales (day, order_count, quantity, revenue)
+           SELECT d.day, d.order_count, COALESCE(i.quantity, 0), COALESCE(i.revenue, 0)
+           FROM (SELECT {order_day} AS day, COUNT(*) AS order_count FROM orders o GROUP BY day) d
+           LEFT JOIN (SELECT {order_day} AS day, SUM(oi.quantity) AS quantity,
+                             SUM(oi.quantity * p.price) AS revenue
+                      FROM orders o
+                      CROSS JOIN order_items oi ON oi.order_id = o.id
+                      CROSS JOIN products p ON p.id = oi.product_id
+                      GROUP BY day) i ON i.day = d.day""",
+        """INSERT INTO product_sales (product_id, quantity, revenue)
+           SELECT oi.product_id, SUM(oi.quantity), SUM(oi.quantity * p.price)
+           FROM order_items oi JOIN products p ON p.id = oi.product_id
+           GROUP BY oi.product_id""",
+        """INSERT INTO client_order_counts (client_id, order_count)
+           SELECT c.id, COUNT(o.id) FROM clients c LEFT JOIN orders o ON o.client_id = c.id GROUP BY c.id""",
+    ]
+
+
+# Пересчёт сводных таблиц аналитики из order_items (DB.rebuild_summaries и миграции).
+# Выручка считается по текущим ценам; триггеры далее учитывают цену на момент продажи.
+SUMMARY_REBUILD = _summary_rebuild(ORDER_DAY)
+
+# Версионированные миграции схемы: (версия, описание, список SQL-команд).
+# Применяются по порядку при открытии базы; номер применённой версии хранится в schema_version.
+# Новые изменения схемы добавляются только в конец списка, уже выпущенные миграции не меняются.
+MIGRATIONS = [
+    (1, "индексы для выборки заказов и аналитики", [
+        "CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items(order_id, product_id, quantity)",
+        "CREATE INDEX IF NOT EXISTS idx_order_items_product ON order_items(product_id, quantity)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_client_created ON orders(client_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_created ON orders(created_at)",
+        "ANALYZE",
+    ]),
+    (2, "индексы для постраничной выборки клиентов и товаров", [
+        "CREATE INDEX IF NOT EXISTS idx_clients_name ON clients(name)",
+        "CREATE INDEX IF NOT EXISTS idx_products_name ON products(name)",
+    ]),
+    (3, "полнотекстовый поиск (FTS5, trigram) по клиентам и товарам", [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS clients_fts USING fts5(name, email, phone, "
+        "content='clients', content_rowid='id', tokenize='trigram')",
+        """CREATE TRIGGER IF NOT EXISTS clients_fts_ai AFTER INSERT ON clients BEGIN
+               INSERT INTO clients_fts(rowid, name, email, phone) VALUES (new.id, new.name, new.email, new.phone);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS clients_fts_ad AFTER DELETE ON clients BEGIN
+               INSERT INTO clients_fts(clients_fts, rowid, name, email, phone) VALUES ('delete', old.id, old.name, old.email, old.phone);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS clients_fts_au AFTER UPDATE ON clients BEGIN
+               INSERT INTO clients_fts(clients_fts, rowid, name, email, phone) VALUES ('delete', old.id, old.name, old.email, old.phone);
+               INSERT INTO clients_fts(rowid, name, email, phone) VALUES (new.id, new.name, new.email, new.phone);
+           END""",
+        "INSERT INTO clients_fts(clients_fts) VALUES ('rebuild')",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(name, "
+        "content='products', content_rowid='id', tokenize='trigram')",
+        """CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+               INSERT INTO products_fts(rowid, name) VALUES (new.id, new.name);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+               INSERT INTO products_fts(products_fts, rowid, name) VALUES ('delete', old.id, old.name);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE ON products BEGIN
+               INSERT INTO products_fts(products_fts, rowid, name) VALUES ('delete', old.id, old.name);
+               INSERT INTO products_fts(rowid, name) VALUES (new.id, new.name);
+           END""",
+        "INSERT INTO products_fts(products_fts) VALUES ('rebuild')",
+    ]),
+    (4, "индекс заказов по дню для агрегатов продаж", [
+        "CREATE INDEX IF NOT EXISTS idx_orders_day ON orders(date(created_at))",
+    ]),
+    (5, "сводные таблицы продаж, обновляемые триггерами", [
+        """CREATE TABLE IF NOT EXISTS daily_sales (
+            day TEXT PRIMARY KEY,
+            order_count INTEGER NOT NULL DEFAULT 0,
+            quantity INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0
+        )""",
+        """CREATE TABLE IF NOT EXISTS product_sales (
+            product_id INTEGER PRIMARY KEY,
+            quantity INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0
+        )""",
+        """CREATE TABLE IF NOT EXISTS client_order_counts (
+            client_id INTEGER PRIMARY KEY,
+            order_count INTEGER NOT NULL DEFAULT 0
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_product_sales_quantity ON product_sales(quantity)",
+        "CREATE INDEX IF NOT EXISTS idx_client_order_counts_count ON client_order_counts(order_count)",
+        """CREATE TRIGGER IF NOT EXISTS summary_clients_ai AFTER INSERT ON clients BEGIN
+               INSERT OR IGNORE INTO client_order_counts (client_id, order_count) VALUES (new.id, 0);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS summary_clients_ad AFTER DELETE ON clients BEGIN
+               DELETE FROM client_order_counts WHERE client_id = old.id;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS summary_orders_ai AFTER INSERT ON orders BEGIN
+               INSERT INTO daily_sales (day, order_count) VALUES (date(new.created_at), 1)
+                   ON CONFLICT(day) DO UPDATE SET order_count = order_count + 1;
+               UPDATE client_order_counts SET order_count = order_count + 1 WHERE client_id = new.client_id;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS summary_orders_ad AFTER DELETE ON orders BEGIN
+               UPDATE daily_sales SET order_count = order_count - 1 WHERE day = date(old.created_at);
+               UPDATE client_order_counts SET order_count = order_count - 1 WHERE client_id = old.client_id;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS summary_order_items_ai AFTER INSERT ON order_items BEGIN
+               INSERT INTO daily_sales (day, quantity, revenue)
+                   SELECT date(o.created_at), new.quantity, new.quantity * p.price
+                   FROM orders o, products p WHERE o.id = new.order_id AND p.id = new.product_id
+                   ON CONFLICT(day) DO UPDATE SET quantity = quantity + excluded.quantity,
+                                                  revenue = revenue + excluded.revenue;
+               INSERT INTO product_sales (product_id, quantity, revenue)
+                   SELECT p.id, new.quantity, new.quantity * p.price FROM products p WHERE p.id = new.product_id
+                   ON CONFLICT(product_id) DO UPDATE SET quantity = quantity + excluded.quantity,
+                                                         revenue = revenue + excluded.revenue;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS summary_order_items_ad AFTER DELETE ON order_items BEGIN
+               UPDATE daily_sales
+                   SET quantity = quantity - old.quantity,
+                       revenue = revenue - old.quantity * (SELECT price FROM products WHERE id = old.product_id)
+                   WHERE day = (SELECT date(created_at) FROM orders WHERE id = old.order_id);
+               UPDATE product_sales
+                   SET quantity = quantity - old.quantity,
+                       revenue = revenue - old.quantity * (SELECT price FROM products WHERE id = old.product_id)
+                   WHERE product_id = old.product_id;
+           END""",
+    ] + _summary_rebuild("date(o.created_at)")),
+    (6, "created_at в целых секундах эпохи вместо ISO-строк", [
+        # Триггеры полнотекстового поиска срабатывают только на изменение индексируемых
+        # колонок — иначе перевод дат переписал бы весь FTS-индекс
+        "DROP TRIGGER IF EXISTS clients_fts_au",
+        """CREATE TRIGGER clients_fts_au AFTER UPDATE OF name, email, phone ON clients BEGIN
+               INSERT INTO clients_fts(clients_fts, rowid, name, email, phone) VALUES ('delete', old.id, old.name, old.email, old.phone);
+               INSERT INTO clients_fts(rowid, name, email, phone) VALUES (new.id, new.name, new.email, new.phone);
+           END""",
+        "DROP TRIGGER IF EXISTS products_fts_au",
+        """CREATE TRIGGER products_fts_au AFTER UPDATE OF name ON products BEGIN
+               INSERT INTO products_fts(products_fts, rowid, name) VALUES ('delete', old.id, old.name);
+               INSERT INTO products_fts(rowid, name) VALUES (new.id, new.name);
+           END""",
+        "DROP INDEX IF EXISTS idx_orders_day",
+        "UPDATE clients SET created_at = CAST(strftime('%s', created_at) AS INTEGER) WHERE typeof(created_at) = 'text'",
+        "UPDATE products SET created_at = CAST(strftime('%s', created_at) AS INTEGER) WHERE typeof(created_at) = 'text'",
+        "UPDATE orders SET created_at = CAST(strftime('%s', created_at) AS INTEGER) WHERE typeof(created_at) = 'text'",
+        "CREATE INDEX idx_orders_day ON orders(date(created_at, 'unixepoch'))",
+        "DROP TRIGGER IF EXISTS summary_orders_ai",
+        """CREATE TRIGGER summary_orders_ai AFTER INSERT ON orders BEGIN
+               INSERT INTO daily_sales (day, order_count) VALUES (date(new.created_at, 'unixepoch'), 1)
+                   ON CONFLICT(day) DO UPDATE SET order_count = order_count + 1;
+               UPDATE client_order_counts SET order_count = order_count + 1 WHERE client_id = new.client_id;
+           END""",
+        "DROP TRIGGER IF EXISTS summary_orders_ad",
+        """CREATE TRIGGER summary_orders_ad AFTER DELETE ON orders BEGIN
+               UPDATE daily_sales SET order_count = order_count - 1 WHERE day = date(old.created_at, 'unixepoch');
+               UPDATE client_order_counts SET order_count = order_count - 1 WHERE client_id = old.client_id;
+           END""",
+        "DROP TRIGGER IF EXISTS summary_order_items_ai",
+        """CREATE TRIGGER summary_order_items_ai AFTER INSERT ON order_items BEGIN
+               INSERT INTO daily_sales (day, quantity, revenue)
+                   SELECT date(o.created_at, 'unixepoch'), new.quantity, new.quantity * p.price
+                   FROM orders o, products p WHERE o.id = new.order_id AND p.id = new.product_id
+                   ON CONFLICT(day) DO UPDATE SET quantity = quantity + excluded.quantity,
+                                                  revenue = revenue + excluded.revenue;
+               INSERT INTO product_sales (product_id, quantity, revenue)
+                   SELECT p.id, new.quantity, new.quantity * p.price FROM products p WHERE p.id = new.product_id
+                   ON CONFLICT(product_id) DO UPDATE SET quantity = quantity + excluded.quantity,
+                                                         revenue = revenue + excluded.revenue;
+           END""",
+        "DROP TRIGGER IF EXISTS summary_order_items_ad",
+        """CREATE TRIGGER summary_order_items_ad AFTER DELETE ON order_items BEGIN
+               UPDATE daily_sales
+                   SET quantity = quantity - old.quantity,
+                       revenue = revenue - old.quantity * (SELECT price FROM products WHERE id = old.product_id)
+                   WHERE day = (SELECT date(created_at, 'unixepoch') FROM orders WHERE id = old.order_id);
+               UPDATE product_sales
+                   SET quantity = quantity - old.quantity,
+                       revenue = revenue - old.quantity * (SELECT price FROM products WHERE id = old.product_id)
+                   WHERE product_id = old.product_id;
+           END""",
+            ] + SUMMARY_REBUILD),
+    (7, "накопительные агрегаты аналитики с отметкой последнего учтённого заказа", [
+        """CREATE TABLE IF NOT EXISTS client_product_sales (
+            client_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (client_id, product_id)
+        ) WITHOUT ROWID""",
+        """CREATE TABLE IF NOT EXISTS analytics_state (
+            name TEXT PRIMARY KEY,
+            last_order_id INTEGER NOT NULL DEFAULT 0
+        )""",
+        "INSERT OR IGNORE INTO analytics_state (name, last_order_id) VALUES ('client_product_sales', 0)",
+        # Заказы только добавляются с растущими id; удаление или изменение уже учтённого
+        # заказа сбрасывает отметку, и следующий refresh_analytics пересчитывает агрегат целиком
+        """CREATE TRIGGER IF NOT EXISTS analytics_orders_ad AFTER DELETE ON orders BEGIN
+               UPDATE analytics_state SET last_order_id = 0 WHERE last_order_id >= old.id;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS analytics_orders_au AFTER UPDATE OF id, client_id ON orders BEGIN
+               UPDATE analytics_state SET last_order_id = 0 WHERE last_order_id >= min(old.id, new.id);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS analytics_order_items_ad AFTER DELETE ON order_items BEGIN
+               UPDATE analytics_state SET last_order_id = 0 WHERE last_order_id >= old.order_id;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS analytics_order_items_au AFTER UPDATE ON order_items BEGIN
+               UPDATE analytics_state SET last_order_id = 0
+               WHERE last_order_id >= min(old.order_id, new.order_id);
+           END""",
+    ]),
+    (8, "индексы ключей постраничной сортировки без NULL", [
+        # Колонки допускают NULL, а такие строки не проходят условие (sort, id) > (?, ?):
+        # страницы строятся по ifnull(...), и индексы повторяют это выражение
+        "CREATE INDEX IF NOT EXISTS idx_clients_name_key ON clients(ifnull(name, ''))",
+        "CREATE INDEX IF NOT EXISTS idx_products_name_key ON products(ifnull(name, ''))",
+        "CREATE INDEX IF NOT EXISTS idx_orders_created_key ON orders(ifnull(created_at, 0))",
+    ]),
+]
+
+# Колонки, по которым строится полнотекстовый индекс <таблица>_fts
+FTS_COLUMNS = {
+    "clients": ("name", "email", "phone"),
+    "products": ("name",),
+}
+# Trigram-индекс находит подстроки не короче трёх символов
+FTS_MIN_LENGTH = 3
+SEARCH_LIMIT = 50
+# Ранжирование bm25 (rank) для веса каждого слова перебирает все его совпадения — для частого
+# слова всю таблицу. Если у какого-то слова запроса совпадений больше, поиск не ранжируется.
+SEARCH_RANK_LIMIT = 1000
+
+# Таблицы, индексы и триггеры которых DB.bulk_load снимает на время загрузки
+BULK_TABLES = ("clients", "products", "orders", "order_items")
+
+# Как часто (в инструкциях виртуальной машины SQLite) DB.interruptible проверяет отмену
+PROGRESS_STEPS = 10000
+
+# Сколько объектов Client/Product держит карта идентичности DB.cache
+CACHE_SIZE = 10000
+
+# Размер страницы по умолчанию и колонки, по которым разрешена постраничная сортировка
+PAGE_SIZE = 100
+PAGE_SORT_COLUMNS = {
+    "clients": ("id", "name", "email", "created_at"),
+    "products": ("id", "name", "price", "created_at"),
+}
+# Значение вместо NULL в ключе сортировки страниц (см. миграцию 8)
+PAGE_SORT_NULLS = {"name": "''", "email": "''", "price": "0", "created_at": "0"}
+# Ключ сортировки заказов на страницах: новые сверху, заказы без даты — в конце
+ORDER_PAGE_KEY = "ifnull(o.created_at, 0)"
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
 
 class DB:
-    def __init__(self, db_path="shop.db"):
-        self.conn = sqlite3.connect(db_path)
-        self.conn.row_factory = sqlite3.Row
-        self.create_tables()
+    """
+    Доступ к базе магазина. Безопасен для использования из нескольких потоков:
+    чтение идёт через соединение текущего потока, запись — через общее соединение
+    писателя под блокировкой (см. connection.ConnectionManager).
+
+    База ":memory:" живёт, пока открыт объект DB. Параметр template заполняет новую базу
+    копией готовой (например, один раз засеянной синтетическими данными в тестах) — это
+    постраничное копирование без SQL, быстрее повторного заполнения.
+    """
+
+    def __init__(self, db_path="shop.db", pragmas=None, cache_size=CACHE_SIZE, readonly=False, template=None):
+        self.manager = ConnectionManager(db_path, pragmas, readonly=readonly)
+        self.cache = EntityCache(cache_size)
+        if template is not None:
+            self.load_template(template)
+        if readonly:
+            # схему меняет только процесс с правом записи
+            if self.schema_version() != SCHEMA_VERSION:
+                self.close()
+                raise sqlite3.OperationalError(f"схема базы {db_path} не обновлена до версии {SCHEMA_VERSION}")
+        else:
+            self.create_tables()
+            self.migrate()
+
+    @property
+    def readonly(self):
+        return self.manager.readonly
+
+    @property
+    def conn(self):
+        """Соединение писателя (для операций, которым нужно «сырое» соединение); в режиме readonly — читателя."""
+        return self.manager.reader() if self.readonly else self.manager.writer
 
     def create_tables(self):
-        cur = self.conn.cursor()
+        with self.manager.write() as conn:
+            self._create_tables(conn.cursor())
+
+    def _create_tables(self, cur):
 
         cur.execute('''CREATE TABLE IF NOT EXISTS clients (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -41,173 +338,853 @@ class DB:
             FOREIGN KEY(product_id) REFERENCES products(id)
         )''')
 
-        self.conn.commit()
+        cur.execute('''CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at DATETIME
+        )''')
+
+    def load_template(self, template):
+        """
+        Замена всего содержимого базы копией шаблона (sqlite3 backup API).
+
+        Args:
+            template (DB | str): открытая база или путь к файлу базы.
+        """
+        if isinstance(template, DB):
+            with template.manager.read() as source, self.manager.write() as target:
+                source.backup(target)
+        else:
+            source = sqlite3.connect(f"file:{quote(template)}?mode=ro", uri=True)
+            try:
+                with self.manager.write() as target:
+                    source.backup(target)
+            finally:
+                source.close()
+        self.cache.invalidate()
+
+    @contextmanager
+    def bulk_load(self):
+        """
+        Массовая загрузка строк напрямую через соединение писателя.
+
+        Вставка по одной строке с триггерами (FTS, сводные таблицы) и вторичными индексами
+        стоит десятки микросекунд; здесь на время блока они удаляются, а по выходу
+        пересоздаются одним проходом: полнотекстовые индексы — командой 'rebuild',
+        индексы — сортировкой, сводные таблицы — SUMMARY_REBUILD. Всё выполняется в одной
+        транзакции: при исключении база остаётся прежней. Пересчёт идёт по всей таблице,
+        поэтому блок выгоден для загрузок, сравнимых по объёму с уже имеющимися данными.
+
+        Yields:
+            sqlite3.Connection: соединение писателя в открытой транзакции.
+        """
+        with self.manager.write() as conn:
+            cur = conn.cursor()
+            cur.execute("BEGIN")
+            deferred = cur.execute(f"""SELECT type, name, sql FROM sqlite_master
+                                      WHERE type IN ('index', 'trigger') AND sql IS NOT NULL
+                                      AND tbl_name IN ({",".join("?" * len(BULK_TABLES))})""",
+                                   BULK_TABLES).fetchall()
+            for kind, name, _ in deferred:
+                cur.execute(f"DROP {kind.upper()} {name}")
+            yield conn
+            for table in FTS_COLUMNS:
+                cur.execute(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+            for _, _, sql in deferred:
+                cur.execute(sql)
+            for statement in SUMMARY_REBUILD:
+                cur.execute(statement)
+            cur.execute("UPDATE analytics_state SET last_order_id = 0")
+        self.cache.invalidate()
+
+    @contextmanager
+    def interruptible(self, cancelled):
+        """
+        Прерывание запросов чтения текущего потока: пока открыт блок, SQLite каждые
+        PROGRESS_STEPS инструкций вызывает cancelled(), и если он вернул True, выполняемый
+        запрос завершается исключением sqlite3.OperationalError('interrupted').
+
+        Args:
+            cancelled (callable): признак отмены, например Job.cancelled устаревшего поиска.
+        """
+        with self.manager.read() as conn:
+            conn.set_progress_handler(cancelled, PROGRESS_STEPS)
+            try:
+                yield
+            finally:
+                conn.set_progress_handler(None, 0)
+
+    def schema_version(self):
+        """Номер последней применённой миграции (0 — миграции не применялись)."""
+        with self.manager.read() as conn:
+            row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+        return row[0] or 0
+
+    def migrate(self):
+        """
+        Применение недостающих миграций из MIGRATIONS.
+
+        Каждая миграция выполняется в отдельной транзакции вместе с записью в schema_version,
+        поэтому существующий файл базы обновляется на месте, а при ошибке остаётся в
+        последней целостной версии.
+
+        Returns:
+            int: версия схемы после миграции.
+        """
+        current = self.schema_version()
+        for version, description, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            with self.manager.write() as conn:
+                cur = conn.cursor()
+                cur.execute("BEGIN")
+                for statement in statements:
+                    cur.execute(statement)
+                cur.execute("INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                            (version, description, datetime.now().isoformat()))
+            current = version
+        return current
 
     # --- Клиенты ---
     def add_client(self, client: Client):
-        cur = self.conn.cursor()
-        cur.execute("INSERT INTO clients (name,email,phone,created_at) VALUES (?,?,?,?)",
-                    (client.name, client.email, client.phone, client.created_at.isoformat()))
-        self.conn.commit()
+        with self.manager.write() as conn:
+            cur = conn.cursor()
+            cur.execute("INSERT INTO clients (name,email,phone,created_at) VALUES (?,?,?,?)",
+                        (client.name, client.email, client.phone, to_timestamp(client.created_at)))
         client._id = cur.lastrowid
+        self.cache.put(client)
+        return client
+
+    def get_client(self, client_id):
+        """Клиент по id; повторные запросы обслуживаются из кэша без обращения к SQLite."""
+        client = self.cache.get(Client, client_id)
+        if client is None:
+            with self.manager.read() as conn:
+                row = conn.execute("SELECT * FROM clients WHERE id = ?", (client_id,)).fetchone()
+            client = self._client_row(row) if row else None
         return client
 
     def get_clients(self, filters=None, order_by=None):
-        cur = self.conn.cursor()
         query = "SELECT * FROM clients"
-        params = []
-        if filters:
-            clauses = []
-            for k,v in filters.items():
-                clauses.append(f"{k} LIKE ?")
-                params.append(f"%{v}%")
+        clauses, params = self._like_clauses(filters, "clients")
+        if clauses:
             query += " WHERE " + " AND ".join(clauses)
         if order_by:
             query += f" ORDER BY {order_by}"
-        cur.execute(query, params)
-        rows = cur.fetchall()
-        clients = [Client(id=row["id"], name=row["name"], email=row["email"],
-                          phone=row["phone"],
-                          created_at = row["created_at"]) for row in rows]
+        with self.manager.read() as conn:
+            rows = conn.execute(query, params).fetchall()
+        clients = [self._client_row(row) for row in rows]
         return clients
 
+    def get_clients_page(self, after=None, limit=PAGE_SIZE, sort="id", descending=False, filters=None, since=None):
+        """
+        Страница клиентов с keyset-пагинацией (см. _page).
+
+        Returns:
+            tuple: (список Client, ключ для следующей страницы или None)
+        """
+        rows, next_after = self._page("clients", sort, after, limit, descending, filters, since)
+        return [self._client_row(row) for row in rows], next_after
+
     # --- Продукты ---
     def add_product(self, product: Product):
-        cur = self.conn.cursor()
-        cur.execute("INSERT INTO products (name, price, created_at) VALUES (?, ?, ?)",
-                    (product.name, product.price, product.created_at.isoformat()))
-        self.conn.commit()
+        with self.manager.write() as conn:
+            cur = conn.cursor()
+            cur.execute("INSERT INTO products (name, price, created_at) VALUES (?, ?, ?)",
+                        (product.name, product.price, to_timestamp(product.created_at)))
         product._id = cur.lastrowid
+        self.cache.put(product)
+        return product
+
+    def get_product(self, product_id):
+        """Товар по id; повторные запросы обслуживаются из кэша без обращения к SQLite."""
+        product = self.cache.get(Product, product_id)
+        if product is None:
+            with self.manager.read() as conn:
+                row = conn.execute("SELECT * FROM products WHERE id = ?", (product_id,)).fetchone()
+            product = self._product_row(row) if row else None
         return product
 
     def get_products(self, filters=None):
-        cur = self.conn.cursor()
         query = "SELECT * FROM products"
-        params = []
-        if filters:
+        clauses, params = self._like_clauses(filters, "products")
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        with self.manager.read() as conn:
+            rows = conn.execute(query, params).fetchall()
+        products = [self._product_row(row) for row in rows]
+        return products
+
+    def get_products_page(self, after=None, limit=PAGE_SIZE, sort="id", descending=False, filters=None, since=None):
+        """
+        Страница товаров с keyset-пагинацией (см. _page).
+
+        Returns:
+            tuple: (список Product, ключ для следующей страницы или None)
+        """
+        rows, next_after = self._page("products", sort, after, limit, descending, filters, since)
+        return [self._product_row(row) for row in rows], next_after
+
+    # --- Карта идентичности ---
+    def _client(self, id, name, email, phone, created_at):
+        """
+        Client для прочитанной строки: объект из кэша (с обновлёнными из строки полями)
+        или новый, который помещается в кэш.
+        """
+        client = self.cache.peek(Client, id)
+        if client is None:
+            client = Client(id=id, name=name, email=email, phone=phone, created_at=created_at)
+        else:
+            client.name, client.email, client.phone = name, email, phone
+        # NULL в базе остаётся None, а не «сейчас», которое конструктор ставит новым объектам
+        client._created_at = from_timestamp(created_at)
+        return self.cache.put(client)
+
+    def _client_row(self, row):
+        return self._client(row["id"], row["name"], row["email"], row["phone"], row["created_at"])
+
+    def _product_row(self, row):
+        """Product для прочитанной строки (см. _client)."""
+        product = self.cache.peek(Product, row["id"])
+        if product is None:
+            product = Product(id=row["id"], name=row["name"], price=row["price"], created_at=row["created_at"])
+        else:
+            product.name, product.price = row["name"], row["price"]
+        product._created_at = from_timestamp(row["created_at"])
+        return self.cache.put(product)
+
+    def invalidate(self, cls=None, id=None):
+        """
+        Сброс кэша сущностей — вызывается путями записи, меняющими существующие строки
+        (а также после изменения базы в обход DB).
+
+        Args:
+            cls: Client или Product; без аргументов очищается весь кэш.
+            id: id объекта; без него сбрасываются все объекты класса.
+        """
+        self.cache.invalidate(cls, id)
+
+    # --- Поиск ---
+    def search_clients(self, text, limit=SEARCH_LIMIT):
+        """
+        Поиск клиентов по подстроке в имени, email или телефоне.
+
+        Args:
+            text (str): искомый текст; слова через пробел должны встретиться все.
+            limit (int): максимальное количество результатов.
+
+        Returns:
+            list: Client, наиболее релевантные первыми; если какое-то слово встречается чаще
+            SEARCH_RANK_LIMIT раз — в порядке id.
+        """
+        return [self._client_row(row) for row in self._search("clients", text, limit)]
+
+    def search_products(self, text, limit=SEARCH_LIMIT):
+        """
+        Поиск товаров по подстроке в названии.
+
+        Args:
+            text (str): искомый текст; слова через пробел должны встретиться все.
+            limit (int): максимальное количество результатов.
+
+        Returns:
+            list: Product, наиболее релевантные первыми; если какое-то слово встречается чаще
+            SEARCH_RANK_LIMIT раз — в порядке id.
+        """
+        return [self._product_row(row) for row in self._search("products", text, limit)]
+
+    def suggest_clients(self, text, limit=SEARCH_LIMIT):
+        """
+        Подсказки для поля выбора клиента — на каждое нажатие клавиши (см. _suggest).
+
+        Returns:
+            list: Client в порядке id (для короткого текста — в порядке имени).
+        """
+        return [self._client_row(row) for row in self._suggest("clients", text, limit)]
+
+    def suggest_products(self, text, limit=SEARCH_LIMIT):
+        """Подсказки для поля выбора товара (см. suggest_clients)."""
+        return [self._product_row(row) for row in self._suggest("products", text, limit)]
+
+    def _suggest(self, table, text, limit):
+        """
+        Поиск без полного просмотра таблицы при любом тексте. В отличие от _search, совпадения
+        не ранжируются: сортировка по rank оценивает каждое совпадение (для частого слова — все
+        строки), а здесь выборка идёт в порядке индекса и останавливается на limit.
+        Слова от FTS_MIN_LENGTH символов ищутся trigram-индексом как подстроки, более короткое
+        первое слово без длинных — как начало имени по индексу name, остальные короткие
+        проверяются LIKE среди найденного.
+        """
+        terms = text.split()
+        fts_terms = [term for term in terms if len(term) >= FTS_MIN_LENGTH]
+        short_terms = [term for term in terms if len(term) < FTS_MIN_LENGTH]
+        clauses, params = [], []
+        if fts_terms:
+            # соединение, а не id IN (...): совпадения читаются из индекса по мере надобности
+            query = f"SELECT t.* FROM {table}_fts f JOIN {table} t ON t.id = f.rowid"
+            clauses.append(f"{table}_fts MATCH ?")
+            params.append(" ".join(self._fts_phrase(term) for term in fts_terms))
+            order = "f.rowid"
+        else:
+            query = f"SELECT * FROM {table} t"
+            order = "t.id"
+            if short_terms:
+                # начало имени как введено и с заглавной буквы: диапазоны индекса name
+                prefix = short_terms.pop(0)
+                ranges = []
+                for start in dict.fromkeys([prefix, prefix[:1].upper() + prefix[1:]]):
+                    ranges.append("(t.name >= ? AND t.name < ?)")
+                    params.extend([start, start + "\U0010ffff"])
+                clauses.append("(" + " OR ".join(ranges) + ")")
+                order = "t.name"
+        for term in short_terms:
+            clauses.append("(" + " OR ".join(f"t.{col} LIKE ?" for col in FTS_COLUMNS[table]) + ")")
+            params.extend([f"%{term}%"] * len(FTS_COLUMNS[table]))
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += f" ORDER BY {order} LIMIT ?"
+        with self.manager.read() as conn:
+            return conn.execute(query, params + [limit]).fetchall()
+
+    @staticmethod
+    def _fts_phrase(text):
+        """Текст как фраза FTS5 в кавычках: trigram-индекс ищет её как подстроку."""
+        return '"' + text.replace('"', '""') + '"'
+
+    def _search(self, table, text, limit):
+        terms = text.split()
+        if terms and all(len(term) >= FTS_MIN_LENGTH for term in terms):
+            phrases = [self._fts_phrase(term) for term in terms]
+            with self.manager.read() as conn:
+                # число совпадений каждого слова — до SEARCH_RANK_LIMIT + 1, без полного перебора
+                frequent = any(conn.execute(f"""SELECT count(*) FROM (SELECT rowid FROM {table}_fts
+                                                WHERE {table}_fts MATCH ? LIMIT ?)""",
+                                            (phrase, SEARCH_RANK_LIMIT + 1)).fetchone()[0] > SEARCH_RANK_LIMIT
+                               for phrase in phrases)
+            # частое слово: первые совпадения в порядке id, их выборка останавливается на limit
+            order = "f.rowid" if frequent else "f.rank"
+            query = f"""SELECT t.* FROM {table}_fts f JOIN {table} t ON t.id = f.rowid
+                        WHERE {table}_fts MATCH ? ORDER BY {order} LIMIT ?"""
+            params = [" ".join(phrases), limit]
+        else:
+            # слишком короткие слова индекс не находит: просмотр до первых limit совпадений
             clauses = []
-            for k,v in filters.items():
+            params = []
+            for term in terms or [""]:
+                clauses.append("(" + " OR ".join(f"{col} LIKE ?" for col in FTS_COLUMNS[table]) + ")")
+                params.extend([f"%{term}%"] * len(FTS_COLUMNS[table]))
+            query = f"SELECT * FROM {table} WHERE {' AND '.join(clauses)} ORDER BY id LIMIT ?"
+            params.append(limit)
+        with self.manager.read() as conn:
+            return conn.execute(query, params).fetchall()
+
+    @classmethod
+    def _like_clauses(cls, filters, table=None):
+        """
+        Условия фильтра «значение входит в колонку». Для колонок с полнотекстовым
+        индексом и значений от FTS_MIN_LENGTH символов используется FTS5, иначе LIKE '%значение%'.
+        """
+        clauses = []
+        params = []
+        for k, v in (filters or {}).items():
+            v = str(v)
+            if k in FTS_COLUMNS.get(table, ()) and len(v) >= FTS_MIN_LENGTH:
+                clauses.append(f"id IN (SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH ?)")
+                params.append(f"{k} : {cls._fts_phrase(v)}")
+            else:
                 clauses.append(f"{k} LIKE ?")
                 params.append(f"%{v}%")
+        return clauses, params
+
+    def _page(self, table, sort, after, limit, descending, filters, since=None):
+        """
+        Keyset-пагинация: строки упорядочены по (sort, id), следующая страница начинается
+        сразу после ключа последней строки предыдущей. В отличие от OFFSET, стоимость
+        страницы не зависит от её номера — поиск идёт по индексу. NULL в колонке sort
+        заменяется значением из PAGE_SORT_NULLS, иначе такие строки выпали бы из страниц.
+
+        Args:
+            table (str): clients или products.
+            sort (str): колонка сортировки из PAGE_SORT_COLUMNS.
+            after (tuple): ключ последней строки предыдущей страницы (из результата).
+            limit (int): размер страницы.
+            descending (bool): сортировка по убыванию.
+            filters (dict): фильтры LIKE, как в get_clients.
+            since (int): только строки с id больше since — добавленные после прошлой загрузки.
+
+        Returns:
+            tuple: (строки, ключ следующей страницы или None, если страниц больше нет)
+        """
+        if sort not in PAGE_SORT_COLUMNS[table]:
+            raise ValueError(f"Сортировка по {sort} не поддерживается")
+        clauses, params = self._like_clauses(filters, table)
+        if since is not None:
+            clauses.append("id > ?")
+            params.append(since)
+        op, direction = ("<", "DESC") if descending else (">", "ASC")
+        key = "id" if sort == "id" else f"ifnull({sort}, {PAGE_SORT_NULLS[sort]})"
+        if sort == "id":
+            if after is not None:
+                clauses.append(f"id {op} ?")
+                params.append(after[-1])
+            order = f"id {direction}"
+        else:
+            if after is not None:
+                clauses.append(f"({key}, id) {op} (?, ?)")
+                params.extend(after)
+            order = f"{key} {direction}, id {direction}"
+        query = f"SELECT *, {key} AS sort_key FROM {table}"
+        if clauses:
             query += " WHERE " + " AND ".join(clauses)
-        cur.execute(query, params)
-        rows = cur.fetchall()
-        products = [Product(id=row["id"], name=row["name"], price=row["price"],
-                            created_at = row["created_at"]) for row in rows]
-        return products
+        query += f" ORDER BY {order} LIMIT ?"
+        with self.manager.read() as conn:
+            rows = conn.execute(query, params + [limit]).fetchall()
+        next_after = (rows[-1]["sort_key"], rows[-1]["id"]) if len(rows) == limit else None
+        return rows, next_after
 
     # --- Заказы ---
     def add_order(self, order: Order):
-        cur = self.conn.cursor()
-        cur.execute("INSERT INTO orders (client_id, created_at) VALUES (?, ?)",
-                    (order.client.id if order.client else None, order.created_at.isoformat()))
-        order_id = cur.lastrowid
-
-        for item in order.items:
-            cur.execute("INSERT INTO order_items (order_id, product_id, quantity) VALUES (?, ?, ?)",
-                        (order_id, item.product.id, item.quantity))
-        self.conn.commit()
+        with self.manager.write() as conn:
+            cur = conn.cursor()
+            cur.execute("INSERT INTO orders (client_id, created_at) VALUES (?, ?)",
+                        (order.client.id if order.client else None, to_timestamp(order.created_at)))
+            order_id = cur.lastrowid
+            cur.executemany("INSERT INTO order_items (order_id, product_id, quantity) VALUES (?, ?, ?)",
+                            [(order_id, item.product.id, item.quantity) for item in order.items])
         order._id = order_id
         return order
 
     def get_orders(self, filters=None, order_by=None):
-        # filters: {'client_name': 'John'}
-        cur = self.conn.cursor()
+        # filters: {'client_name': 'John', 'date_from': '2025-08-01', 'date_to': '2025-08-31'}
+        # Заказы собираются фиксированным числом запросов (заказы+клиенты, товары, позиции),
+        # а не отдельным SELECT по order_items на каждый заказ.
+        where, params = self._orders_where(filters)
 
-        query = """SELECT o.id, o.client_id, o.created_at, c.name as client_name
+        query = """SELECT o.id, o.client_id, o.created_at,
+                          c.id AS client_row_id, c.name AS client_name, c.email AS client_email,
+                          c.phone AS client_phone, c.created_at AS client_created_at
                    FROM orders o
-                   LEFT JOIN clients c ON o.client_id = c.id"""
-        params = []
+                   LEFT JOIN clients c ON o.client_id = c.id""" + where
+        if order_by:
+            query += " ORDER BY " + self._orders_order_by(order_by)
+        # Подзапрос с теми же фильтрами вместо IN (?, ?, ...) — не упирается в лимит параметров
+        selected = "SELECT o.id FROM orders o LEFT JOIN clients c ON o.client_id = c.id" + where
 
-        if filters:
-            clauses = []
-            if "client_name" in filters and filters["client_name"]:
-                clauses.append("c.name LIKE ?")
-                params.append(f"%{filters['client_name']}%")
-            if "date_from" in filters and filters["date_from"]:
-                clauses.append("o.created_at >= ?")
-                params.append(filters["date_from"])
-            if "date_to" in filters and filters["date_to"]:
-                clauses.append("o.created_at <= ?")
-                params.append(filters["date_to"])
-            if clauses:
-                query += " WHERE " + " AND ".join(clauses)
-
-
-        cur.execute(query, params)
-        order_rows = cur.fetchall()
-
-        # Получим клиентов и продукты для связи
-        client_ids = list(set(row["client_id"] for row in order_rows if row["client_id"] is not None))
-        clients = {}
-        if client_ids:
-            q = "SELECT * FROM clients WHERE id IN ({})".format(",".join("?"*len(client_ids)))
-            cur.execute(q, client_ids)
-            for r in cur:
-                clients[r["id"]] = Client(id=r["id"], name=r["name"], email=r["email"], phone=r["phone"], created_at=r["created_at"])
+        with self.manager.read() as conn:
+            cur = conn.cursor()
+            order_rows = cur.execute(query, params).fetchall()
+            if not order_rows:
+                return []
+            return self._hydrate_orders(cur, order_rows, selected, params)
 
-        product_rows = cur.execute("SELECT * FROM products").fetchall()
-        products = {row["id"]: Product(id=row["id"], name=row["name"], price=row["price"], created_at=row["created_at"]) for row in product_rows}
+    def get_orders_page(self, after=None, limit=PAGE_SIZE, filters=None, since=None):
+        """
+        Страница заказов, новые сверху, с keyset-пагинацией по (created_at, id);
+        заказы без даты идут последними (ключ ORDER_PAGE_KEY).
 
-        orders = []
-        for order_row in order_rows:
-            order_id = order_row["id"]
-            cur.execute("SELECT * FROM order_items WHERE order_id=?", (order_id,))
-            items_rows = cur.fetchall()
-            items = []
-            for irow in items_rows:
-                p = products.get(irow["product_id"])
-                if p:
-                    items.append(OrderItem(p, irow["quantity"]))
-            o = Order(id=order_id, client=clients.get(order_row["client_id"]), items=items, created_at=order_row["created_at"])
-            orders.append(o)
+        Args:
+            after (tuple): ключ (created_at, id) последнего заказа предыдущей страницы.
+            limit (int): размер страницы.
+            filters (dict): фильтры, как в get_orders.
+            since (int): только заказы с id больше since — добавленные после прошлой загрузки.
+
+        Returns:
+            tuple: (список Order, ключ для следующей страницы или None)
+        """
+        where, params = self._orders_where(filters, created=ORDER_PAGE_KEY)
+        if after is not None:
+            where += (" AND " if where else " WHERE ") + f"({ORDER_PAGE_KEY}, o.id) < (?, ?)"
+            params.extend(after)
+        order_by = f"{ORDER_PAGE_KEY} DESC, o.id DESC"
+        if since is not None:
+            where += (" AND " if where else " WHERE ") + "o.id > ?"
+            params.append(since)
+            # Новых заказов обычно единицы: поиск по диапазону id и сортировка найденного
+            # вместо обхода всего индекса по created_at (унарный + отключает его для ORDER BY)
+            order_by = f"+{ORDER_PAGE_KEY} DESC, o.id DESC"
+        query = f"""SELECT o.id, o.client_id, o.created_at, {ORDER_PAGE_KEY} AS sort_key,
+                          c.id AS client_row_id, c.name AS client_name, c.email AS client_email,
+                          c.phone AS client_phone, c.created_at AS client_created_at
+                   FROM orders o
+                   LEFT JOIN clients c ON o.client_id = c.id""" + where + \
+                f" ORDER BY {order_by} LIMIT ?"
+        with self.manager.read() as conn:
+            cur = conn.cursor()
+            order_rows = cur.execute(query, params + [limit]).fetchall()
+            if not order_rows:
+                return [], None
+            ids = [row["id"] for row in order_rows]
+            orders = self._hydrate_orders(cur, order_rows, ",".join("?" * len(ids)), ids)
+        next_after = (order_rows[-1]["sort_key"], order_rows[-1]["id"]) if len(order_rows) == limit else None
+        return orders, next_after
+
+    def _hydrate_orders(self, cur, order_rows, selected, params):
+        """
+        Сборка Order/OrderItem для строк заказов за один проход.
 
+        Args:
+            cur (sqlite3.Cursor): курсор.
+            order_rows (list): строки заказов с колонками клиента (client_row_id, client_name, ...);
+                client_row_id пуст, если клиента нет (имя клиента может быть NULL).
+            selected (str): SQL для IN (...) — подзапрос id заказов или список плейсхолдеров.
+            params (list): параметры для selected.
+
+        Returns:
+            list: список Order в порядке order_rows.
+        """
+        # Только товары, которые реально встречаются в выбранных заказах
+        products = {}
+        cur.execute(f"""SELECT * FROM products WHERE id IN (
+                            SELECT DISTINCT product_id FROM order_items WHERE order_id IN ({selected}))""",
+                    params)
+        for row in cur:
+            products[row["id"]] = self._product_row(row)
+
+        # Все позиции выбранных заказов одним запросом
+        items_by_order = {}
+        cur.execute(f"""SELECT order_id, product_id, quantity FROM order_items
+                        WHERE order_id IN ({selected}) ORDER BY order_id, id""", params)
+        for order_id, product_id, quantity in cur:
+            p = products.get(product_id)
+            if p:
+                items_by_order.setdefault(order_id, []).append(OrderItem(p, quantity))
+
+        clients = {}
+        orders = []
+        for row in order_rows:
+            client_id = row["client_id"]
+            client = clients.get(client_id)
+            if client is None and row["client_row_id"] is not None:
+                client = self._client(client_id, row["client_name"], row["client_email"],
+                                      row["client_phone"], row["client_created_at"])
+                clients[client_id] = client
+            order = Order(id=row["id"], client=client, items=items_by_order.get(row["id"], []),
+                          created_at=row["created_at"])
+            if row["created_at"] is None:
+                order._created_at = None  # заказ без даты (см. _client); в ORDER_PAGE_KEY он последний
+            orders.append(order)
         return orders
 
+    @classmethod
+    def _orders_where(cls, filters, created="o.created_at"):
+        """
+        Условие WHERE и параметры для фильтров get_orders (алиасы o — orders, c — clients).
+        created — выражение даты заказа в условиях по датам: страницы передают ORDER_PAGE_KEY,
+        чтобы диапазон дат и сортировка шли по одному индексу.
+        """
+        clauses = []
+        params = []
+        if filters:
+            if filters.get("client_name"):
+                # Сначала подходящие клиенты (FTS или LIKE по небольшой таблице), затем их заказы
+                # по индексу (client_id, created_at): редкое имя не требует просмотра всех заказов
+                name_clauses, name_params = cls._like_clauses({"name": filters["client_name"]}, "clients")
+                clauses.append(f"o.client_id IN (SELECT id FROM clients WHERE {' AND '.join(name_clauses)})")
+                params.extend(name_params)
+            if filters.get("date_from"):
+                clauses.append(f"{created} >= ?")
+                params.append(to_timestamp(filters["date_from"]))
+            if filters.get("date_to"):
+                clauses.append(f"{created} <= ?")
+                params.append(to_timestamp(filters["date_to"]))
+                if not filters.get("date_from"):
+                    clauses.append("o.created_at IS NOT NULL")  # в ORDER_PAGE_KEY заказ без даты — 0
+        if not clauses:
+            return "", params
+        return " WHERE " + " AND ".join(clauses), params
+
+    @staticmethod
+    def _orders_order_by(order_by):
+        """Неуточнённые колонки сортировки относятся к orders (иначе created_at неоднозначен)."""
+        parts = []
+        for part in order_by.split(","):
+            part = part.strip()
+            parts.append(part if "." in part else "o." + part)
+        return ", ".join(parts)
+
     # --- Импорт / экспорт (CSV/JSON) ---
     def export_clients_csv(self, filepath):
-        import csv
-        clients = self.get_clients()
-        with open(filepath, "w", newline='', encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(["id", "name", "email", "phone", "created_at"])
-            for c in clients:
-                writer.writerow([c.id, c.name, c.email, c.phone, c.created_at])
-
-    def import_clients_csv(self, filepath):
-        import csv
-        with open(filepath, newline='', encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                c = Client(name=row["name"], email=row["email"], phone=row["phone"])
-                self.add_client(c)
+        return self.export("clients", filepath, fmt="csv")
+
+    def import_clients_csv(self, filepath, progress=None):
+        return self.bulk_import("clients", filepath, fmt="csv", progress=progress)
 
     def export_clients_json(self, filepath):
-        import json
-        clients = self.get_clients()
-        data = [c.to_dict() for c in clients]
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4)
-
-    def import_clients_json(self, filepath):
-        import json
-        with open(filepath, encoding="utf-8") as f:
-            data = json.load(f)
-            for item in data:
-                c = Client.from_dict(item)
-                self.add_client(c)
+        return self.export("clients", filepath, fmt="json")
+
+    def import_clients_json(self, filepath, progress=None):
+        return self.bulk_import("clients", filepath, fmt="json", progress=progress)
+
+    def export(self, entity, filepath, fmt=None, compress=None, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+        """
+        Потоковый экспорт клиентов, товаров или заказов с позициями (см. модуль exporter).
+
+        Args:
+            entity (str): clients, products или orders.
+            filepath (str): путь к файлу; расширение .gz включает сжатие.
+            fmt (str): csv, json или jsonl; по умолчанию определяется по расширению.
+            compress (bool): gzip-сжатие независимо от расширения.
+            batch_size (int): строк в одной порции fetchmany.
+            progress (callable): вызывается после каждой порции как progress(прочитано строк).
+
+        Returns:
+            int: количество выгруженных записей.
+        """
+        with self.manager.read() as conn:
+            return exporter.export(conn, entity, filepath, fmt=fmt, compress=compress, batch_size=batch_size,
+                                   progress=progress)
+
+    def bulk_import(self, entity, filepath, fmt=None, chunk_size=DEFAULT_CHUNK_SIZE, progress=None, atomic=False):
+        """
+        Пакетный импорт клиентов, товаров или заказов из файла (см. модуль importer).
+
+        Args:
+            entity (str): clients, products или orders.
+            filepath (str): путь к файлу.
+            fmt (str): csv, json или jsonl; по умолчанию определяется по расширению.
+            chunk_size (int): записей в одной транзакции.
+            progress (callable): вызывается после каждой порции как progress(result).
+            atomic (bool): весь файл в одной транзакции.
+
+        Returns:
+            ImportResult: количество загруженных и список отклонённых записей.
+        """
+        with self.manager.write() as conn:
+            importer = BulkImporter(conn, chunk_size=chunk_size, progress=progress, atomic=atomic)
+            return importer.run(entity, iter_records(filepath, fmt))
+
+    # --- Аналитика ---
+    def get_daily_sales(self, date_from=None, date_to=None):
+        """
+        Выручка по дням из сводной таблицы daily_sales (O(число дней)).
+
+        Args:
+            date_from (str): первый день периода, 'YYYY-MM-DD' (включительно).
+            date_to (str): последний день периода, 'YYYY-MM-DD' (включительно).
+
+        Returns:
+            list: пары (день 'YYYY-MM-DD', выручка) по возрастанию дня.
+        """
+        clauses = []
+        params = []
+        if date_from:
+            clauses.append("day >= ?")
+            params.append(str(date_from)[:10])
+        if date_to:
+            clauses.append("day <= ?")
+            params.append(str(date_to)[:10])
+        query = "SELECT day, revenue FROM daily_sales"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY day"
+        with self.manager.read() as conn:
+            return [(row["day"], row["revenue"]) for row in conn.execute(query, params)]
+
+    def get_order_frame(self, date_from=None, date_to=None):
+        """
+        Колоночный снимок заказов (OrderFrame) для векторной аналитики.
+
+        Args:
+            date_from (str): начало периода (включительно).
+            date_to (str): конец периода (включительно).
+
+        Returns:
+            OrderFrame: позиции заказов в столбцах NumPy/pandas.
+        """
+        from orderframe import OrderFrame  # numpy/pandas нужны только аналитике
+        with self.manager.read() as conn:
+            conn.execute("BEGIN")  # все запросы снимка читают одну и ту же версию базы
+            try:
+                return OrderFrame.from_db(conn, date_from, date_to)
+            finally:
+                conn.rollback()
+
+    def get_client_product_edges(self, date_from=None, date_to=None, top_clients=None, top_products=None):
+        """
+        Рёбра графа «клиент — товар»: суммарное количество товара в заказах клиента.
+
+        Без периода рёбра читаются из накопительного агрегата client_product_sales
+        (см. refresh_analytics), с периодом — считаются по заказам периода.
+
+        Args:
+            date_from (str): начало периода по дате заказа (включительно).
+            date_to (str): конец периода по дате заказа (включительно).
+            top_clients (int): только N клиентов с наибольшим числом заказов.
+            top_products (int): только N товаров с наибольшим проданным количеством.
+
+        Returns:
+            list: кортежи (client_id, имя клиента, product_id, название товара, количество).
+        """
+        if not date_from and not date_to:
+            return self._client_product_sales(top_clients, top_products)
+        period = []
+        params = []
+        if date_from:
+            period.append("o.created_at >= ?")
+            params.append(to_timestamp(date_from))
+        if date_to:
+            period.append("o.created_at <= ?")
+            params.append(to_timestamp(date_to))
+        clauses = list(period)
+        period_where = " WHERE " + " AND ".join(period) if period else ""
+
+        # Без периода лидеры берутся из сводных таблиц по индексу, с периодом — считаются по заказам
+        if top_clients:
+            if period:
+                clauses.append(f"""o.client_id IN (SELECT o.client_id FROM orders o{period_where}
+                                                   GROUP BY o.client_id ORDER BY COUNT(*) DESC LIMIT ?)""")
+                params += params[:len(period)]
+            else:
+                clauses.append("""o.client_id IN (SELECT client_id FROM client_order_counts
+                                                  ORDER BY order_count DESC LIMIT ?)""")
+            params.append(top_clients)
+        if top_products:
+            if period:
+                clauses.append(f"""oi.product_id IN (SELECT oi.product_id FROM orders o
+                                                     JOIN order_items oi ON oi.order_id = o.id{period_where}
+                                                     GROUP BY oi.product_id ORDER BY SUM(oi.quantity) DESC LIMIT ?)""")
+                params += params[:len(period)]
+            else:
+                clauses.append("""oi.product_id IN (SELECT product_id FROM product_sales
+                                                    ORDER BY quantity DESC LIMIT ?)""")
+            params.append(top_products)
+
+        query = """SELECT o.client_id, c.name, oi.product_id, p.name, SUM(oi.quantity)
+                   FROM orders o
+                   JOIN order_items oi ON oi.order_id = o.id
+                   JOIN clients c ON c.id = o.client_id
+                   JOIN products p ON p.id = oi.product_id"""
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " GROUP BY o.client_id, oi.product_id"
+        with self.manager.read() as conn:
+            return [tuple(row) for row in conn.execute(query, params)]
+
+    def _client_product_sales(self, top_clients, top_products):
+        self.refresh_analytics()
+        clauses = []
+        params = []
+        if top_clients:
+            clauses.append("""s.client_id IN (SELECT client_id FROM client_order_counts
+                                              ORDER BY order_count DESC LIMIT ?)""")
+            params.append(top_clients)
+        if top_products:
+            clauses.append("s.product_id IN (SELECT product_id FROM product_sales ORDER BY quantity DESC LIMIT ?)")
+            params.append(top_products)
+        query = """SELECT s.client_id, c.name, s.product_id, p.name, s.quantity
+                   FROM client_product_sales s
+                   JOIN clients c ON c.id = s.client_id
+                   JOIN products p ON p.id = s.product_id"""
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        with self.manager.read() as conn:
+            return [tuple(row) for row in conn.execute(query, params)]
+
+    def refresh_analytics(self):
+        """
+        Догрузка в накопительные агрегаты (client_product_sales) заказов, добавленных после
+        последнего обновления: учитываются только заказы с id больше сохранённой отметки,
+        поэтому время обновления зависит от числа новых заказов, а не от всей истории.
+
+        Заказы добавляются с растущими id (add_order, импорт), так что новые заказы всегда
+        оказываются за отметкой. Удаление или изменение уже учтённых заказов сбрасывает
+        отметку триггерами, и агрегат пересчитывается целиком. В режиме readonly агрегат
+        не обновляется.
+
+        Returns:
+            int: количество учтённых новых заказов.
+        """
+        state = "SELECT last_order_id FROM analytics_state WHERE name = 'client_product_sales'"
+        with self.manager.read() as conn:
+            last = conn.execute(state).fetchone()[0]
+            top = conn.execute("SELECT ifnull(max(id), 0) FROM orders").fetchone()[0]
+        if top == last or self.readonly:
+            # без права записи используется агрегат, обновлённый процессом-писателем
+            return 0
+        with self.manager.write() as conn:
+            cur = conn.cursor()
+            cur.execute("BEGIN")
+            # отметку и границу перечитываем под блокировкой писателя
+            last = cur.execute(state).fetchone()[0]
+            top = cur.execute("SELECT ifnull(max(id), 0) FROM orders").fetchone()[0]
+            if last == 0 or last > top:
+                cur.execute("DELETE FROM client_product_sales")
+                last = 0
+            cur.execute("""INSERT INTO client_product_sales (client_id, product_id, quantity)
+                           SELECT o.client_id, oi.product_id, SUM(oi.quantity)
+                           FROM orders o
+                           JOIN order_items oi ON oi.order_id = o.id
+                           WHERE o.id > ? AND o.id <= ? AND o.client_id IS NOT NULL
+                           GROUP BY o.client_id, oi.product_id
+                           ON CONFLICT(client_id, product_id) DO UPDATE SET quantity = quantity + excluded.quantity""",
+                        (last, top))
+            cur.execute("UPDATE analytics_state SET last_order_id = ? WHERE name = 'client_product_sales'", (top,))
+            return cur.execute("SELECT COUNT(*) FROM orders WHERE id > ? AND id <= ?", (last, top)).fetchone()[0]
+
+    def invalidate_analytics(self):
+        """
+        Сброс накопительных агрегатов: следующий refresh_analytics пересчитает их по всей
+        истории. Нужен после изменений заказов в обход триггеров (например, правки базы
+        другими программами или загрузки исторических данных с уже занятыми id).
+        """
+        with self.manager.write() as conn:
+            conn.execute("UPDATE analytics_state SET last_order_id = 0")
+
+    def get_product_sales(self, limit=5):
+        """
+        Самые продаваемые товары по количеству из сводной таблицы product_sales.
+
+        Returns:
+            list: тройки (название товара, количество, выручка) по убыванию количества.
+        """
+        query = """SELECT p.name, s.quantity, s.revenue
+                   FROM product_sales s JOIN products p ON p.id = s.product_id
+                   ORDER BY s.quantity DESC LIMIT ?"""
+        with self.manager.read() as conn:
+            return [(row["name"], row["quantity"], row["revenue"]) for row in conn.execute(query, (limit,))]
+
+    def data_version(self):
+        """
+        Версия данных для кэшей аналитики: наибольшие id и количество строк основных таблиц.
+
+        Меняется при добавлении и удалении строк (в том числе при импорте); max(id) читается
+        из конца B-дерева, count(*) — по самому узкому индексу, поэтому запрос дешёвый
+        и на миллионах заказов.
+
+        Returns:
+            tuple: значения, сравнимые через ==.
+        """
+        query = """SELECT (SELECT max(id) FROM orders), (SELECT count(*) FROM orders),
+                          (SELECT max(id) FROM order_items), (SELECT count(*) FROM order_items),
+                          (SELECT max(id) FROM clients), (SELECT count(*) FROM clients),
+                          (SELECT max(id) FROM products), (SELECT count(*) FROM products)"""
+        with self.manager.read() as conn:
+            return tuple(conn.execute(query).fetchone())
+
+    def rebuild_summaries(self):
+        """
+        Полный пересчёт сводных таблиц (daily_sales, product_sales, client_order_counts)
+        из истории заказов — после изменений в обход триггеров или для проверки.
+        """
+        with self.manager.write() as conn:
+            cur = conn.cursor()
+            cur.execute("BEGIN")
+            for statement in SUMMARY_REBUILD:
+                cur.execute(statement)
+            cur.execute("UPDATE analytics_state SET last_order_id = 0")
 
     def close(self):
-        self.conn.close()
+        self.manager.close()
 
 
     def get_top5_products(self):
         import pandas as pd
-        query = """SELECT c.name, COUNT(o.id) AS order_count
-                    FROM clients c
-                    LEFT JOIN orders o ON c.id = o.client_id
-                    GROUP BY c.id
-                    ORDER BY order_count DESC
+        # client_order_counts поддерживается триггерами — читаются только 5 строк по индексу
+        query = """SELECT c.name, s.order_count
+                    FROM client_order_counts s
+                    JOIN clients c ON c.id = s.client_id
+                    ORDER BY s.order_count DESC
                     LIMIT 5"""
-        df = pd.read_sql_query(query, con=self.conn)
+        with self.manager.read() as conn:
+            df = pd.read_sql_query(query, con=conn)
         return df
\ No newline at end of file
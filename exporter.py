@@ -0,0 +1,170 @@
+"""
+Потоковый экспорт клиентов, товаров и заказов в CSV, JSON и JSON Lines.
+
+Строки читаются из курсора порциями (fetchmany) и сразу пишутся в файл, поэтому
+расход памяти не зависит от размера таблицы. Файлы с расширением .gz (или при
+compress=True) сжимаются gzip на лету. Запись идёт во временный файл рядом с целевым,
+который заменяет целевой только после успешной выгрузки: прерванный экспорт не оставляет
+обрезанного файла.
+
+Заказы выгружаются вместе с позициями: в JSON — как Order.to_dict с добавленными email
+клиента и названиями товаров (items — список {"product_id", "product_name", "quantity"}),
+в CSV — одна строка на позицию (у заказа без позиций — одна строка с пустым товаром).
+Оба формата понимает модуль importer, в том числе при загрузке в другую базу, где id
+клиентов и товаров другие.
+"""
+import csv
+import gzip
+import json
+import os
+
+from importer import detect_format
+
+ENTITIES = ("clients", "products", "orders")
+DEFAULT_BATCH_SIZE = 5000
+
+# created_at хранится в секундах эпохи, а в файлы выгружается ISO-строкой (её принимает importer)
+ISO_CREATED_AT = "strftime('%Y-%m-%dT%H:%M:%S', {}created_at, 'unixepoch') AS created_at"
+
+# Один кодировщик на модуль: json.dumps с параметрами создаёт новый JSONEncoder на каждый вызов
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+QUERIES = {
+    "clients": f"SELECT id, name, email, phone, {ISO_CREATED_AT.format('')} FROM clients ORDER BY id",
+    "products": f"SELECT id, name, price, {ISO_CREATED_AT.format('')} FROM products ORDER BY id",
+    "orders": f"""SELECT o.id AS order_id, o.client_id, c.email AS client_email, {ISO_CREATED_AT.format('o.')},
+                        oi.product_id, p.name AS product_name, oi.quantity
+                 FROM orders o
+                 LEFT JOIN clients c ON c.id = o.client_id
+                 LEFT JOIN order_items oi ON oi.order_id = o.id
+                 LEFT JOIN products p ON p.id = oi.product_id
+                 ORDER BY o.id, oi.id""",
+}
+
+
+def iter_batches(conn, query, params=(), batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Названия колонок и генератор порций строк запроса (fetchmany по batch_size).
+
+    Returns:
+        tuple: (список колонок, генератор списков кортежей)
+    """
+    cur = conn.cursor()
+    cur.row_factory = None  # простые кортежи дешевле sqlite3.Row
+    cur.execute(query, params)
+    columns = [d[0] for d in cur.description]
+
+    def batches():
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                return
+            yield rows
+
+    return columns, batches()
+
+
+def iter_rows(columns, batches):
+    """Строки порций в виде словарей колонка -> значение."""
+    for rows in batches:
+        for row in rows:
+            yield dict(zip(columns, row))
+
+
+def iter_orders(rows):
+    """Склейка строк «заказ × позиция» (отсортированных по заказу) в словари заказов с позициями."""
+    current = None
+    for row in rows:
+        if current is None or current["id"] != row["order_id"]:
+            if current is not None:
+                yield current
+            current = {"id": row["order_id"], "client_id": row["client_id"], "client_email": row["client_email"],
+                       "items": [], "created_at": row["created_at"]}
+        if row["product_id"] is not None:
+            current["items"].append({"product_id": row["product_id"], "product_name": row["product_name"],
+                                     "quantity": row["quantity"]})
+    if current is not None:
+        yield current
+
+
+def _open(filepath, compress):
+    if compress:
+        return gzip.open(filepath, "wt", newline="", encoding="utf-8")
+    return open(filepath, "w", newline="", encoding="utf-8")
+
+
+def _with_progress(batches, progress):
+    """Порции без изменений; после каждой — progress(прочитано строк)."""
+    read = 0
+    for rows in batches:
+        yield rows
+        read += len(rows)
+        progress(read)
+
+
+def export(conn, entity, filepath, fmt=None, compress=None, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Экспорт таблицы в файл без построения списка объектов в памяти.
+
+    Args:
+        conn (sqlite3.Connection): соединение с базой.
+        entity (str): clients, products или orders.
+        filepath (str): путь к файлу.
+        fmt (str): csv, json или jsonl; по умолчанию по расширению.
+        compress (bool): gzip-сжатие; по умолчанию — если путь оканчивается на .gz.
+        batch_size (int): размер порции fetchmany.
+        progress (callable): вызывается после каждой порции как progress(прочитано строк);
+            исключение из него прерывает экспорт, и файл filepath не меняется.
+
+    Returns:
+        int: количество выгруженных записей (для CSV заказов — позиций).
+    """
+    if entity not in ENTITIES:
+        raise ValueError(f"Неизвестная сущность: {entity}")
+    fmt = fmt or detect_format(filepath)
+    if compress is None:
+        compress = filepath.lower().endswith(".gz")
+
+    columns, batches = iter_batches(conn, QUERIES[entity], batch_size=batch_size)
+    if progress:
+        batches = _with_progress(batches, progress)
+    partial = filepath + ".part"
+    try:
+        with _open(partial, compress) as f:
+            count = _write(f, entity, fmt, columns, batches)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    os.replace(partial, filepath)
+    return count
+
+
+def _write(f, entity, fmt, columns, batches):
+    """Запись порций строк в открытый файл; возвращает количество записей."""
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for rows in batches:
+            writer.writerows(rows)
+            count += len(rows)
+        return count
+
+    rows = iter_rows(columns, batches)
+    records = iter_orders(rows) if entity == "orders" else rows
+    if fmt == "jsonl":
+        for record in records:
+            f.write(_encode(record))
+            f.write("\n")
+            count += 1
+    elif fmt == "json":
+        f.write("[")
+        for record in records:
+            f.write(",\n    " if count else "\n    ")
+            f.write(_encode(record))
+            count += 1
+        f.write("\n]\n" if count else "]\n")
+    else:
+        raise ValueError(f"Неизвестный формат: {fmt}")
+    return count
@@ -1,21 +1,43 @@
 import tkinter as tk
+from datetime import date, datetime, time
 from tkinter import ttk, messagebox, filedialog
 from db import DB
-from models import Client, Product, Order, OrderItem
-import analysis
-import re
+from models import EPOCH, Client, Product, Order, OrderItem, validate_email, validate_phone
+from widgets import PagedTreeview, SearchCombobox
+from tasks import TaskRunner
+import charts
+
+# Пауза после последнего нажатия клавиши в полях поиска заказов до отправки запроса, мс
+SEARCH_DELAY_MS = 300
+
 
 class App(tk.Tk):
-    def __init__(self):
+    """
+    Главное окно приложения.
+
+    Импорт, экспорт, построение графиков и загрузка полных списков выполняются в рабочих
+    потоках (tasks.TaskRunner), поэтому окно не замирает. Пока идёт задача, конфликтующие
+    с ней кнопки отключены (группы: 'write' — запись в базу, 'export', 'chart').
+
+    Args:
+        db (DB): база данных; по умолчанию открывается shop.db. Тесты передают базу в памяти.
+    """
+
+    def __init__(self, db=None):
         super().__init__()
         self.title("Менеджер Интернет-магазина")
         self.geometry("900x700")
 
-        self.db = DB()
+        self.db = db if db is not None else DB()
+        self.tasks = TaskRunner(self)
+        self.tasks.on_change = self.update_task_state
+        self.group_buttons = {}
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
         self.create_widgets()
 
     def create_widgets(self):
+        self.create_status_bar()
         tab_control = ttk.Notebook(self)
         self.tab_clients = ttk.Frame(tab_control)
         self.tab_products = ttk.Frame(tab_control)
@@ -33,6 +55,51 @@ class App(tk.Tk):
         self.create_orders_tab()
         self.create_analysis_tab()
 
+    # ------ ФОНОВЫЕ ЗАДАЧИ --------
+    def create_status_bar(self):
+        frm = ttk.Frame(self)
+        frm.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=2)
+        self.status_var = tk.StringVar(value="Готово")
+        ttk.Label(frm, textvariable=self.status_var).pack(side=tk.LEFT)
+        self.cancel_button = ttk.Button(frm, text="Отмена", command=self.tasks.cancel, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.RIGHT)
+        self.progressbar = ttk.Progressbar(frm, mode="indeterminate", length=150)
+        self.progressbar.pack(side=tk.RIGHT, padx=5)
+
+    def group_button(self, master, group, **kwargs):
+        """Кнопка, которая отключается, пока выполняется задача группы group."""
+        button = ttk.Button(master, **kwargs)
+        self.group_buttons.setdefault(group, []).append(button)
+        return button
+
+    def run_task(self, func, name, group=None, on_done=None, error_title="Ошибка", on_cancel=None):
+        """Запуск func(job) в фоне с прогрессом в строке состояния и ошибкой в messagebox."""
+        return self.tasks.submit(
+            func, name=name, group=group, on_done=on_done, on_cancel=on_cancel,
+            on_progress=lambda value: self.status_var.set(f"{name}: {value}"),
+            on_error=lambda e: messagebox.showerror(error_title, str(e)))
+
+    def update_task_state(self):
+        """Строка состояния и доступность кнопок по списку выполняемых задач."""
+        jobs = self.tasks.jobs
+        if jobs:
+            self.status_var.set(", ".join(job.name for job in jobs) + "...")
+            self.progressbar.start(20)
+            self.cancel_button.configure(state=tk.NORMAL)
+        else:
+            self.status_var.set("Готово")
+            self.progressbar.stop()
+            self.cancel_button.configure(state=tk.DISABLED)
+        for group, buttons in self.group_buttons.items():
+            state = tk.DISABLED if self.tasks.busy(group) else tk.NORMAL
+            for button in buttons:
+                button.configure(state=state)
+
+    def on_close(self):
+        # рабочие потоки останавливаются в ближайшей точке отмены (между порциями)
+        self.tasks.shutdown()
+        self.destroy()
+
     # ------ КЛИЕНТЫ --------
     def create_clients_tab(self):
         frm = self.tab_clients
@@ -53,14 +120,14 @@ class App(tk.Tk):
         self.client_phone_var = tk.StringVar()
         ttk.Entry(frm_add, textvariable=self.client_phone_var).grid(row=2, column=1)
 
-        ttk.Button(frm_add, text="Добавить", command=self.add_client).grid(row=3, column=0, columnspan=2, pady=5)
+        self.group_button(frm_add, "write", text="Добавить", command=self.add_client).grid(row=3, column=0, columnspan=2, pady=5)
 
         # Список клиентов
         frm_list = ttk.LabelFrame(frm, text="Клиенты")
         frm_list.pack(fill='both', expand=1, padx=5, pady=5)
 
         columns = ("id", "name", "email", "phone")
-        self.client_tree = ttk.Treeview(frm_list, columns=columns, show="headings")
+        self.client_tree = PagedTreeview(frm_list, self.fetch_clients_page, columns=columns, show="headings")
         for col in columns:
             self.client_tree.heading(col, text=col.title())
             self.client_tree.column(col, anchor=tk.W, width=100)
@@ -69,25 +136,17 @@ class App(tk.Tk):
         # Кнопки импорта/экспорта
         frm_buttons = ttk.Frame(frm)
         frm_buttons.pack(fill='x', padx=5, pady=5)
-        ttk.Button(frm_buttons, text="Экспорт CSV", command=self.export_clients_csv).pack(side=tk.LEFT, padx=5)
-        ttk.Button(frm_buttons, text="Импорт CSV", command=self.import_clients_csv).pack(side=tk.LEFT, padx=5)
-        ttk.Button(frm_buttons, text="Экспорт JSON", command=self.export_clients_json).pack(side=tk.LEFT, padx=5)
-        ttk.Button(frm_buttons, text="Импорт JSON", command=self.import_clients_json).pack(side=tk.LEFT, padx=5)
+        self.group_button(frm_buttons, "export", text="Экспорт CSV", command=self.export_clients_csv).pack(side=tk.LEFT, padx=5)
+        self.group_button(frm_buttons, "write", text="Импорт CSV", command=self.import_clients_csv).pack(side=tk.LEFT, padx=5)
+        self.group_button(frm_buttons, "export", text="Экспорт JSON", command=self.export_clients_json).pack(side=tk.LEFT, padx=5)
+        self.group_button(frm_buttons, "write", text="Импорт JSON", command=self.import_clients_json).pack(side=tk.LEFT, padx=5)
         ttk.Button(frm_buttons, text="Обновить список", command=self.load_clients).pack(side=tk.RIGHT)
 
         self.load_clients()
 
-    def validate_email(self, email):
-        pattern = r"[a-zA-Z0-9а-яА-Я._%+-]+@[a-zA-Z0-9а-яА-Я.-]+\.[a-zA-Zа-яА-Я]{2,}"
-        if not re.match(pattern, email):
-            return False
-        return True
-
-    def validate_phone(self, phone):
-        pattern = r"^\+[0-9]{1,11}"
-        if not re.match(pattern, phone):
-            return False
-        return True
+    # Проверки живут в models и не требуют окна; здесь оставлены для совместимости
+    validate_email = staticmethod(validate_email)
+    validate_phone = staticmethod(validate_phone)
 
     def add_client(self):
         name = self.client_name_var.get()
@@ -108,42 +167,65 @@ class App(tk.Tk):
         self.client_name_var.set("")
         self.client_email_var.set("")
         self.client_phone_var.set("")
-        self.load_clients()
-        self.load_clients_for_order()  # обновление списка клиентов в ComboBox в таб Заказы при добавлении нового клиента
+        self.client_tree.refresh()
 
 
     def load_clients(self):
-        for row in self.client_tree.get_children():
-            self.client_tree.delete(row)
-        clients = self.db.get_clients()
-        for c in clients:
-            self.client_tree.insert("", "end", values=(c.id, c.name, c.email, c.phone))
+        self.client_tree.reload()
+
+    def fetch_clients_page(self, after, limit, since=None):
+        clients, next_after = self.db.get_clients_page(after=after, limit=limit, since=since)
+        return [(c.id, (c.id, c.name, c.email, c.phone)) for c in clients], next_after
 
     def export_clients_csv(self):
-        f = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")])
-        if f:
-            self.db.export_clients_csv(f)
-            messagebox.showinfo("Экспорт", "Клиенты экспортированы в CSV")
+        self.export_file("clients", "csv")
 
     def import_clients_csv(self):
-        f = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
-        if f:
-            self.db.import_clients_csv(f)
-            messagebox.showinfo("Импорт", "Клиенты импортированы из CSV")
-            self.load_clients()
+        self.import_file("clients", "csv")
 
     def export_clients_json(self):
-        f = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON files", "*.json")])
-        if f:
-            self.db.export_clients_json(f)
-            messagebox.showinfo("Экспорт", "Клиенты экспортированы в JSON")
+        self.export_file("clients", "json")
+
+    def export_file(self, entity, fmt):
+        """Потоковый экспорт clients/products/orders; файл .gz сжимается на лету."""
+        filetypes = [(f"{fmt.upper()} files", f"*.{fmt}"), (f"{fmt.upper()} gzip", f"*.{fmt}.gz")]
+        f = filedialog.asksaveasfilename(defaultextension=f".{fmt}", filetypes=filetypes)
+        if not f:
+            return
+        self.run_task(lambda job: self.db.export(entity, f, fmt=fmt, progress=job.report),
+                      f"Экспорт {entity}", group="export", error_title="Ошибка экспорта",
+                      on_done=lambda count: messagebox.showinfo("Экспорт", f"Экспортировано записей: {count}"))
 
     def import_clients_json(self):
-        f = filedialog.askopenfilename(filetypes=[("JSON files", "*.json")])
-        if f:
-            self.db.import_clients_json(f)
-            messagebox.showinfo("Импорт", "Клиенты импортированы из JSON")
+        self.import_file("clients", "json")
+
+    def import_file(self, entity, fmt):
+        """Пакетный импорт clients/products/orders из CSV/JSON с отчётом об отклонённых записях."""
+        filetypes = [("CSV files", "*.csv")] if fmt == "csv" else [("JSON files", "*.json"), ("JSON Lines", "*.jsonl")]
+        f = filedialog.askopenfilename(filetypes=filetypes)
+        if not f:
+            return
+        # порции до отмены уже зафиксированы — списки обновляются и в этом случае
+        self.run_task(lambda job: self.db.bulk_import(entity, f, fmt=None if fmt == "json" else fmt,
+                                                      progress=lambda r: job.report(r.imported)),
+                      f"Импорт {entity}", group="write", error_title="Ошибка импорта",
+                      on_done=lambda result: self.import_done(entity, result),
+                      on_cancel=lambda: self.reload_entity(entity))
+
+    def import_done(self, entity, result):
+        message = f"Импортировано: {result.imported}\nОтклонено: {len(result.rejected)}"
+        for number, reason in result.rejected[:10]:
+            message += f"\n  запись {number}: {reason}"
+        messagebox.showinfo("Импорт", message)
+        self.reload_entity(entity)
+
+    def reload_entity(self, entity):
+        if entity == "clients":
             self.load_clients()
+        elif entity == "products":
+            self.load_products()
+        else:
+            self.load_orders()
 
     # ----------------- ТОВАРЫ -------------------
     def create_products_tab(self):
@@ -160,19 +242,25 @@ class App(tk.Tk):
         self.product_price_var = tk.StringVar()
         ttk.Entry(frm_add, textvariable=self.product_price_var).grid(row=1, column=1)
 
-        ttk.Button(frm_add, text="Добавить", command=self.add_product).grid(row=2, column=0, columnspan=2, pady=5)
+        self.group_button(frm_add, "write", text="Добавить", command=self.add_product).grid(row=2, column=0, columnspan=2, pady=5)
 
         frm_list = ttk.LabelFrame(frm, text="Товары")
         frm_list.pack(fill='both', expand=1, padx=5, pady=5)
 
         columns = ("id", "name", "price")
-        self.product_tree = ttk.Treeview(frm_list, columns=columns, show="headings")
+        self.product_tree = PagedTreeview(frm_list, self.fetch_products_page, columns=columns, show="headings")
         for col in columns:
             self.product_tree.heading(col, text=col.title())
             self.product_tree.column(col, anchor=tk.W, width=100)
         self.product_tree.pack(fill='both', expand=1)
 
-        ttk.Button(frm, text="Обновить список", command=self.load_products).pack(side=tk.RIGHT)
+        frm_buttons = ttk.Frame(frm)
+        frm_buttons.pack(fill='x', padx=5, pady=5)
+        self.group_button(frm_buttons, "export", text="Экспорт CSV", command=lambda: self.export_file("products", "csv")).pack(side=tk.LEFT, padx=5)
+        self.group_button(frm_buttons, "write", text="Импорт CSV", command=lambda: self.import_file("products", "csv")).pack(side=tk.LEFT, padx=5)
+        self.group_button(frm_buttons, "export", text="Экспорт JSON", command=lambda: self.export_file("products", "json")).pack(side=tk.LEFT, padx=5)
+        self.group_button(frm_buttons, "write", text="Импорт JSON", command=lambda: self.import_file("products", "json")).pack(side=tk.LEFT, padx=5)
+        ttk.Button(frm_buttons, text="Обновить список", command=self.load_products).pack(side=tk.RIGHT)
         self.load_products()
 
     def add_product(self):
@@ -191,16 +279,15 @@ class App(tk.Tk):
         messagebox.showinfo("Успех", "Продукт добавлен")
         self.product_name_var.set("")
         self.product_price_var.set("")
-        self.load_products()
-        self.load_products_for_order() #обновление списка товаров в ListBox в табе Заказов при создании нового товара
+        self.product_tree.refresh()
 
 
     def load_products(self):
-        for row in self.product_tree.get_children():
-            self.product_tree.delete(row)
-        products = self.db.get_products()
-        for p in products:
-            self.product_tree.insert("", "end", values=(p.id, p.name, f"{p.price:.2f}"))
+        self.product_tree.reload()
+
+    def fetch_products_page(self, after, limit, since=None):
+        products, next_after = self.db.get_products_page(after=after, limit=limit, since=since)
+        return [(p.id, (p.id, p.name, f"{p.price:.2f}")) for p in products], next_after
 
     # ----------------- ЗАКАЗЫ -------------------
     def create_orders_tab(self):
@@ -209,26 +296,38 @@ class App(tk.Tk):
         frm_add = ttk.LabelFrame(frm, text="Создать заказ")
         frm_add.pack(fill='x', padx=5, pady=5)
 
+        # Клиент и товары выбираются поиском по индексу (FTS), а не из списка всей таблицы
         ttk.Label(frm_add, text="Клиент:").grid(row=0, column=0)
-        self.order_client_var = tk.StringVar()
-        self.combobox_clients = ttk.Combobox(frm_add, textvariable=self.order_client_var)
-        self.combobox_clients.grid(row=0, column=1)
-
-        ttk.Label(frm_add, text="Товары:").grid(row=1, column=0)
-        self.products_listbox = tk.Listbox(frm_add, selectmode=tk.MULTIPLE, height=10)
-        self.products_listbox.grid(row=1, column=1)
-
-        ttk.Label(frm_add, text="Кол-во для выбранных товаров (через запятую):").grid(row=2, column=0)
-        self.order_quantities_var = tk.StringVar()
-        ttk.Entry(frm_add, textvariable=self.order_quantities_var).grid(row=2, column=1)
-
-        ttk.Button(frm_add, text="Создать заказ", command=self.add_order).grid(row=3, column=0, columnspan=2, pady=5)
+        self.client_picker = SearchCombobox(frm_add, self.db.suggest_clients, width=40,
+                                            label=lambda c: f"{c.name} <{c.email}>")
+        self.client_picker.grid(row=0, column=1, columnspan=2, sticky=tk.W)
+
+        ttk.Label(frm_add, text="Товар:").grid(row=1, column=0)
+        self.product_picker = SearchCombobox(frm_add, self.db.suggest_products, width=40,
+                                             label=lambda p: f"{p.name} ({p.price:.2f} руб.)")
+        self.product_picker.grid(row=1, column=1, columnspan=2, sticky=tk.W)
+        ttk.Label(frm_add, text="Кол-во:").grid(row=1, column=3)
+        self.order_quantity_var = tk.StringVar(value="1")
+        ttk.Entry(frm_add, textvariable=self.order_quantity_var, width=5).grid(row=1, column=4)
+        ttk.Button(frm_add, text="Добавить товар", command=self.add_order_line).grid(row=1, column=5, padx=5)
+
+        ttk.Label(frm_add, text="Позиции:").grid(row=2, column=0)
+        self.order_lines = []  # OrderItem будущего заказа
+        self.order_lines_listbox = tk.Listbox(frm_add, height=5, width=50)
+        self.order_lines_listbox.grid(row=2, column=1, columnspan=4, sticky=tk.W)
+        ttk.Button(frm_add, text="Убрать", command=self.remove_order_line).grid(row=2, column=5, padx=5)
+
+        self.group_button(frm_add, "write", text="Создать заказ", command=self.add_order).grid(row=3, column=0, columnspan=6, pady=5)
 
         frm_list = ttk.LabelFrame(frm, text="Заказы")
         frm_list.pack(fill='both', expand=1, padx=5, pady=5)
 
         columns = ("id", "client", "items", "total", "created_at")
-        self.order_tree = ttk.Treeview(frm_list, columns=columns, show="headings")
+        # порядок страниц заказов: дата, затем id; заказ без даты — как ifnull(created_at, 0)
+        # в ORDER_PAGE_KEY, то есть начало эпохи
+        self.order_tree = PagedTreeview(frm_list, self.fetch_orders_page, new_rows_at="top",
+                                        sort_key=lambda iid, values: (values[4] or EPOCH, int(iid)),
+                                        columns=columns, show="headings")
         for col in columns:
             self.order_tree.heading(col, text=col.title())
             if col == "items":
@@ -240,110 +339,186 @@ class App(tk.Tk):
         frm_filter = ttk.Frame(frm)
         frm_filter.pack(fill='x', padx=5, pady=5)
 
+        # Поиск при вводе: имя клиента и период (ГГГГ-ММ-ДД, границы включительно)
         ttk.Label(frm_filter, text="Фильтр по имени клиента:").pack(side=tk.LEFT)
         self.filter_client_name_var = tk.StringVar()
         ttk.Entry(frm_filter, textvariable=self.filter_client_name_var).pack(side=tk.LEFT)
-        ttk.Button(frm_filter, text="Применить фильтр", command=self.load_orders).pack(side=tk.LEFT, padx=5)
+        ttk.Label(frm_filter, text="с:").pack(side=tk.LEFT, padx=(5, 0))
+        self.filter_date_from_var = tk.StringVar()
+        ttk.Entry(frm_filter, textvariable=self.filter_date_from_var, width=11).pack(side=tk.LEFT)
+        ttk.Label(frm_filter, text="по:").pack(side=tk.LEFT)
+        self.filter_date_to_var = tk.StringVar()
+        ttk.Entry(frm_filter, textvariable=self.filter_date_to_var, width=11).pack(side=tk.LEFT)
+        for var in (self.filter_client_name_var, self.filter_date_from_var, self.filter_date_to_var):
+            var.trace_add("write", self.schedule_order_search)
+        ttk.Button(frm_filter, text="Применить фильтр", command=self.search_orders).pack(side=tk.LEFT, padx=5)
         ttk.Button(frm_filter, text="Сбросить фильтр", command=self.reset_filter_orders).pack(side=tk.LEFT)
         ttk.Button(frm, text="Обновить список", command=self.load_orders).pack(side=tk.RIGHT)
-
+        self.group_button(frm, "export", text="Экспорт CSV", command=lambda: self.export_file("orders", "csv")).pack(side=tk.LEFT, padx=5)
+        self.group_button(frm, "write", text="Импорт CSV", command=lambda: self.import_file("orders", "csv")).pack(side=tk.LEFT, padx=5)
+        self.group_button(frm, "export", text="Экспорт JSON", command=lambda: self.export_file("orders", "json")).pack(side=tk.LEFT, padx=5)
+        self.group_button(frm, "write", text="Импорт JSON", command=lambda: self.import_file("orders", "json")).pack(side=tk.LEFT, padx=5)
+
+        self.order_filters_applied = None
+        self._search_timer = None
+        self._search_job = None
         self.load_orders()
-        self.load_clients_for_order()
-        self.load_products_for_order()
 
-    def load_clients_for_order(self):
-        clients = self.db.get_clients()
-        self.clients_map = {str(c.id): c for c in clients}
-        self.combobox_clients["values"] = [f"{c.id} - {c.name}" for c in clients]
-
-    def load_products_for_order(self):
-        products = self.db.get_products()
-        self.products_map = {p.id: p for p in products}
-        self.products_listbox.delete(0, tk.END)
-        for p in products:
-            self.products_listbox.insert(tk.END, f"{p.id} - {p.name} ({p.price:.2f} руб.)")
-
-    def add_order(self):
-        selected_client = self.order_client_var.get()
-        if not selected_client:
-            messagebox.showerror("Ошибка", "Выберите клиента")
-            return
-        client_id = selected_client.split(" - ")[0]
-        client = None
-        for c in self.db.get_clients():
-            if str(c.id) == client_id:
-                client = c
-                break
-        if not client:
-            messagebox.showerror("Ошибка", "Клиент не найден")
-            return
-
-        selected_indices = list(self.products_listbox.curselection())
-        if not selected_indices:
-            messagebox.showerror("Ошибка", "Выберите товары")
-            return
-
-        quantities_text = self.order_quantities_var.get()
-        quantities = []
-        if quantities_text:
-            quantities = [q.strip() for q in quantities_text.split(",")]
-        if quantities and len(quantities) != len(selected_indices):
-            messagebox.showerror("Ошибка", "Количество чисел не совпадает с количеством выбранных товаров")
+    def add_order_line(self):
+        product = self.product_picker.selected
+        if product is None:
+            messagebox.showerror("Ошибка", "Выберите товар из списка")
             return
         try:
-            quantities = list(map(int, quantities)) if quantities else [1] * len(selected_indices)
-        except:
+            quantity = int(self.order_quantity_var.get())
+        except ValueError:
             messagebox.showerror("Ошибка", "Кол-во товаров должно быть числом")
             return
-
-        items = []
-        for idx, q in zip(selected_indices, quantities):
-            product_str = self.products_listbox.get(idx)
-            product_id = int(product_str.split(" - ")[0])
-            product = self.products_map.get(product_id)
-            if product and q > 0:
-                items.append(OrderItem(product, q))
-
-        if not items:
+        if quantity <= 0:
             messagebox.showerror("Ошибка", "Количество товаров должно быть больше нуля")
             return
+        for index, item in enumerate(self.order_lines):
+            if item.product.id == product.id:  # тот же товар — увеличивается количество
+                item.quantity += quantity
+                self.order_lines_listbox.delete(index)
+                self.order_lines_listbox.insert(index, self.order_line_label(item))
+                break
+        else:
+            item = OrderItem(product, quantity)
+            self.order_lines.append(item)
+            self.order_lines_listbox.insert(tk.END, self.order_line_label(item))
+        self.product_picker.clear()
+        self.order_quantity_var.set("1")
+
+    @staticmethod
+    def order_line_label(item):
+        return f"{item.product.name} x{item.quantity} ({item.product.price * item.quantity:.2f} руб.)"
+
+    def remove_order_line(self):
+        for index in reversed(self.order_lines_listbox.curselection()):
+            self.order_lines_listbox.delete(index)
+            del self.order_lines[index]
 
-        order = Order(client=client, items=items)
+    def add_order(self):
+        client = self.client_picker.selected
+        if client is None:
+            messagebox.showerror("Ошибка", "Выберите клиента из списка")
+            return
+        if not self.order_lines:
+            messagebox.showerror("Ошибка", "Добавьте товары")
+            return
+
+        order = Order(client=client, items=list(self.order_lines))
         self.db.add_order(order)
         messagebox.showinfo("Успех", f"Заказ №{order.id} создан")
-        self.order_quantities_var.set("")
-        self.load_orders()
+        self.order_lines.clear()
+        self.order_lines_listbox.delete(0, tk.END)
+        self.order_tree.refresh()
 
     def load_orders(self):
-         for row in self.order_tree.get_children():
-             self.order_tree.delete(row)
-         filter_name = self.filter_client_name_var.get()
-         filters = {"client_name": filter_name} if filter_name else None
-         orders = self.db.get_orders(filters=filters, order_by="created_at DESC")
-         print(*orders)
-         for o in orders:
-             items_str = ", ".join([f"{item.product.name} x{item.quantity}" for item in o.items])
-             self.order_tree.insert("", "end", values=(o.id, o.client.name if o.client else "unknown", items_str, f"{o.total():.2f} руб.", o.created_at))
+        self.order_tree.reload()
+
+    def fetch_orders_page(self, after, limit, since=None):
+        # страницы при прокрутке берутся с фильтрами последнего выполненного поиска
+        return self.order_rows(*self.db.get_orders_page(after=after, limit=limit, filters=self.order_filters_applied,
+                                                        since=since))
+
+    @staticmethod
+    def order_rows(orders, next_after):
+        rows = []
+        for o in orders:
+            items_str = ", ".join([f"{item.product.name} x{item.quantity}" for item in o.items])
+            rows.append((o.id, (o.id, o.client.name if o.client else "unknown", items_str, f"{o.total():.2f} руб.", o.created_at or "")))
+        return rows, next_after
+
+    def order_filters(self):
+        """Фильтры заказов из полей поиска; недописанная дата пока не учитывается."""
+        filters = {}
+        name = self.filter_client_name_var.get().strip()
+        if name:
+            filters["client_name"] = name
+        for key, var, day_time in (("date_from", self.filter_date_from_var, time(0, 0, 0)),
+                                   ("date_to", self.filter_date_to_var, time(23, 59, 59))):
+            try:
+                filters[key] = datetime.combine(date.fromisoformat(var.get().strip()), day_time)
+            except ValueError:
+                pass
+        return filters or None
+
+    def schedule_order_search(self, *args):
+        """Поиск при вводе: запрос уходит через SEARCH_DELAY_MS после последнего изменения полей."""
+        if self._search_timer is not None:
+            self.after_cancel(self._search_timer)
+        self._search_timer = self.after(SEARCH_DELAY_MS, self.search_orders)
+
+    def search_orders(self):
+        """Первая страница заказов по фильтрам — в фоне; устаревший поиск прерывается прямо в SQLite."""
+        if self._search_timer is not None:
+            self.after_cancel(self._search_timer)
+            self._search_timer = None
+        if self._search_job is not None:
+            self._search_job.cancel()
+        filters = self.order_filters()
+        limit = self.order_tree.page_size
+
+        def search(job):
+            with self.db.interruptible(lambda: job.cancelled):
+                return self.order_rows(*self.db.get_orders_page(limit=limit, filters=filters))
+
+        self._search_job = self.run_task(search, "Поиск заказов", group="search", error_title="Ошибка поиска",
+                                         on_done=lambda page: self.show_orders(filters, page))
+
+    def show_orders(self, filters, page):
+        self.order_filters_applied = filters
+        self.order_tree.show_first_page(*page)
 
     def reset_filter_orders(self):
-        self.filter_client_name_var.set("")
-        self.load_orders()
+        for var in (self.filter_client_name_var, self.filter_date_from_var, self.filter_date_to_var):
+            var.set("")
+        self.search_orders()
 
     # ------------- АНАЛИЗ --------------
     def create_analysis_tab(self):
         frm = self.tab_analysis
-        ttk.Button(frm, text="Динамика продаж по дням", command=self.show_sales_over_time).pack(pady=10)
-        ttk.Button(frm, text="Топ товаров", command=self.show_top_products).pack(pady=10)
-        ttk.Button(frm, text="Граф связей клиентов", command=self.show_graph_relationship).pack(pady=10)
-
-    def show_sales_over_time(self):
-        orders = self.db.get_orders()
-        analysis.sales_over_time(orders)
-
-    def show_top_products(self):
-        df = self.db.get_top5_products()
-        analysis.top5_products(df)
-
-    def show_graph_relationship(self):
-        orders = self.db.get_orders()
-        analysis.graph_relationship(orders)
\ No newline at end of file
+        frm_buttons = ttk.Frame(frm)
+        frm_buttons.pack(fill=tk.X, pady=10)
+        for name, (title, _) in charts.CHARTS.items():
+            self.group_button(frm_buttons, "chart", text=title,
+                              command=lambda name=name: self.show_chart(name)).pack(side=tk.LEFT, padx=5)
+        ttk.Button(frm_buttons, text="Сохранить график", command=self.save_chart).pack(side=tk.RIGHT, padx=5)
+
+        self.chart_area = ttk.Frame(frm)
+        self.chart_area.pack(fill=tk.BOTH, expand=True)
+        self.chart_cache = charts.ChartCache(self.db)
+        self.chart_canvases = {}
+        self.current_chart = None
+
+    def show_chart(self, name):
+        """График во вкладке «Анализ»: строится в фоне; при неизменных данных показывается уже отрисованный."""
+        self.run_task(lambda job: self.chart_cache.get(name), charts.CHARTS[name][0], group="chart",
+                      error_title="Ошибка анализа", on_done=lambda figure: self.show_figure(name, figure))
+
+    def show_figure(self, name, figure):
+        # холст Tk создаётся только в главном потоке
+        canvas = self.chart_canvases.get(name)
+        if canvas is None or canvas.figure is not figure:
+            # matplotlib загружается при первом графике, а не при запуске приложения
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+            if canvas is not None:
+                canvas.get_tk_widget().destroy()
+            canvas = FigureCanvasTkAgg(figure, master=self.chart_area)
+            canvas.draw()
+            self.chart_canvases[name] = canvas
+        if self.current_chart is not None and self.current_chart is not canvas:
+            self.current_chart.get_tk_widget().pack_forget()
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.current_chart = canvas
+
+    def save_chart(self):
+        if self.current_chart is None:
+            messagebox.showinfo("Сохранение", "Сначала постройте график")
+            return
+        f = filedialog.asksaveasfilename(defaultextension=".png",
+                                         filetypes=[("PNG", "*.png"), ("SVG", "*.svg"), ("PDF", "*.pdf")])
+        if f:
+            self.current_chart.figure.savefig(f)
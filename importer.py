@@ -0,0 +1,339 @@
+"""
+Пакетный импорт клиентов, товаров и заказов из CSV/JSON.
+
+Файл читается потоково, записи проверяются и вставляются порциями через executemany —
+одна транзакция на порцию. Некорректные записи не прерывают импорт, а попадают в
+список отклонённых с номером записи и причиной.
+
+Форматы:
+    clients  — name, email, phone, created_at (необязательно)
+    products — name, price, created_at (необязательно)
+    orders   — JSON: {"client_id" | "client_email", "created_at", "items": [{"product_id" | "product_name", "quantity"}]}
+               CSV: одна строка на позицию — order_id, client_id | client_email, created_at,
+               product_id | product_name, quantity; подряд идущие строки с одинаковым order_id
+               образуют один заказ (order_id из файла используется только для группировки).
+               Клиент и товар ищутся по client_email и product_name, а по id — только если
+               ключа нет: id из другой базы может принадлежать другой записи. Заказ без позиций
+               допустим: в JSON — пустой items, в CSV — строка без product_id и product_name.
+"""
+import csv
+import gzip
+import json
+import os
+from datetime import datetime
+
+from models import to_timestamp
+
+ENTITIES = ("clients", "products", "orders")
+DEFAULT_CHUNK_SIZE = 5000
+
+
+class ImportResult:
+    """Итог импорта: сколько записей загружено и какие отклонены."""
+
+    def __init__(self, entity):
+        self.entity = entity
+        self.imported = 0
+        self.rejected = []  # список (номер записи, причина)
+
+    def reject(self, number, reason):
+        self.rejected.append((number, reason))
+
+    def __str__(self):
+        return f"{self.entity}: импортировано {self.imported}, отклонено {len(self.rejected)}"
+
+
+def detect_format(filepath):
+    """Формат файла по расширению (без учёта .gz): csv, json или jsonl; общий для импорта и экспорта."""
+    name = filepath[:-3] if filepath.lower().endswith(".gz") else filepath
+    ext = os.path.splitext(name)[1].lower().lstrip(".")
+    if ext in ("csv", "json", "jsonl"):
+        return ext
+    raise ValueError(f"Неизвестный формат файла: {filepath}")
+
+
+def iter_json_array(f, buffer_size=1 << 16):
+    """
+    Потоковое чтение JSON-массива объектов без загрузки всего документа в память.
+
+    Args:
+        f: текстовый файл, содержащий JSON-массив.
+        buffer_size (int): размер читаемого блока в символах.
+
+    Yields:
+        элементы массива.
+    """
+    decoder = json.JSONDecoder()
+    buf = f.read(buffer_size).lstrip()
+    if not buf.startswith("["):
+        raise ValueError("Ожидался JSON-массив")
+    pos = 1
+    eof = False
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = f.read(buffer_size)
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+        yield item
+        pos = end
+
+
+def iter_records(filepath, fmt=None):
+    """Записи файла в виде словарей (CSV, JSON-массив или JSON Lines); файлы .gz распаковываются на лету."""
+    fmt = fmt or detect_format(filepath)
+    opener = gzip.open if filepath.lower().endswith(".gz") else open
+    with opener(filepath, "rt", newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        elif fmt == "json":
+            yield from iter_json_array(f)
+        elif fmt == "jsonl":
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError(f"Неизвестный формат: {fmt}")
+
+
+def _created_at(record):
+    value = record.get("created_at")
+    if not value:
+        return to_timestamp(datetime.now())
+    return to_timestamp(datetime.fromisoformat(str(value)))
+
+
+def _client_row(record):
+    name = (record.get("name") or "").strip()
+    if not name:
+        raise ValueError("не указано имя клиента")
+    return name, record.get("email") or "", record.get("phone") or "", _created_at(record)
+
+
+def _product_row(record):
+    name = (record.get("name") or "").strip()
+    if not name:
+        raise ValueError("не указано название товара")
+    price = float(record.get("price", 0.0))
+    if price < 0:
+        raise ValueError("отрицательная цена")
+    return name, price, _created_at(record)
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class BulkImporter:
+    """
+    Загрузчик записей в базу порциями.
+
+    Args:
+        conn (sqlite3.Connection): соединение с базой.
+        chunk_size (int): количество записей (для заказов — заказов) в одной транзакции.
+        progress (callable): вызывается после каждой порции как progress(result).
+        atomic (bool): весь импорт в одной транзакции — при ошибке база остаётся без изменений.
+    """
+
+    def __init__(self, conn, chunk_size=DEFAULT_CHUNK_SIZE, progress=None, atomic=False):
+        self.conn = conn
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.atomic = atomic
+
+    def run(self, entity, records):
+        """
+        Импорт записей одной сущности.
+
+        Args:
+            entity (str): clients, products или orders.
+            records: итерируемые словари-записи.
+
+        Returns:
+            ImportResult
+        """
+        if entity not in ENTITIES:
+            raise ValueError(f"Неизвестная сущность: {entity}")
+        result = ImportResult(entity)
+        if entity == "orders":
+            records = self._group_order_rows(records)
+        load_chunk = getattr(self, f"_load_{entity}")
+
+        cur = self.conn.cursor()
+        if self.atomic:
+            cur.execute("BEGIN IMMEDIATE")
+        try:
+            for chunk in _chunks(enumerate(records, 1), self.chunk_size):
+                if not self.atomic:
+                    cur.execute("BEGIN IMMEDIATE")
+                load_chunk(cur, chunk, result)
+                if not self.atomic:
+                    self.conn.commit()
+                if self.progress:
+                    self.progress(result)
+            if self.atomic:
+                self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        return result
+
+    def _validated(self, chunk, result, make_row):
+        rows = []
+        for number, record in chunk:
+            try:
+                rows.append(make_row(record))
+            except (ValueError, TypeError, AttributeError) as e:
+                result.reject(number, str(e))
+        return rows
+
+    def _load_clients(self, cur, chunk, result):
+        rows = self._validated(chunk, result, _client_row)
+        cur.executemany("INSERT INTO clients (name, email, phone, created_at) VALUES (?, ?, ?, ?)", rows)
+        result.imported += len(rows)
+
+    def _load_products(self, cur, chunk, result):
+        rows = self._validated(chunk, result, _product_row)
+        cur.executemany("INSERT INTO products (name, price, created_at) VALUES (?, ?, ?)", rows)
+        result.imported += len(rows)
+
+    @staticmethod
+    def _group_order_rows(records):
+        """Строки CSV «одна позиция — одна строка» склеиваются в заказы с items."""
+        current_key = None
+        current = None
+        for record in records:
+            if "items" in record:
+                if current is not None:
+                    yield current
+                    current, current_key = None, None
+                yield record
+                continue
+            key = record.get("order_id") or record.get("id")
+            if current is None or not key or key != current_key:
+                if current is not None:
+                    yield current
+                current = {k: v for k, v in record.items()
+                           if k not in ("product_id", "product_name", "quantity")}
+                current["items"] = []
+                current_key = key
+            if not record.get("product_id") and not record.get("product_name"):
+                continue  # строка заказа без позиций
+            item = {"product_id": record.get("product_id"), "product_name": record.get("product_name")}
+            if "quantity" in record:  # без колонки quantity — по одной штуке
+                item["quantity"] = record["quantity"]
+            current["items"].append(item)
+        if current is not None:
+            yield current
+
+    def _resolve(self, cur, table, ids, natural_key, keys):
+        """
+        Естественные ключи существующих id (id -> email клиента, название товара) и обратное
+        соответствие естественный ключ -> id.
+        """
+        key_by_id = {}
+        ids = list(ids)
+        for start in range(0, len(ids), 900):
+            part = ids[start:start + 900]
+            cur.execute(f"SELECT id, {natural_key} FROM {table} WHERE id IN ({','.join('?' * len(part))})", part)
+            key_by_id.update((row[0], row[1]) for row in cur)
+        by_key = {}
+        keys = list(keys)
+        for start in range(0, len(keys), 900):
+            part = keys[start:start + 900]
+            cur.execute(f"SELECT {natural_key}, MIN(id) FROM {table} "
+                        f"WHERE {natural_key} IN ({','.join('?' * len(part))}) GROUP BY {natural_key}", part)
+            by_key.update((row[0], row[1]) for row in cur)
+        return key_by_id, by_key
+
+    @staticmethod
+    def _reference(record, id_field, key_field, key_by_id, by_key, what):
+        """
+        id строки базы для ссылки записи. Естественный ключ (email, название) переносим между
+        базами и имеет приоритет; id из файла используется, только если ключа нет. Если id
+        есть в базе, но указывает на строку с другим ключом, запись отклоняется.
+        """
+        value = record.get(id_field)
+        row_id = int(value) if value not in (None, "") else None
+        key = record.get(key_field)
+        if not key:
+            if row_id not in key_by_id:
+                raise ValueError(f"{what} не найден")
+            return row_id
+        if row_id in key_by_id:
+            if key_by_id[row_id] != key:
+                raise ValueError(f"{id_field} {row_id} и {key_field} {key!r} указывают на разные записи")
+            return row_id
+        if key not in by_key:
+            raise ValueError(f"{what} не найден")
+        return by_key[key]
+
+    def _load_orders(self, cur, chunk, result):
+        def to_int(value):
+            return int(value) if value not in (None, "") else None
+
+        client_ids, emails, product_ids, names = set(), set(), set(), set()
+        for _, record in chunk:
+            try:
+                if record.get("client_email"):
+                    emails.add(record["client_email"])
+                client_ids.add(to_int(record.get("client_id")))
+                for item in record.get("items") or []:
+                    if item.get("product_name"):
+                        names.add(item["product_name"])
+                    product_ids.add(to_int(item.get("product_id")))
+            except (ValueError, TypeError, AttributeError):
+                continue  # запись будет отклонена ниже с понятной причиной
+        client_ids.discard(None)
+        product_ids.discard(None)
+        client_emails, clients_by_email = self._resolve(cur, "clients", client_ids, "email", emails)
+        product_names, products_by_name = self._resolve(cur, "products", product_ids, "name", names)
+
+        # id заказов не переиспользуются, как при AUTOINCREMENT: после удаления последних заказов
+        # счётчик sqlite_sequence больше MAX(id), и иначе новые заказы получили бы старые id
+        next_id = cur.execute("""SELECT max(ifnull((SELECT seq FROM sqlite_sequence WHERE name = 'orders'), 0),
+                                            ifnull((SELECT MAX(id) FROM orders), 0))""").fetchone()[0] + 1
+        order_rows = []
+        item_rows = []
+        for number, record in chunk:
+            try:
+                client_id = self._reference(record, "client_id", "client_email", client_emails, clients_by_email,
+                                            "клиент")
+                items = []
+                for item in record.get("items") or []:
+                    product_id = self._reference(item, "product_id", "product_name", product_names, products_by_name,
+                                                 "товар")
+                    quantity = item.get("quantity", 1)
+                    if quantity in (None, ""):
+                        raise ValueError("не указано количество")
+                    quantity = int(quantity)
+                    if quantity <= 0:
+                        raise ValueError("количество должно быть больше нуля")
+                    items.append((product_id, quantity))
+                created_at = _created_at(record)
+            except (ValueError, TypeError, AttributeError) as e:
+                result.reject(number, str(e))
+                continue
+            order_rows.append((next_id, client_id, created_at))
+            item_rows.extend((next_id, product_id, quantity) for product_id, quantity in items)
+            next_id += 1
+
+        cur.executemany("INSERT INTO orders (id, client_id, created_at) VALUES (?, ?, ?)", order_rows)
+        cur.executemany("INSERT INTO order_items (order_id, product_id, quantity) VALUES (?, ?, ?)", item_rows)
+        result.imported += len(order_rows)
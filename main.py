@@ -1,8 +1,14 @@
-from gui import App
+import sys
+
 
 def main():
+    # С аргументами — командная строка (cli.py), без них — графический интерфейс
+    if len(sys.argv) > 1:
+        import cli
+        sys.exit(cli.main())
+    from gui import App
     app = App()
     app.mainloop()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
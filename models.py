@@ -1,11 +1,62 @@
-from datetime import datetime
+import re
+from datetime import datetime, date, time, timedelta, timezone
+
+# Даты в базе хранятся целыми секундами от начала эпохи Unix. Время без часового пояса
+# записывается как есть (так же, как раньше в ISO-строках), с поясом — переводится в UTC.
+EPOCH = datetime(1970, 1, 1)
+SECOND = timedelta(seconds=1)
+
+
+def to_timestamp(value):
+    """Дата (datetime, date, ISO-строка или число секунд) -> целое число секунд для базы."""
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    elif not isinstance(value, datetime) and isinstance(value, date):
+        value = datetime.combine(value, time())
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - EPOCH) // SECOND
+
+
+def from_timestamp(value):
+    """Значение created_at из базы (секунды или ISO-строка старого формата) -> datetime."""
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return EPOCH + timedelta(seconds=value)
+
+
+# Проверка контактных данных клиента (используется формой интерфейса, не требует Tk)
+EMAIL_PATTERN = re.compile(r"[a-zA-Z0-9а-яА-Я._%+-]+@[a-zA-Z0-9а-яА-Я.-]+\.[a-zA-Zа-яА-Я]{2,}")
+PHONE_PATTERN = re.compile(r"^\+[0-9]{1,11}")
+
+
+def validate_email(email):
+    """Похож ли email на адрес вида имя@домен.зона."""
+    return EMAIL_PATTERN.match(email) is not None
+
+
+def validate_phone(phone):
+    """Начинается ли телефон с '+' и цифр."""
+    return PHONE_PATTERN.match(phone) is not None
+
 
 class BaseEntity():
     """Базовый абстрактный класс с id и датой создания."""
 
+    # __slots__ во всех сущностях: без __dict__ у каждого объекта миллион заказов занимает в разы меньше памяти
+    __slots__ = ("_id", "_created_at")
+
     def __init__(self, id=None, created_at=None):
         self._id = id
-        self._created_at = created_at or datetime.now()
+        # created_at — datetime: строки и секунды из базы приводятся здесь, в одном месте;
+        # без даты — момент создания объекта (строки базы с NULL оставляет None сам DB)
+        self._created_at = from_timestamp(created_at) or datetime.now().replace(microsecond=0)
 
     @property
     def id(self):
@@ -24,6 +75,8 @@ class BaseEntity():
 
 
 class Client(BaseEntity):
+    __slots__ = ("name", "email", "phone")
+
     def __init__(self, id=None, name="", email="", phone="", created_at=None):
         super().__init__(id, created_at)
         self.name = name
@@ -51,6 +104,8 @@ class Client(BaseEntity):
 
 
 class Product(BaseEntity):
+    __slots__ = ("name", "price")
+
     def __init__(self, id=None, name="", price=0.0, created_at=None):
         super().__init__(id, created_at)
         self.name = name
@@ -61,7 +116,7 @@ class Product(BaseEntity):
             "id": self._id,
             "name": self.name,
             "price": self.price,
-            "created_at": self._created_at.isoformat(),
+            "created_at": self._created_at.isoformat() if self._created_at else None,
         }
     def get_name(self):
         return self.name
@@ -79,6 +134,8 @@ class Product(BaseEntity):
 class OrderItem:
     """Связь заказа и товаров: продукт, количество"""
 
+    __slots__ = ("product", "quantity")
+
     def __init__(self, product: Product, quantity=1):
         self.product = product
         self.quantity = quantity
@@ -94,13 +151,38 @@ class OrderItem:
 
 
 class Order(BaseEntity):
+    __slots__ = ("client", "_items", "_total")
+
     def __init__(self, id=None, client: Client = None, items=None, created_at=None):
         super().__init__(id, created_at)
         self.client = client
-        self.items = items or []  # список OrderItem
+        self.items = items or ()
+
+    @property
+    def items(self):
+        """Позиции заказа (кортеж OrderItem); изменяются присваиванием, add_item или remove_item."""
+        return self._items
+
+    @items.setter
+    def items(self, items):
+        self._items = tuple(items)
+        self._total = None
+
+    def add_item(self, item: OrderItem):
+        self.items = self._items + (item,)
+
+    def remove_item(self, item: OrderItem):
+        self.items = tuple(i for i in self._items if i is not item)
+
+    def invalidate_total(self):
+        """Сброс сохранённой суммы — если цена товара или количество в позиции изменились."""
+        self._total = None
 
     def total(self):
-        return sum(item.product.price * item.quantity for item in self.items)
+        # сумма считается один раз и сбрасывается при изменении позиций
+        if self._total is None:
+            self._total = sum(item.product.price * item.quantity for item in self._items)
+        return self._total
 
     def to_dict(self):
         return {
@@ -0,0 +1,202 @@
+"""
+Колоночный снимок заказов для аналитики.
+
+Вместо графа объектов Order/OrderItem позиции заказов хранятся в виде столбцов NumPy
+(DataFrame pandas), а суммы, группировки и разбивка по дням считаются векторно.
+"""
+import numpy as np
+import pandas as pd
+
+from models import to_timestamp
+
+# Позиций order_items за один запрос при загрузке
+LOAD_CHUNK = 1_000_000
+
+
+def _fetch_ints(conn, query, params, width):
+    """
+    Целочисленные столбцы результата запроса в виде массива (n, width).
+
+    Запрос должен вернуть одну строку с group_concat(..., ',') всех значений: строка
+    собирается внутри SQLite и разбирается np.fromstring, поэтому на Python не создаются
+    объекты для каждой ячейки — это в разы быстрее fetchall/read_sql_query.
+    """
+    text = conn.execute(query, params).fetchone()[0]
+    if not text:
+        return np.empty((0, width), dtype=np.int64)
+    return np.fromstring(text, dtype=np.int64, sep=",").reshape(-1, width)
+
+
+class OrderFrame:
+    """
+    Снимок заказов: по строке на позицию заказа.
+
+    Столбцы lines: order_id, client_id, product_id, quantity, price (цена за единицу),
+    created_at (datetime64). В orders — по строке на заказ (order_id, client_id, created_at),
+    включая заказы без позиций. Время хранится с точностью до секунды.
+
+    Args:
+        orders (pd.DataFrame): заказы.
+        lines (pd.DataFrame): позиции заказов.
+        clients (pd.Series): имена клиентов по id.
+        products (pd.Series): названия товаров по id.
+    """
+
+    def __init__(self, orders, lines, clients, products):
+        self.orders = orders
+        self.lines = lines
+        self.clients = clients
+        self.products = products
+
+    @classmethod
+    def from_db(cls, conn, date_from=None, date_to=None):
+        """
+        Загрузка снимка из базы.
+
+        Args:
+            conn (sqlite3.Connection): соединение с базой.
+            date_from (str): начало периода по created_at заказа (включительно).
+            date_to (str): конец периода по created_at заказа (включительно).
+
+        Returns:
+            OrderFrame: снимок заказов.
+        """
+        clauses = []
+        params = []
+        if date_from:
+            clauses.append("created_at >= ?")
+            params.append(to_timestamp(date_from))
+        if date_to:
+            clauses.append("created_at <= ?")
+            params.append(to_timestamp(date_to))
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+
+        orders = _fetch_ints(conn, """SELECT group_concat(id || ',' || ifnull(client_id, -1) || ','
+                                                          || ifnull(created_at, 0), ',')
+                                      FROM orders""" + where, params, 3)
+        orders = orders[np.argsort(orders[:, 0], kind="stable")]
+
+        # Позиции читаются диапазонами id, чтобы строка group_concat оставалась умеренной
+        selected = f" AND order_id IN (SELECT id FROM orders{where})" if where else ""
+        max_id = conn.execute("SELECT ifnull(max(id), 0) FROM order_items").fetchone()[0]
+        chunks = [_fetch_ints(conn, """SELECT group_concat(order_id || ',' || product_id || ',' || quantity, ',')
+                                       FROM order_items WHERE id > ? AND id <= ?""" + selected,
+                              [start, start + LOAD_CHUNK] + params, 3)
+                  for start in range(0, max_id, LOAD_CHUNK)]
+        items = np.concatenate(chunks) if chunks else np.empty((0, 3), dtype=np.int64)
+
+        product_rows = conn.execute("SELECT id, name, price FROM products ORDER BY id").fetchall()
+        product_ids = np.array([row[0] for row in product_rows], dtype=np.int64)
+        prices = np.array([row[2] or 0.0 for row in product_rows], dtype=np.float64)
+        products = pd.Series([row[1] for row in product_rows], index=product_ids, dtype=object)
+        clients = conn.execute("SELECT id, name FROM clients").fetchall()
+        clients = pd.Series([row[1] for row in clients], index=[row[0] for row in clients], dtype=object)
+
+        # Позиции удалённых товаров и заказов вне выборки отбрасываются, как в DB.get_orders
+        price_pos = np.searchsorted(product_ids, items[:, 1]).clip(max=max(len(product_ids) - 1, 0))
+        order_pos = np.searchsorted(orders[:, 0], items[:, 0]).clip(max=max(len(orders) - 1, 0))
+        known = np.zeros(len(items), dtype=bool)
+        if len(product_ids) and len(orders):
+            known = (product_ids[price_pos] == items[:, 1]) & (orders[order_pos, 0] == items[:, 0])
+        items, price_pos, order_pos = items[known], price_pos[known], order_pos[known]
+
+        created_at = orders[:, 2].astype("datetime64[s]")  # секунды эпохи — без разбора строк
+        orders_df = pd.DataFrame({
+            "order_id": orders[:, 0],
+            "client_id": orders[:, 1],
+            "created_at": created_at,
+        })
+        lines = pd.DataFrame({
+            "order_id": items[:, 0],
+            "client_id": orders[order_pos, 1],
+            "product_id": items[:, 1],
+            "quantity": items[:, 2],
+            "price": prices[price_pos],
+            "created_at": created_at[order_pos],
+        })
+        return cls(orders_df, lines, clients, products)
+
+    def __len__(self):
+        return len(self.lines)
+
+    @property
+    def order_count(self):
+        return len(self.orders)
+
+    def line_totals(self):
+        """Стоимость каждой позиции: количество × цена."""
+        return self.lines["quantity"] * self.lines["price"]
+
+    def total(self):
+        """Общая выручка по всем позициям."""
+        return float(self.line_totals().sum())
+
+    def order_totals(self):
+        """Сумма каждого заказа (Series по order_id); у заказов без позиций — 0."""
+        totals = self.line_totals().groupby(self.lines["order_id"]).sum()
+        return totals.reindex(self.orders["order_id"], fill_value=0.0)
+
+    def sales_by_period(self, freq="D"):
+        """
+        Выручка по периодам.
+
+        Args:
+            freq (str): частота pandas: 'D' — дни, 'W' — недели, 'MS' — месяцы и т.д.
+
+        Returns:
+            pd.Series: выручка по началу периода, без пропусков между первым и последним.
+        """
+        return self._sales_by_day().resample(freq).sum()
+
+    def daily_sales(self):
+        """Выручка по дням, как DB.get_daily_sales: список пар (день 'YYYY-MM-DD', выручка)."""
+        sales = self._sales_by_day()
+        return list(zip(sales.index.strftime("%Y-%m-%d"), sales.to_numpy().tolist()))
+
+    def _sales_by_day(self):
+        # Округление до дня в numpy без промежуточных строк
+        days = self.lines["created_at"].to_numpy().astype("datetime64[D]")
+        sales = self.line_totals().groupby(days).sum()
+        sales.index = pd.DatetimeIndex(sales.index)
+        return sales
+
+    def client_order_counts(self):
+        """Количество заказов каждого клиента (Series по client_id, без заказов без клиента)."""
+        counts = self.orders["client_id"].value_counts()
+        return counts[counts.index >= 0]
+
+    def top_clients(self, limit=5):
+        """
+        Клиенты с наибольшим количеством заказов — в формате DB.get_top5_products.
+
+        Returns:
+            pd.DataFrame: столбцы name, order_count.
+        """
+        counts = self.client_order_counts()
+        counts = counts[counts.index.isin(self.clients.index)].nlargest(limit)
+        return pd.DataFrame({"name": self.clients.reindex(counts.index).to_numpy(),
+                             "order_count": counts.to_numpy()})
+
+    def product_sales(self, limit=None):
+        """
+        Продажи товаров по убыванию количества.
+
+        Returns:
+            pd.DataFrame: столбцы product_id, name, quantity, revenue.
+        """
+        sales = pd.DataFrame({"quantity": self.lines["quantity"], "revenue": self.line_totals()}) \
+            .groupby(self.lines["product_id"]).sum().sort_values("quantity", ascending=False, kind="stable")
+        if limit is not None:
+            sales = sales.head(limit)
+        sales.insert(0, "name", self.products.reindex(sales.index).to_numpy())
+        return sales.rename_axis("product_id").reset_index()
+
+    def edges(self):
+        """
+        Связи клиент — товар с суммарным количеством.
+
+        Returns:
+            pd.DataFrame: столбцы client_id, product_id, quantity.
+        """
+        lines = self.lines[self.lines["client_id"] >= 0]
+        return lines.groupby(["client_id", "product_id"], sort=False)["quantity"].sum().reset_index()
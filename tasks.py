@@ -0,0 +1,180 @@
+"""
+Фоновое выполнение долгих операций (импорт, экспорт, аналитика) вне главного потока Tk.
+
+Задачи выполняются в пуле потоков; результаты, ошибки и прогресс складываются в очередь,
+которую главный поток разбирает по таймеру after(), — виджеты трогает только он.
+Модуль не импортирует tkinter: без виджета очередь разбирается вызовом poll() или wait().
+"""
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Период разбора очереди результатов, мс
+POLL_MS = 30
+WORKERS = 2
+
+
+class Cancelled(Exception):
+    """Задача отменена: выбрасывается из Job.check в рабочем потоке."""
+
+
+class Job:
+    """
+    Задача, запущенная TaskRunner.submit.
+
+    Args:
+        runner (TaskRunner): пул, в котором выполняется задача.
+        name (str): описание для строки состояния.
+        group (str): группа конфликтующих действий (например, 'write' — запись в базу).
+    """
+
+    def __init__(self, runner, name, group):
+        self.runner = runner
+        self.name = name
+        self.group = group
+        self.done = False
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        """Запрос отмены; задача останавливается в ближайшей точке check/report."""
+        self._cancel.set()
+
+    def check(self):
+        """Точка отмены: вызывается в рабочем потоке между порциями работы."""
+        if self._cancel.is_set():
+            raise Cancelled(self.name)
+
+    def report(self, value):
+        """Прогресс из рабочего потока (передаётся в on_progress); заодно точка отмены."""
+        self.check()
+        self.runner._queue.put((self, "progress", value))
+
+
+class TaskRunner:
+    """
+    Пул рабочих потоков с доставкой результатов в главный поток.
+
+    Args:
+        widget: виджет Tk (или интерпретатор tkinter.Tcl) для опроса очереди через after();
+            None — очередь разбирается явными вызовами poll()/wait().
+        workers (int): число рабочих потоков.
+        poll_ms (int): период опроса очереди, мс.
+    """
+
+    def __init__(self, widget=None, workers=WORKERS, poll_ms=POLL_MS):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self.on_change = None  # вызывается без аргументов, когда задача запущена или завершена
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="task")
+        self._queue = queue.Queue()
+        self._jobs = {}  # job -> (on_done, on_error, on_progress, on_cancel); только главный поток
+        self._polling = False
+
+    @property
+    def jobs(self):
+        """Незавершённые задачи в порядке запуска."""
+        return list(self._jobs)
+
+    def busy(self, group=None):
+        """Есть ли незавершённые задачи группы group (без аргумента — любые)."""
+        return any(group is None or job.group == group for job in self._jobs)
+
+    def submit(self, func, name="", group=None, on_done=None, on_error=None, on_progress=None, on_cancel=None):
+        """
+        Запуск func(job) в рабочем потоке.
+
+        Колбэки вызываются в главном потоке: on_done(результат), on_error(исключение),
+        on_progress(значение из job.report), on_cancel() — если задачу отменили.
+        Ошибка без on_error выбрасывается из poll (в Tk — в report_callback_exception).
+
+        Returns:
+            Job
+        """
+        job = Job(self, name, group)
+        self._jobs[job] = (on_done, on_error, on_progress, on_cancel)
+        self._executor.submit(self._run, job, func)
+        self._changed()
+        self._schedule()
+        return job
+
+    def _run(self, job, func):
+        try:
+            result = func(job)
+        except Cancelled:
+            self._queue.put((job, "cancelled", None))
+        except Exception as e:
+            self._queue.put((job, "error", e))
+        else:
+            self._queue.put((job, "done", result))
+
+    def cancel(self, group=None):
+        """Отмена задач группы group (без аргумента — всех)."""
+        for job in self._jobs:
+            if group is None or job.group == group:
+                job.cancel()
+
+    def poll(self):
+        """Разбор очереди: колбэки завершённых задач и прогресс — в вызывающем потоке."""
+        while True:
+            try:
+                job, kind, value = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            on_done, on_error, on_progress, on_cancel = self._jobs[job]
+            if kind == "progress":
+                if on_progress and not job.cancelled:
+                    on_progress(value)
+                continue
+            del self._jobs[job]
+            job.done = True
+            self._changed()
+            if kind == "cancelled" or job.cancelled:
+                if on_cancel:
+                    on_cancel()
+            elif kind == "done":
+                if on_done:
+                    on_done(value)
+            elif on_error:
+                on_error(value)
+            else:
+                raise value
+
+    def wait(self, timeout=None):
+        """
+        Ожидание завершения всех задач с разбором очереди — для кода без цикла событий Tk.
+
+        Returns:
+            bool: False, если истёк timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._jobs:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(self.poll_ms / 1000)
+            self.poll()
+        return True
+
+    def shutdown(self):
+        """Отмена всех задач и остановка пула без ожидания рабочих потоков."""
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change()
+
+    def _schedule(self):
+        if self.widget is not None and not self._polling:
+            self._polling = True
+            self.widget.after(self.poll_ms, self._tick)
+
+    def _tick(self):
+        self._polling = False
+        if self._jobs:
+            self._schedule()  # до poll: исключение из колбэка не должно остановить опрос
+        self.poll()
@@ -1,7 +1,35 @@
+import gzip
+import json
+import os
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
 import unittest
-from models import Client, Product, Order, OrderItem
+from datetime import date, datetime
+from models import Client, Product, Order, OrderItem, to_timestamp, from_timestamp, validate_email, validate_phone
+from db import DB, SCHEMA_VERSION
+import analysis
+import bench
+import charts
+import cli
+import datagen
+import db
+import exporter
+import importer
+from tasks import Cancelled, TaskRunner
 from gui import App
 
+# Варианты тестов на объёмах из заявок (миллионы строк, минуты работы): SHOP_LARGE_TESTS=1
+LARGE_TESTS = os.environ.get("SHOP_LARGE_TESTS") == "1"
+
+def nx_edges(graph):
+    """Рёбра графа с весами в сравнимом виде."""
+    return sorted((tuple(sorted((u, v))), w) for u, v, w in graph.edges(data="weight"))
+
+
 class TestClient(unittest.TestCase):
     def test_client_creation(self):
         client = Client(
@@ -23,7 +51,7 @@ class TestClient(unittest.TestCase):
             created_at="2025-08-01",
         )
 
-        self.assertEqual(App().validate_email(client.email), False)
+        self.assertEqual(validate_email(client.email), False)
 
     def test_invalid2_email(self):
         client = Client(
@@ -33,7 +61,7 @@ class TestClient(unittest.TestCase):
             phone="+7(123)456-7890",
             created_at="2025-08-01",
         )
-        self.assertEqual(App().validate_email(client.email), False)
+        self.assertEqual(validate_email(client.email), False)
 
     def test_correct_email(self):
         client = Client(
@@ -43,7 +71,7 @@ class TestClient(unittest.TestCase):
             phone="+7(123)456-7890",
             created_at="2025-08-01",
         )
-        self.assertEqual(App().validate_email(client.email), True)
+        self.assertEqual(validate_email(client.email), True)
 
     def test_invalid1_phone(self):
         client = Client(
@@ -53,7 +81,7 @@ class TestClient(unittest.TestCase):
             phone="8(123)456-7890",
             created_at="2025-08-01",
         )
-        self.assertEqual(App().validate_phone(client.phone), False)
+        self.assertEqual(validate_phone(client.phone), False)
 
     def test_invalid2_phone(self):
         client = Client(
@@ -63,7 +91,7 @@ class TestClient(unittest.TestCase):
             phone="+",
             created_at="2025-08-01",
         )
-        self.assertEqual(App().validate_phone(client.phone), False)
+        self.assertEqual(validate_phone(client.phone), False)
 
     def test_correct_phone(self):
         client = Client(
@@ -73,7 +101,7 @@ class TestClient(unittest.TestCase):
             phone="+7(123)456-7890",
             created_at="2025-08-01",
         )
-        self.assertEqual(App().validate_phone(client.phone), True)
+        self.assertEqual(validate_phone(client.phone), True)
 
 class TestProduct(unittest.TestCase):
     def test_product_creation(self):
@@ -115,6 +143,1116 @@ class TestOrder(unittest.TestCase):
         )
         self.assertEqual(order.total(), 3600)
 
+    def test_order_total_invalidation(self):
+        fish = Product(id=1, name="Рыба", price=1200.00)
+        bread = Product(id=2, name="Хлеб", price=50.00)
+        order = Order(id=1, items=[OrderItem(fish, 1)])
+        self.assertEqual(order.total(), 1200)
+        bread_item = OrderItem(bread, 2)
+        order.add_item(bread_item)
+        self.assertEqual(order.total(), 1300)
+        order.remove_item(bread_item)
+        self.assertEqual(order.total(), 1200)
+        fish.price = 1000.00
+        self.assertEqual(order.total(), 1200)
+        order.invalidate_total()
+        self.assertEqual(order.total(), 1000)
+        with self.assertRaises(AttributeError):
+            order.comment = "без __dict__"
+
+
+class TestDB(unittest.TestCase):
+    def setUp(self):
+        self.db = DB(":memory:")
+        client = self.db.add_client(Client(name="Макаров Макар", email="MMakarov@google.com", phone="+71234567890"))
+        fish = self.db.add_product(Product(name="Рыба", price=1200.00))
+        bread = self.db.add_product(Product(name="Хлеб", price=50.00))
+        self.db.add_order(Order(client=client, items=[OrderItem(fish, 2), OrderItem(bread, 1)]))
+
+    def tearDown(self):
+        self.db.close()
+
+    def query_plans(self, func, *args, **kwargs):
+        """Планы (EXPLAIN QUERY PLAN) всех запросов, выполненных func."""
+        statements = []
+        self.db.conn.set_trace_callback(statements.append)
+        try:
+            func(*args, **kwargs)
+        finally:
+            self.db.conn.set_trace_callback(None)
+        plans = []
+        for sql in statements:
+            if sql.lstrip().upper().startswith("SELECT"):
+                rows = self.db.conn.execute("EXPLAIN QUERY PLAN " + sql).fetchall()
+                plans.append((sql, [row["detail"] for row in rows]))
+        return plans
+
+    def test_get_orders(self):
+        orders = self.db.get_orders()
+        self.assertEqual(len(orders), 1)
+        self.assertEqual(orders[0].client.name, "Макаров Макар")
+        self.assertEqual([(i.product.name, i.quantity) for i in orders[0].items], [("Рыба", 2), ("Хлеб", 1)])
+        self.assertEqual(orders[0].total(), 2450)
+        self.assertEqual(self.db.get_orders({"client_name": "Петров"}), [])
+
+    def test_keyset_pages(self):
+        for i in range(25):
+            self.db.add_client(Client(name=f"Клиент {i % 7}", email=f"c{i}@google.com", phone="+70000000000"))
+        expected = [c.id for c in self.db.get_clients(order_by="name DESC, id DESC")]
+        ids, after = [], None
+        while True:
+            page, after = self.db.get_clients_page(after=after, limit=4, sort="name", descending=True)
+            ids += [c.id for c in page]
+            if after is None:
+                break
+        self.assertEqual(ids, expected)
+        with self.assertRaises(ValueError):
+            self.db.get_clients_page(sort="phone; DROP TABLE clients")
+
+    def test_orders_page(self):
+        client = self.db.get_clients()[0]
+        product = self.db.get_products()[0]
+        for day in range(1, 10):
+            self.db.add_order(Order(client=client, items=[OrderItem(product, day)],
+                                    created_at=datetime(2025, 8, day)))
+        first, after = self.db.get_orders_page(limit=5)
+        second, after = self.db.get_orders_page(after=after, limit=5)
+        self.assertEqual(self.db.get_orders_page(after=after, limit=5), ([], None))
+        orders = first + second
+        self.assertEqual(len(orders), 10)
+        self.assertEqual([o.items[0].quantity for o in orders[1:]], list(range(9, 0, -1)))
+        (sql, plan), *_ = self.query_plans(self.db.get_orders_page, after=after, limit=5)
+        self.assertTrue(any("idx_orders_created_key" in step for step in plan), plan)
+
+    def test_pages_with_null_keys(self):
+        for i in range(5):
+            self.db.add_client(Client(name=f"Клиент {i}", email=f"c{i}@google.com", phone="+70000000000"))
+        with self.db.manager.write() as conn:
+            conn.executemany("INSERT INTO clients (name, email) VALUES (NULL, ?)", [("a@google.com",), ("b@google.com",)])
+            undated = conn.execute("INSERT INTO orders (client_id, created_at) VALUES (1, NULL)").lastrowid
+        total = len(self.db.get_clients())
+        for descending in (False, True):
+            ids, after = [], None
+            while True:
+                page, after = self.db.get_clients_page(after=after, limit=2, sort="name", descending=descending)
+                ids += [c.id for c in page]
+                if after is None:
+                    break
+            self.assertEqual(len(set(ids)), total)
+        (sql, plan), = self.query_plans(self.db.get_clients_page, after=("", 0), limit=2, sort="name")
+        self.assertTrue(any("idx_clients_name_key" in step for step in plan), plan)
+
+        orders, after = [], None
+        while True:
+            page, after = self.db.get_orders_page(after=after, limit=1)
+            orders += page
+            if after is None:
+                break
+        self.assertEqual(len(orders), 2)
+        self.assertEqual(orders[-1].id, undated)  # заказ без даты — последним
+        # без даты и после загрузки: не «сейчас», которое поставило бы заказ первым
+        self.assertIsNone(orders[-1].created_at)
+        self.assertEqual([o.created_at for o in self.db.get_orders() if o.id == undated], [None])
+        nameless = [c for c in self.db.get_clients() if c.name is None]
+        self.assertEqual([c.created_at for c in nameless], [None, None])
+
+    def test_orders_client_without_name(self):
+        with self.db.manager.write() as conn:
+            client_id = conn.execute("INSERT INTO clients (name, email) VALUES (NULL, 'a@google.com')").lastrowid
+            order_id = conn.execute("INSERT INTO orders (client_id, created_at) VALUES (?, 1754006400)",
+                                    (client_id,)).lastrowid
+        page, _ = self.db.get_orders_page(limit=100)
+        for orders in (self.db.get_orders(), page):
+            order, = [o for o in orders if o.id == order_id]
+            self.assertEqual((order.client.id, order.client.email), (client_id, "a@google.com"))
+
+    def test_pages_since(self):
+        client = self.db.get_clients()[0]
+        product = self.db.get_products()[0]
+        first, _ = self.db.get_orders_page()
+        mark = first[0].id
+        self.db.add_order(Order(client=client, items=[OrderItem(product, 1)], created_at=datetime(2025, 8, 1)))
+        self.db.add_order(Order(client=client, items=[OrderItem(product, 2)]))
+        new, after = self.db.get_orders_page(since=mark)
+        self.assertEqual([o.items[0].quantity for o in new], [2, 1])
+        self.assertIsNone(after)
+        (sql, plan), *_ = self.query_plans(self.db.get_orders_page, since=mark)
+        self.assertTrue(any("PRIMARY KEY" in step for step in plan), plan)
+
+        new_client = self.db.add_client(Client(name="Петров Пётр", email="PPetrov@google.com", phone="+79876543210"))
+        self.assertEqual([c.id for c in self.db.get_clients_page(since=client.id)[0]], [new_client.id])
+        self.assertEqual(self.db.get_products_page(since=product.id + 1)[0], [])
+
+    def test_suggest(self):
+        self.db.add_client(Client(name="Петров Пётр", email="PPetrov@google.com", phone="+79876543210"))
+        self.db.add_client(Client(name="Макарова Анна", email="AMakarova@yandex.ru", phone="+70000000000"))
+        self.assertEqual([c.name for c in self.db.suggest_clients("макаров")], ["Макаров Макар", "Макарова Анна"])
+        self.assertEqual([c.name for c in self.db.suggest_clients("ма")], ["Макаров Макар", "Макарова Анна"])
+        self.assertEqual([c.name for c in self.db.suggest_clients("ма Ан")], ["Макарова Анна"])
+        self.assertEqual([c.name for c in self.db.suggest_clients("google ПЁТР")], ["Петров Пётр"])
+        self.assertEqual([c.name for c in self.db.suggest_clients("yandex Пётр")], [])
+        self.assertEqual([c.name for c in self.db.suggest_clients("", limit=1)], ["Макаров Макар"])
+        self.assertEqual([p.name for p in self.db.suggest_products("хл")], ["Хлеб"])
+        for text in ("мак", "ма"):
+            (sql, plan), = self.query_plans(self.db.suggest_clients, text)
+            self.assertFalse(any(step.startswith("SCAN t") for step in plan), plan)
+
+    def test_orders_client_filter(self):
+        self.assertEqual([o.client.name for o in self.db.get_orders_page(filters={"client_name": "макаров"})[0]],
+                         ["Макаров Макар"])
+        self.assertEqual(self.db.get_orders_page(filters={"client_name": "Ма"})[0][0].total(), 2450)
+        (sql, plan), *_ = self.query_plans(self.db.get_orders_page, filters={"client_name": "Петров"})
+        self.assertTrue(any("idx_orders_client_created" in step for step in plan), plan)
+
+    def test_interruptible(self):
+        heavy = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n LIMIT 1000000) SELECT count(*) FROM n"
+        with self.db.interruptible(lambda: True):
+            with self.assertRaises(sqlite3.OperationalError):
+                self.db.conn.execute(heavy).fetchone()
+        self.assertEqual(self.db.conn.execute(heavy).fetchone()[0], 1000000)
+
+    def test_search(self):
+        self.db.add_client(Client(name="Петров Пётр", email="PPetrov@google.com", phone="+79876543210"))
+        self.db.add_client(Client(name="Макарова Анна", email="AMakarova@yandex.ru", phone="+70000000000"))
+        self.assertEqual({c.name for c in self.db.search_clients("макаров")}, {"Макаров Макар", "Макарова Анна"})
+        self.assertEqual([c.name for c in self.db.search_clients("yandex анна")], ["Макарова Анна"])
+        self.assertEqual([c.name for c in self.db.search_clients("ов", limit=1)], ["Макаров Макар"])
+        self.assertEqual([p.name for p in self.db.search_products("хле")], ["Хлеб"])
+        self.assertEqual([c.name for c in self.db.get_clients({"name": "ров П"})], ["Петров Пётр"])
+
+        self.db.conn.execute("UPDATE clients SET name = 'Сидоров Сидор' WHERE name = 'Петров Пётр'")
+        self.db.conn.execute("DELETE FROM products WHERE name = 'Хлеб'")
+        self.db.conn.commit()
+        self.assertEqual([c.name for c in self.db.search_clients("сидор")], ["Сидоров Сидор"])
+        self.assertEqual(self.db.search_clients("петров пётр"), [])
+        self.assertEqual(self.db.search_products("хлеб"), [])
+
+    def test_search_rank_limit(self):
+        # у второго клиента «смирнов» встречается дважды — по bm25 он выше
+        first = self.db.add_client(Client(name="Смирнов Иван", email="ivan@google.com", phone="+70000000001"))
+        second = self.db.add_client(Client(name="Смирнов Смирнов", email="smirnov@google.com", phone="+70000000002"))
+        self.assertEqual([c.id for c in self.db.search_clients("смирнов")], [second.id, first.id])
+        limit = db.SEARCH_RANK_LIMIT
+        db.SEARCH_RANK_LIMIT = 1  # частое слово: без ранжирования, в порядке id
+        try:
+            self.assertEqual([c.id for c in self.db.search_clients("смирнов")], [first.id, second.id])
+            self.assertEqual([c.id for c in self.db.search_clients("смирнов ivan")], [first.id])
+        finally:
+            db.SEARCH_RANK_LIMIT = limit
+
+    def test_identity_map(self):
+        client = self.db.get_clients()[0]
+        self.assertIs(self.db.get_orders()[0].client, client)
+        self.assertIs(self.db.search_clients("макаров")[0], client)
+
+        statements = []
+        self.db.conn.set_trace_callback(statements.append)
+        hits = self.db.cache.hits
+        self.assertIs(self.db.get_client(client.id), client)
+        self.db.conn.set_trace_callback(None)
+        self.assertEqual(statements, [])
+        self.assertEqual(self.db.cache.hits, hits + 1)
+
+        self.db.invalidate(Client, client.id)
+        reloaded = self.db.get_client(client.id)
+        self.assertIsNot(reloaded, client)
+        self.assertEqual(reloaded.name, client.name)
+        self.assertIsNone(self.db.get_client(999))
+
+    def test_cache_is_bounded(self):
+        db = DB(":memory:", cache_size=2)
+        products = [db.add_product(Product(name=f"Товар {i}", price=i)) for i in range(3)]
+        self.assertEqual(len(db.cache), 2)
+        self.assertIs(db.get_product(products[2].id), products[2])
+        self.assertIsNot(db.get_product(products[0].id), products[0])
+        self.assertEqual(db.cache.stats()["misses"], 1)
+        db.close()
+
+    def test_daily_sales(self):
+        client = self.db.get_clients()[0]
+        fish, bread = self.db.get_products()
+        self.db.add_order(Order(client=client, items=[OrderItem(fish, 1)], created_at=datetime(2025, 8, 1, 10)))
+        self.db.add_order(Order(client=client, items=[OrderItem(bread, 4)], created_at=datetime(2025, 8, 1, 18)))
+        self.db.add_order(Order(client=client, items=[OrderItem(bread, 1)], created_at=datetime(2025, 8, 3)))
+        self.assertEqual(self.db.get_daily_sales("2025-08-01", "2025-08-31"), [("2025-08-01", 1400), ("2025-08-03", 50)])
+        self.assertEqual(self.db.get_daily_sales(date_to="2025-08-01"), [("2025-08-01", 1400)])
+        self.assertEqual(len(self.db.get_daily_sales()), 3)
+
+    def test_summaries(self):
+        client = self.db.get_clients()[0]
+        self.db.add_client(Client(name="Петров Пётр", email="PPetrov@google.com", phone="+79876543210"))
+        fish, bread = self.db.get_products()
+        self.db.add_order(Order(client=client, items=[OrderItem(bread, 4)], created_at=datetime(2025, 8, 1)))
+        self.assertEqual(self.db.get_product_sales(), [("Хлеб", 5, 250), ("Рыба", 2, 2400)])
+        self.assertEqual(list(self.db.get_top5_products().itertuples(index=False, name=None)),
+                         [("Макаров Макар", 2), ("Петров Пётр", 0)])
+
+        summaries = (self.db.get_daily_sales(), self.db.get_product_sales())
+        self.db.rebuild_summaries()
+        self.assertEqual((self.db.get_daily_sales(), self.db.get_product_sales()), summaries)
+
+    def test_order_frame(self):
+        client = self.db.get_clients()[0]
+        fish, bread = self.db.get_products()
+        self.db.add_order(Order(client=client, items=[OrderItem(bread, 4)], created_at=datetime(2025, 8, 1, 18)))
+        self.db.add_order(Order(client=None, items=[OrderItem(fish, 1)], created_at=datetime(2025, 8, 3)))
+        self.db.add_order(Order(client=client, created_at=datetime(2025, 8, 3)))
+        frame = self.db.get_order_frame()
+        self.assertEqual((len(frame), frame.order_count), (4, 4))
+        self.assertEqual(frame.total(), sum(o.total() for o in self.db.get_orders()))
+        self.assertEqual(frame.order_totals().tolist(), [o.total() for o in self.db.get_orders(order_by="id")])
+        self.assertEqual(frame.daily_sales()[:2], [("2025-08-01", 200), ("2025-08-03", 1200)])
+        self.assertEqual(frame.daily_sales()[2:], self.db.get_daily_sales()[2:])
+        self.assertEqual(list(frame.top_clients().itertuples(index=False, name=None)), [("Макаров Макар", 3)])
+        self.assertEqual(frame.product_sales()[["name", "quantity", "revenue"]].values.tolist(),
+                         [["Хлеб", 5, 250], ["Рыба", 3, 3600]])
+        self.assertEqual(frame.edges().values.tolist(), [[client.id, fish.id, 2], [client.id, bread.id, 5]])
+
+        august = self.db.get_order_frame("2025-08-01", "2025-08-31")
+        self.assertEqual((len(august), august.order_count), (2, 3))
+        self.assertEqual(august.sales_by_period("D").tolist(), [200, 0, 1200])
+
+    def test_relationship_graph(self):
+        client = self.db.get_clients()[0]
+        other = self.db.add_client(Client(name="Петров Пётр", email="PPetrov@google.com", phone="+79876543210"))
+        fish, bread = self.db.get_products()
+        milk = self.db.add_product(Product(name="Молоко", price=90.00))
+        self.db.add_order(Order(client=client, items=[OrderItem(fish, 2)], created_at=datetime(2025, 8, 1)))
+        self.db.add_order(Order(client=other, items=[OrderItem(milk, 3), OrderItem(bread, 1)],
+                                created_at=datetime(2025, 8, 2)))
+        edges = self.db.get_client_product_edges()
+        self.assertEqual(sorted(edges), sorted([
+            (client.id, client.name, fish.id, "Рыба", 4), (client.id, client.name, bread.id, "Хлеб", 1),
+            (other.id, other.name, milk.id, "Молоко", 3), (other.id, other.name, bread.id, "Хлеб", 1)]))
+        self.assertEqual({e[:3:2] for e in self.db.get_client_product_edges(top_clients=1, top_products=1)},
+                         {(client.id, fish.id)})
+        self.assertEqual({e[:3:2] for e in self.db.get_client_product_edges("2025-08-02", top_products=1)},
+                         {(other.id, milk.id)})
+
+        graph = analysis.relationship_graph(edges)
+        self.assertEqual((graph.number_of_nodes(), graph.number_of_edges()), (5, 4))
+        self.assertEqual(graph[("client", client.id)][("product", fish.id)]["weight"], 4)
+        self.assertEqual(analysis.co_purchase_degree(graph).to_dict(), {"Хлеб": 2, "Рыба": 1, "Молоко": 1})
+        self.assertEqual(nx_edges(analysis.relationship_graph(self.db.get_order_frame())), nx_edges(graph))
+        self.assertEqual(nx_edges(analysis.relationship_graph(self.db.get_orders())), nx_edges(graph))
+
+    def test_incremental_analytics(self):
+        client = self.db.get_clients()[0]
+        fish, bread = self.db.get_products()
+        self.assertEqual(self.db.refresh_analytics(), 1)
+        self.assertEqual(self.db.refresh_analytics(), 0)
+
+        order = self.db.add_order(Order(client=client, items=[OrderItem(fish, 5)]))
+        statements = []
+        self.db.conn.set_trace_callback(statements.append)
+        self.assertEqual(self.db.refresh_analytics(), 1)
+        self.db.conn.set_trace_callback(None)
+        fold, = [sql for sql in statements if sql.lstrip().startswith("INSERT INTO client_product_sales")]
+        # читаются только новые заказы — диапазон по первичному ключу
+        plan = [row["detail"] for row in self.db.conn.execute("EXPLAIN QUERY PLAN " + fold)]
+        self.assertTrue(any(">? AND " in step for step in plan), plan)
+        self.assertFalse(any(step.startswith("SCAN") for step in plan), plan)
+        self.assertEqual(sorted(self.db.get_client_product_edges()),
+                         [(client.id, client.name, fish.id, "Рыба", 7), (client.id, client.name, bread.id, "Хлеб", 1)])
+
+        # удаление учтённого заказа сбрасывает отметку — агрегат пересчитывается целиком
+        self.db.conn.execute("DELETE FROM order_items WHERE order_id = ?", (order.id,))
+        self.db.conn.execute("DELETE FROM orders WHERE id = ?", (order.id,))
+        self.db.conn.commit()
+        self.assertEqual(self.db.refresh_analytics(), 1)
+        self.assertEqual(sorted(e[-1] for e in self.db.get_client_product_edges()), [1, 2])
+
+        self.db.invalidate_analytics()
+        self.assertEqual(self.db.get_client_product_edges(top_clients=1, top_products=1),
+                         [(client.id, client.name, fish.id, "Рыба", 2)])
+
+    def test_timestamps(self):
+        client = self.db.get_clients()[0]
+        self.assertIsInstance(client.created_at, datetime)
+        self.assertIsInstance(self.db.get_orders()[0].created_at, datetime)
+        self.assertEqual(self.db.conn.execute("SELECT DISTINCT typeof(created_at) FROM orders").fetchall()[0][0],
+                         "integer")
+        order = self.db.add_order(Order(client=client, created_at=datetime(2025, 8, 1, 23, 59, 59)))
+        self.db.invalidate()
+        self.assertEqual(self.db.get_orders({"date_from": "2025-08-01", "date_to": "2025-08-02"})[0].created_at,
+                         order.created_at)
+        self.assertEqual(self.db.get_daily_sales("2025-08-01", "2025-08-01"), [("2025-08-01", 0)])
+        self.assertEqual(from_timestamp(to_timestamp("2025-08-01T03:00:00+03:00")), datetime(2025, 8, 1))
+        self.assertEqual(to_timestamp(datetime(2025, 8, 1).date()), to_timestamp("2025-08-01"))
+
+        (sql, plan), *_ = self.query_plans(self.db.get_orders, {"date_from": "2025-08-01"})
+        self.assertTrue(any("idx_orders_created (created_at>?)" in step for step in plan), plan)
+
+    def test_schema_version(self):
+        self.assertEqual(self.db.schema_version(), SCHEMA_VERSION)
+        self.assertEqual(self.db.migrate(), SCHEMA_VERSION)
+
+    def test_migrate_existing_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "old.db")
+            conn = sqlite3.connect(path)
+            conn.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY AUTOINCREMENT, client_id INTEGER, created_at DATETIME)")
+            conn.execute("INSERT INTO orders (client_id, created_at) VALUES (1, '2025-08-01')")
+            conn.commit()
+            conn.close()
+
+            db = DB(path)
+            indexes = {row["name"] for row in db.conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+            self.assertEqual(db.schema_version(), SCHEMA_VERSION)
+            self.assertIn("idx_orders_created", indexes)
+            self.assertIn("idx_order_items_order", indexes)
+            self.assertEqual(db.conn.execute("SELECT created_at FROM orders").fetchall()[0][0],
+                             to_timestamp("2025-08-01"))
+            self.assertEqual(db.get_orders()[0].created_at, datetime(2025, 8, 1))
+            db.close()
+
+    def test_get_orders_uses_indexes(self):
+        plans = self.query_plans(self.db.get_orders, {"date_from": "2000-01-01", "date_to": "2100-01-01"})
+        self.assertEqual(len(plans), 3)
+        for sql, plan in plans:
+            self.assertFalse([step for step in plan if step.startswith("SCAN")], (sql, plan))
+        self.assertTrue(any("idx_orders_created" in step for step in plans[0][1]))
+        for sql, plan in plans[1:]:
+            self.assertTrue(any("COVERING INDEX idx_order_items_order" in step for step in plan), (sql, plan))
+
+    def test_top5_uses_indexes(self):
+        (sql, plan), = self.query_plans(self.db.get_top5_products)
+        self.assertTrue(any("COVERING INDEX idx_client_order_counts_count" in step for step in plan), plan)
+
+
+class TestBulkImport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DB(":memory:")
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_clients_csv(self):
+        path = self.write("clients.csv", "name,email,phone\n"
+                                         "Макаров Макар,MMakarov@google.com,+71234567890\n"
+                                         ",nobody@google.com,+70000000000\n"
+                                         "Петров Пётр,PPetrov@google.com,+79876543210\n")
+        progress = []
+        result = self.db.bulk_import("clients", path, chunk_size=2, progress=lambda r: progress.append(r.imported))
+        self.assertEqual(result.imported, 2)
+        self.assertEqual([number for number, _ in result.rejected], [2])
+        self.assertEqual(progress, [1, 2])
+        self.assertEqual([c.name for c in self.db.get_clients(order_by="id")], ["Макаров Макар", "Петров Пётр"])
+
+    def test_orders_json_resolves_ids(self):
+        client = self.db.add_client(Client(name="Макаров Макар", email="MMakarov@google.com", phone="+71234567890"))
+        fish = self.db.add_product(Product(name="Рыба", price=1200.00))
+        orders = [
+            {"client_id": client.id, "created_at": "2025-08-01", "items": [{"product_id": fish.id, "quantity": 2}]},
+            {"client_email": "MMakarov@google.com", "items": [{"product_name": "Рыба", "quantity": 1}]},
+            {"client_id": 999, "items": [{"product_id": fish.id, "quantity": 1}]},
+            {"client_id": client.id, "items": [{"product_name": "Хлеб", "quantity": 1}]},
+        ]
+        path = self.write("orders.json", json.dumps(orders))
+        result = self.db.bulk_import("orders", path)
+        self.assertEqual(result.imported, 2)
+        self.assertEqual([number for number, _ in result.rejected], [3, 4])
+        self.assertEqual(sorted(o.total() for o in self.db.get_orders()), [1200, 2400])
+
+    def test_orders_colliding_ids(self):
+        # в целевой базе id 1 занят другими клиентом и товаром
+        other = self.db.add_client(Client(name="Другой", email="other@google.com", phone="+70000000000"))
+        bread = self.db.add_product(Product(name="Хлеб", price=50.00))
+        client = self.db.add_client(Client(name="Макаров Макар", email="MMakarov@google.com", phone="+71234567890"))
+        fish = self.db.add_product(Product(name="Рыба", price=1200.00))
+        orders = [
+            {"client_id": other.id, "client_email": "MMakarov@google.com",
+             "items": [{"product_id": bread.id, "product_name": "Рыба", "quantity": 1}]},
+            {"client_id": 999, "client_email": "MMakarov@google.com",
+             "items": [{"product_id": 999, "product_name": "Рыба", "quantity": 2}]},
+            {"client_id": client.id, "client_email": "MMakarov@google.com",
+             "items": [{"product_id": fish.id, "product_name": "Рыба", "quantity": 3}]},
+            {"client_id": other.id, "client_email": "nobody@google.com", "items": [{"product_id": bread.id}]},
+        ]
+        result = self.db.bulk_import("orders", self.write("orders.json", json.dumps(orders)))
+        self.assertEqual([number for number, _ in result.rejected], [1, 4])
+        self.assertEqual(sorted((o.client.name, [(i.product.name, i.quantity) for i in o.items])
+                                for o in self.db.get_orders()),
+                         [("Макаров Макар", [("Рыба", 2)]), ("Макаров Макар", [("Рыба", 3)])])
+
+    def test_orders_ids_not_reused(self):
+        client = self.db.add_client(Client(name="Макаров Макар", email="MMakarov@google.com", phone="+71234567890"))
+        fish = self.db.add_product(Product(name="Рыба", price=1200.00))
+        for _ in range(3):
+            self.db.add_order(Order(client=client, items=[OrderItem(fish, 1)]))
+        with self.db.manager.write() as conn:
+            conn.execute("DELETE FROM order_items WHERE order_id > 1")
+            conn.execute("DELETE FROM orders WHERE id > 1")
+        orders = [{"client_email": "MMakarov@google.com", "items": [{"product_name": "Рыба"}]}]
+        self.db.bulk_import("orders", self.write("orders.json", json.dumps(orders)))
+        self.assertEqual([o.id for o in self.db.get_orders(order_by="id")], [1, 4])
+
+    def test_orders_csv_groups_items(self):
+        self.db.add_client(Client(name="Макаров Макар", email="MMakarov@google.com", phone="+71234567890"))
+        self.db.add_product(Product(name="Рыба", price=1200.00))
+        self.db.add_product(Product(name="Хлеб", price=50.00))
+        path = self.write("orders.csv", "order_id,client_email,created_at,product_name,quantity\n"
+                                        "1,MMakarov@google.com,2025-08-01,Рыба,2\n"
+                                        "1,MMakarov@google.com,2025-08-01,Хлеб,3\n"
+                                        "2,MMakarov@google.com,2025-08-02,Хлеб,1\n")
+        result = self.db.bulk_import("orders", path, chunk_size=1)
+        self.assertEqual(result.imported, 2)
+        orders = self.db.get_orders(order_by="id")
+        self.assertEqual([len(o.items) for o in orders], [2, 1])
+        self.assertEqual(orders[0].total(), 2550)
+
+    def test_orders_quantity(self):
+        client = self.db.add_client(Client(name="Макаров Макар", email="MMakarov@google.com", phone="+71234567890"))
+        fish = self.db.add_product(Product(name="Рыба", price=1200.00))
+        orders = [{"client_id": client.id, "items": [{"product_id": fish.id, "quantity": quantity}]}
+                  for quantity in (0, "", None, -1, "2")]
+        orders.append({"client_id": client.id, "items": [{"product_id": fish.id}]})
+        result = self.db.bulk_import("orders", self.write("orders.json", json.dumps(orders)))
+        self.assertEqual(result.imported, 2)
+        self.assertEqual([number for number, _ in result.rejected], [1, 2, 3, 4])
+        self.assertEqual(sorted(o.total() for o in self.db.get_orders()), [1200, 2400])
+
+        path = self.write("orders.csv", "order_id,client_email,product_name,quantity\n"
+                                        "1,MMakarov@google.com,Рыба,0\n"
+                                        "2,MMakarov@google.com,Рыба,\n")
+        self.assertEqual([number for number, _ in self.db.bulk_import("orders", path).rejected], [1, 2])
+
+    def test_atomic_rollback(self):
+        path = self.write("products.json", '[{"name": "Рыба", "price": 1200}, {"name": "Хлеб", "price": 50}, {"name"')
+        with self.assertRaises(ValueError):
+            self.db.bulk_import("products", path, chunk_size=1, atomic=True)
+        self.assertEqual(self.db.get_products(), [])
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DB(":memory:")
+        client = self.db.add_client(Client(name="Макаров Макар", email="MMakarov@google.com", phone="+71234567890"))
+        fish = self.db.add_product(Product(name="Рыба", price=1200.00))
+        bread = self.db.add_product(Product(name="Хлеб", price=50.00))
+        self.db.add_order(Order(client=client, items=[OrderItem(fish, 2), OrderItem(bread, 3)]))
+        self.db.add_order(Order(client=client, items=[OrderItem(bread, 1)]))
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def test_orders_json(self):
+        self.assertEqual(self.db.export("orders", self.path("orders.json")), 2)
+        with open(self.path("orders.json"), encoding="utf-8") as f:
+            data = json.load(f)
+        self.assertEqual(data[0]["items"], [{"product_id": 1, "product_name": "Рыба", "quantity": 2},
+                                            {"product_id": 2, "product_name": "Хлеб", "quantity": 3}])
+        self.assertEqual((data[1]["client_id"], data[1]["client_email"]), (1, "MMakarov@google.com"))
+
+    def test_gzip_jsonl(self):
+        self.assertEqual(self.db.export("products", self.path("products.jsonl.gz")), 2)
+        with gzip.open(self.path("products.jsonl.gz"), "rt", encoding="utf-8") as f:
+            names = [json.loads(line)["name"] for line in f]
+        self.assertEqual(names, ["Рыба", "Хлеб"])
+
+    def test_interrupted_export_keeps_file(self):
+        path = self.path("clients.json")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("[]\n")
+
+        def cancel(read):
+            raise Cancelled  # так прерывает экспорт Job.report отменённой задачи
+
+        for fmt in ("json", "csv"):
+            with self.assertRaises(Cancelled):
+                self.db.export("clients", path, fmt=fmt, batch_size=1, progress=cancel)
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(f.read(), "[]\n")
+        self.assertEqual(os.listdir(self.tmp.name), ["clients.json"])
+        self.assertEqual(self.db.export("clients", path), 1)
+        with open(path, encoding="utf-8") as f:
+            self.assertEqual(len(json.load(f)), 1)
+
+    def test_orders_round_trip(self):
+        self.db.add_order(Order(client=self.db.get_client(1), items=[]))
+        for fmt in ("csv", "json", "jsonl"):
+            # в целевой базе клиенты и товары получают другие id, и ссылки восстанавливаются
+            # по email и названию (совпадение id с чужими записями — test_orders_colliding_ids)
+            target = DB(":memory:")
+            for i in range(3):
+                target.add_client(Client(name="Другой", email=f"other{i}@google.com", phone="+70000000000"))
+                target.add_product(Product(name=f"Соль {i}", price=20.00))
+            with target.manager.write() as conn:
+                conn.execute("DELETE FROM clients")
+                conn.execute("DELETE FROM products")
+            for entity in ("clients", "products", "orders"):
+                self.db.export(entity, self.path(f"{entity}.{fmt}"))
+                result = target.bulk_import(entity, self.path(f"{entity}.{fmt}"))
+                self.assertEqual(result.rejected, [], fmt)
+            self.assertEqual([(o.client.name, sorted((i.product.name, i.quantity) for i in o.items))
+                              for o in target.get_orders(order_by="id")],
+                             [("Макаров Макар", [("Рыба", 2), ("Хлеб", 3)]), ("Макаров Макар", [("Хлеб", 1)]),
+                              ("Макаров Макар", [])], fmt)
+            self.assertEqual(target.get_orders(order_by="id")[0].client.id, 4)
+            target.close()
+
+    def export_peak(self, rows, batch_size):
+        """Пик памяти Python при экспорте, когда в базе rows клиентов (плюс один из setUp)."""
+        have = self.db.conn.execute("SELECT count(*) FROM clients").fetchone()[0] - 1
+        self.db.conn.executemany("INSERT INTO clients (name, email, phone, created_at) VALUES (?, ?, ?, ?)",
+                                 ((f"Клиент {i}", f"client{i}@example.com", "+70000000000", 1754006400)
+                                  for i in range(have, rows)))
+        self.db.conn.commit()
+        tracemalloc.start()
+        try:
+            count = self.db.export("clients", self.path("clients.csv"), batch_size=batch_size)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(count, rows + 1)
+        return peak
+
+    def test_export_memory_is_flat(self):
+        small = self.export_peak(5_000, batch_size=500)
+        # вчетверо больше строк: список объектов вырос бы вчетверо, потоковый экспорт — нет
+        self.assertLess(self.export_peak(20_000, batch_size=500), 1.5 * small)
+
+    @unittest.skipUnless(LARGE_TESTS, "SHOP_LARGE_TESTS=1")
+    def test_export_memory_is_flat_large(self):
+        small = self.export_peak(100_000, batch_size=exporter.DEFAULT_BATCH_SIZE)
+        # 2 млн строк: список объектов Client занял бы сотни мегабайт
+        self.assertLess(self.export_peak(2_000_000, batch_size=exporter.DEFAULT_BATCH_SIZE), 1.5 * small)
+
+
+class TestTasks(unittest.TestCase):
+    # Задержка таймера цикла событий во время фонового импорта, секунды
+    LATENCY_BUDGET = 0.1
+    IMPORT_ROWS = 50_000
+    IMPORT_CHUNK = 1000
+    # Импорт отменяется, когда записано столько порций и таймер сработал столько раз
+    MEASURE_CHUNKS = 3
+    MEASURE_TICKS = 30
+
+    def test_callbacks_in_main_thread(self):
+        runner = TaskRunner()
+        done, errors, progress = [], [], []
+
+        def work(job):
+            job.report(1)
+            return threading.current_thread()
+
+        runner.submit(work, on_done=lambda worker: done.append((worker, threading.current_thread())),
+                      on_progress=progress.append)
+        runner.submit(lambda job: 1 / 0, group="write", on_error=errors.append)
+        self.assertTrue(runner.busy("write"))
+        self.assertTrue(runner.wait(5))
+        (worker, caller), = done
+        self.assertIsNot(worker, threading.main_thread())
+        self.assertIs(caller, threading.main_thread())
+        self.assertEqual(progress, [1])
+        self.assertIsInstance(errors[0], ZeroDivisionError)
+        self.assertFalse(runner.busy())
+        runner.shutdown()
+
+    def measure_import_latency(self, rows, chunk_size, chunks, ticks):
+        """
+        Фоновый импорт rows клиентов порциями по chunk_size под таймером цикла событий;
+        импорт отменяется, когда записано chunks порций и таймер сработал ticks раз.
+        """
+        import tkinter as tk
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "clients.csv")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("name,email,phone\n")
+                f.writelines(f"Клиент {i},client{i}@example.com,+7{i:010d}\n" for i in range(rows))
+            db = DB(os.path.join(tmp, "shop.db"))
+            interp = tk.Tcl()  # цикл событий Tcl без окна: дисплей не нужен
+            runner = TaskRunner(interp)
+            progress, cancelled = [], []
+            job = runner.submit(lambda job: db.bulk_import("clients", path, chunk_size=chunk_size,
+                                                           progress=lambda r: job.report(r.imported)),
+                                on_progress=progress.append, on_cancel=lambda: cancelled.append(True))
+
+            # таймер каждые 10 мс: насколько позже назначенного он срабатывает
+            lateness = []
+
+            def tick(expected):
+                lateness.append(time.perf_counter() - expected)
+                interp.after(10, tick, time.perf_counter() + 0.01)
+
+            interp.after(10, tick, time.perf_counter() + 0.01)
+            while not job.done:
+                if len(progress) >= chunks and len(lateness) >= ticks:
+                    job.cancel()
+                interp.dooneevent()
+
+            self.assertEqual(cancelled, [True])
+            self.assertTrue(progress)
+            imported = db.conn.execute("SELECT count(*) FROM clients").fetchone()[0]
+            self.assertLess(imported, rows)
+            self.assertEqual(imported % chunk_size, 0)  # отменённая порция откатывается
+            self.assertLess(max(lateness), self.LATENCY_BUDGET)
+            runner.shutdown()
+            db.close()
+
+    def test_event_loop_latency_during_import(self):
+        self.measure_import_latency(self.IMPORT_ROWS, self.IMPORT_CHUNK, self.MEASURE_CHUNKS, self.MEASURE_TICKS)
+
+    @unittest.skipUnless(LARGE_TESTS, "SHOP_LARGE_TESTS=1")
+    def test_event_loop_latency_during_import_large(self):
+        # миллион строк порциями по умолчанию; замер — пока таймер не сработает 300 раз (≈ 3 с)
+        self.measure_import_latency(1_000_000, importer.DEFAULT_CHUNK_SIZE, chunks=3, ticks=300)
+
+
+class TestApp(unittest.TestCase):
+    def test_injected_db(self):
+        import tkinter as tk
+        db = DB(":memory:")
+        try:
+            app = App(db=db)
+        except tk.TclError:
+            db.close()
+            self.skipTest("нет дисплея")
+        self.assertIs(app.db, db)
+        self.assertTrue(app.validate_email("MMakarov@google.com"))
+        app.destroy()
+        db.close()
+
+
+class TestLargeData(unittest.TestCase):
+    """Синтетические данные засеваются один раз; каждый тест получает свою копию в памяти."""
+    ORDERS = 20_000
+
+    @classmethod
+    def setUpClass(cls):
+        cls.template = DB(":memory:")
+        datagen.generate(cls.template, cls.ORDERS, n_clients=500, n_products=100)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.template.close()
+
+    def setUp(self):
+        self.db = DB(":memory:", template=self.template)
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_copy_is_isolated(self):
+        self.db.add_client(Client(name="Макаров Макар", email="MMakarov@google.com", phone="+71234567890"))
+        count = "SELECT count(*) FROM clients"
+        self.assertEqual(self.db.conn.execute(count).fetchone()[0], 501)
+        self.assertEqual(self.template.conn.execute(count).fetchone()[0], 500)
+
+    def test_template_from_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.db")
+            DB(path, template=self.db).close()
+            copy = DB(":memory:", template=path)
+            self.assertEqual(copy.conn.execute("SELECT count(*) FROM orders").fetchone()[0], self.ORDERS)
+            copy.close()
+
+    def test_frame_matches_sql(self):
+        frame = self.db.get_order_frame()
+        self.assertEqual(frame.order_count, self.ORDERS)
+        revenue = self.db.conn.execute("""SELECT sum(oi.quantity * p.price) FROM order_items oi
+                                          JOIN products p ON p.id = oi.product_id""").fetchone()[0]
+        self.assertAlmostEqual(frame.total(), revenue, places=2)
+        self.assertAlmostEqual(sum(r for _, r in self.db.get_daily_sales()), revenue, places=2)
+
+    def test_co_purchase_degree(self):
+        graph = analysis.relationship_graph(self.db.get_client_product_edges())
+        projection = analysis.co_purchase_graph(graph)
+        expected = {graph.nodes[node]["label"]: degree for node, degree in projection.degree()}
+        self.assertEqual(analysis.co_purchase_degree(graph).to_dict(), expected)
+        chunk = analysis.CO_PURCHASE_CHUNK
+        analysis.CO_PURCHASE_CHUNK = 10  # корзины нескольких клиентов по порциям
+        try:
+            self.assertEqual(analysis.co_purchase_degree(graph).to_dict(), expected)
+        finally:
+            analysis.CO_PURCHASE_CHUNK = chunk
+
+    def test_paging_is_fast(self):
+        elapsed, (orders, after) = bench.timed(self.db.get_orders_page, after=None, limit=100)
+        self.assertEqual(len(orders), 100)
+        self.assertLess(elapsed, 0.05)
+
+
+class TestDatagen(unittest.TestCase):
+    def setUp(self):
+        self.db = DB(":memory:")
+
+    def tearDown(self):
+        self.db.close()
+
+    def rows(self, db, table):
+        return [tuple(row) for row in db.conn.execute(f"SELECT * FROM {table} ORDER BY 1")]
+
+    def schema(self):
+        return set(self.db.conn.execute("SELECT type, name, tbl_name, sql FROM sqlite_master"))
+
+    def test_deterministic(self):
+        datagen.generate(self.db, 300, n_clients=50, n_products=20, items_per_order=(1, 4), skew=1.0, seed=7)
+        same, other = DB(":memory:"), DB(":memory:")
+        datagen.generate(same, 300, n_clients=50, n_products=20, items_per_order=(1, 4), skew=1.0, seed=7)
+        datagen.generate(other, 300, n_clients=50, n_products=20, items_per_order=(1, 4), skew=1.0, seed=8)
+        for table in ("clients", "products", "orders", "order_items"):
+            self.assertEqual(self.rows(self.db, table), self.rows(same, table))
+        self.assertNotEqual(self.rows(self.db, "order_items"), self.rows(other, "order_items"))
+        same.close()
+        other.close()
+
+    def test_parameters(self):
+        counts = datagen.generate(self.db, 1000, n_clients=100, n_products=30, items_per_order=(2, 4),
+                                  start=date(2024, 2, 1), days=29)
+        for table, count in counts.items():
+            self.assertEqual(self.db.conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0], count)
+        lines = self.db.conn.execute("SELECT min(n), max(n) FROM (SELECT count(*) AS n FROM order_items GROUP BY order_id)")
+        self.assertEqual(tuple(lines.fetchone()), (2, 4))
+        days = self.db.get_daily_sales()
+        self.assertEqual((days[0][0], days[-1][0]), ("2024-02-01", "2024-02-29"))
+        created = [row[0] for row in self.db.conn.execute("SELECT created_at FROM orders ORDER BY id")]
+        self.assertEqual(created, sorted(created))
+        with self.assertRaises(ValueError):
+            datagen.generate(self.db, 10, items_per_order=(3, 2))
+
+    def test_skew(self):
+        def top_share(db):
+            query = "SELECT max(order_count) FROM client_order_counts"
+            return db.conn.execute(query).fetchone()[0] / 5000
+
+        datagen.generate(self.db, 5000, n_clients=500, skew=1.5)
+        uniform = DB(":memory:")
+        datagen.generate(uniform, 5000, n_clients=500)
+        self.assertGreater(top_share(self.db), 10 * top_share(uniform))
+        uniform.close()
+
+    def test_append_restores_schema(self):
+        datagen.generate(self.db, 500, n_clients=50, n_products=20)
+        schema = self.schema()
+        datagen.generate(self.db, 500, n_clients=0, n_products=0, seed=1)
+        self.assertEqual(self.schema(), schema)
+        self.assertEqual(tuple(self.db.conn.execute("SELECT count(DISTINCT id), max(id) FROM orders").fetchone()),
+                         (1000, 1000))
+        self.assertEqual([c.name for c in self.db.search_clients("client42")], ["Клиент 42"])
+        # триггеры снова ведут сводные таблицы
+        product = self.db.get_product(1)
+        self.db.add_order(Order(client=self.db.get_client(1), items=[OrderItem(product, 2)]))
+        query = """SELECT day, order_count, quantity, round(revenue, 2) FROM daily_sales
+                   UNION ALL SELECT product_id, 0, quantity, round(revenue, 2) FROM product_sales"""
+        summaries = list(map(tuple, self.db.conn.execute(query)))
+        self.db.rebuild_summaries()
+        self.assertEqual(list(map(tuple, self.db.conn.execute(query))), summaries)
+
+    def test_bulk_load_rollback(self):
+        schema = self.schema()
+        with self.assertRaises(RuntimeError):
+            with self.db.bulk_load() as conn:
+                conn.execute("INSERT INTO clients (name) VALUES ('Никто')")
+                raise RuntimeError
+        self.assertEqual(self.schema(), schema)
+        self.assertEqual(self.db.get_clients(), [])
+
+
+class TestBench(unittest.TestCase):
+    def test_suite(self):
+        cases = ["add_order", "get_orders_page", "export_orders_jsonl", "import_orders", "sales_over_time"]
+        report = bench.run_suite([200], repeat=2, cases=cases)
+        report = json.loads(json.dumps(report))
+        self.assertEqual([(r["case"], r["scale"], len(r["runs"])) for r in report["results"]],
+                         [(case, 200, 2) for case in cases])
+        self.assertEqual(report["format"], bench.SUITE_FORMAT)
+
+        slower = json.loads(json.dumps(report))
+        slower["results"][0]["min"] += 1
+        changes = bench.compare_results(report, slower)
+        self.assertEqual([c["regression"] for c in changes], [True, False, False, False, False])
+        self.assertEqual(bench.compare_results(report, report), [dict(c, after=c["before"], ratio=1.0, regression=False)
+                                                                  for c in changes])
+
+    def test_add_order_isolated(self):
+        # повторы add_order пишут в копию, которую reset возвращает к исходной базе
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DB(os.path.join(tmp, "suite.db"))
+            bench.suite_data(db, 100)
+            run, reset = bench.case_add_order(db, tmp)
+            count = "SELECT count(*) FROM orders"
+            for _ in range(2):
+                run()
+                copy = DB(os.path.join(tmp, "add_order.db"), readonly=True)
+                self.assertEqual(copy.conn.execute(count).fetchone()[0], 100 + bench.ADD_ORDERS)
+                copy.close()
+                reset()
+            self.assertEqual(db.conn.execute(count).fetchone()[0], 100)
+            copy = DB(os.path.join(tmp, "add_order.db"), readonly=True)
+            self.assertEqual(copy.conn.execute(count).fetchone()[0], 100)
+            copy.close()
+            db.close()
+
+    def test_memory_reference(self):
+        # эталон с __dict__ собирает те же заказы, что и get_orders на __slots__
+        db = DB(":memory:")
+        datagen.generate(db, 200, n_clients=20, n_products=10, items_per_order=(1, 3))
+        orders, reference = db.get_orders(), bench.get_orders_dict(db)
+        self.assertEqual([(o.id, o.client.id, o.created_at, round(o.total(), 2)) for o in orders],
+                         [(o._id, o.client._id, o._created_at, round(o.total(), 2)) for o in reference])
+        self.assertFalse(hasattr(orders[0], "__dict__"))
+        self.assertTrue(hasattr(reference[0], "__dict__"))
+        db.close()
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.json")
+            argv = ["bench", "suite", "100", "--case", "get_clients_name", "--repeat", "1"]
+            self.assertEqual(cli.main(argv + ["--json", path]), 0)
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(len(json.load(f)["results"]), 1)
+            self.assertEqual(cli.main(argv + ["--baseline", path, "--threshold", "1000"]), 0)
+
+            db_path = os.path.join(tmp, "generated.db")
+            self.assertEqual(cli.main(["generate", "300", "--clients", "30", "--items", "1", "2", "--db", db_path]), 0)
+            db = DB(db_path)
+            self.assertEqual(db.get_order_frame().order_count, 300)
+            db.close()
+
+
+class TestPagedTreeview(unittest.TestCase):
+    def setUp(self):
+        import tkinter as tk
+        try:
+            self.root = tk.Tk()
+        except tk.TclError:
+            self.skipTest("нет дисплея")
+        self.db = DB(":memory:")
+        self.fetches = []
+
+    def tearDown(self):
+        self.root.destroy()
+        self.db.close()
+
+    def fetch(self, after, limit, since=None):
+        self.fetches.append(since)
+        clients, next_after = self.db.get_clients_page(after=after, limit=limit, since=since)
+        return [(c.id, (c.id, c.name)) for c in clients], next_after
+
+    def test_refresh_adds_only_new_rows(self):
+        from widgets import PagedTreeview
+        for i in range(3):
+            self.db.add_client(Client(name=f"Клиент {i}", email=f"c{i}@google.com", phone="+70000000000"))
+        tree = PagedTreeview(self.root, self.fetch, page_size=10, columns=("id", "name"))
+        tree.reload()
+        first = tree.get_children()
+        client = self.db.add_client(Client(name="Новый", email="new@google.com", phone="+70000000000"))
+        tree.refresh()
+        self.assertEqual(tree.get_children()[:3], first)  # прежние строки не пересоздаются
+        self.assertEqual(tree.item(tree.get_children()[-1], "values")[1], "Новый")
+        self.assertEqual(self.fetches, [None, 3])
+        self.assertEqual(tree.high_water, client.id)
+
+    def test_refresh_places_backdated_orders(self):
+        from widgets import PagedTreeview
+        client = self.db.add_client(Client(name="Клиент", email="c@google.com", phone="+70000000000"))
+        fish = self.db.add_product(Product(name="Рыба", price=100))
+
+        def add(day):
+            return self.db.add_order(Order(client=client, items=[OrderItem(fish, 1)], created_at=datetime(2025, 8, day)))
+
+        def fetch(after, limit, since=None):
+            orders, next_after = self.db.get_orders_page(after=after, limit=limit, since=since)
+            return [(o.id, (o.id, o.created_at)) for o in orders], next_after
+
+        def dates():
+            return [int(tree.item(iid, "values")[1][8:10]) for iid in tree.get_children()]
+
+        for day in (10, 20, 30):
+            add(day)
+        tree = PagedTreeview(self.root, fetch, page_size=10, new_rows_at="top",
+                             sort_key=lambda iid, values: (values[1], int(iid)), columns=("id", "created_at"))
+        tree.reload()
+        new, backdated = add(25), add(15)  # импорт заказов задним числом: id больше, дата раньше
+        tree.refresh()
+        self.assertEqual(dates(), [30, 25, 20, 15, 10])
+        self.assertEqual(tree.high_water, backdated.id)
+
+        # заказ старше последней загруженной страницы не вставляется — он придёт при прокрутке
+        tree = PagedTreeview(self.root, fetch, page_size=2, new_rows_at="top",
+                             sort_key=lambda iid, values: (values[1], int(iid)), columns=("id", "created_at"))
+        tree.reload()
+        add(1)
+        tree.refresh()
+        self.assertEqual(dates(), [30, 25])
+        while tree._has_more:
+            tree.load_more()
+        self.assertEqual(dates(), [30, 25, 20, 15, 10, 1])
+
+
+class TestCLI(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "source.db")
+        db = DB(self.source)
+        client = db.add_client(Client(name="Макаров Макар", email="MMakarov@google.com", phone="+71234567890"))
+        fish = db.add_product(Product(name="Рыба", price=1200.00))
+        db.add_order(Order(client=client, items=[OrderItem(fish, 2)], created_at=datetime(2025, 8, 1)))
+        db.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def test_round_trip(self):
+        target = self.path("target.db")
+        for entity in ("clients", "products", "orders"):
+            self.assertEqual(cli.main(["export", entity, self.path(f"{entity}.jsonl.gz"), "--db", self.source]), 0)
+            self.assertEqual(cli.main(["import", entity, self.path(f"{entity}.jsonl.gz"), "--db", target,
+                                       "--chunk-size", "1", "--quiet"]), 0)
+        db = DB(target)
+        self.assertEqual([o.total() for o in db.get_orders()], [2400])
+        db.close()
+
+    def test_errors(self):
+        with open(self.path("clients.csv"), "w", encoding="utf-8") as f:
+            f.write("name,email,phone\n,nobody@google.com,+70000000000\n")
+        self.assertEqual(cli.main(["import", "clients", self.path("clients.csv"), "--db", self.source, "--quiet"]), 1)
+        self.assertEqual(cli.main(["import", "clients", self.path("missing.csv"), "--db", self.source]), 1)
+
+    def test_no_tkinter(self):
+        _, modules = bench.import_profile("cli")
+        self.assertNotIn("tkinter", modules)
+
+
+class TestCharts(unittest.TestCase):
+    def setUp(self):
+        self.db = DB(":memory:")
+        self.client = self.db.add_client(Client(name="Макаров Макар", email="MMakarov@google.com", phone="+71234567890"))
+        self.fish = self.db.add_product(Product(name="Рыба", price=1200.00))
+        self.db.add_order(Order(client=self.client, items=[OrderItem(self.fish, 2)], created_at=datetime(2025, 8, 1)))
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_cache_follows_data_version(self):
+        cache = charts.ChartCache(self.db)
+        figure = cache.get("sales")
+        self.assertIs(cache.get("sales"), figure)
+        self.db.add_order(Order(client=self.client, items=[OrderItem(self.fish, 1)], created_at=datetime(2025, 8, 2)))
+        self.assertIsNot(cache.get("sales"), figure)
+        cache.invalidate()
+        self.assertIsNot(cache.get("sales"), figure)
+
+    def test_save_charts_headless(self):
+        import matplotlib.pyplot as plt
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = charts.save_charts(self.db, tmp, formats=("png", "svg"))
+            self.assertEqual(sorted(os.path.basename(p) for p in paths),
+                             sorted(f"{name}.{fmt}" for name in charts.CHARTS for fmt in ("png", "svg")))
+            self.assertTrue(all(os.path.getsize(p) > 0 for p in paths))
+            with open(os.path.join(tmp, "sales.png"), "rb") as f:
+                self.assertEqual(f.read(8), b"\x89PNG\r\n\x1a\n")
+        # графики не регистрируются в pyplot и не открывают окон
+        self.assertEqual(plt.get_fignums(), [])
+
+    def test_run_reports_in_processes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "shop.db")
+            db = DB(path)
+            client = db.add_client(Client(name="Макаров Макар", email="MMakarov@google.com", phone="+71234567890"))
+            fish = db.add_product(Product(name="Рыба", price=1200.00))
+            db.add_order(Order(client=client, items=[OrderItem(fish, 2)], created_at=datetime(2025, 8, 1)))
+            db.close()
+
+            reports = charts.run_reports(path, os.path.join(tmp, "out"), formats=("png", "svg"), workers=2)
+            self.assertEqual(set(reports), set(charts.CHARTS))
+            for name, paths in reports.items():
+                self.assertEqual([os.path.basename(p) for p in paths], [f"{name}.png", f"{name}.svg"])
+                self.assertTrue(all(os.path.getsize(p) > 0 for p in paths))
+
+    def test_readonly_db(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "shop.db")
+            DB(path).close()
+            db = DB(path, readonly=True)
+            try:
+                self.assertTrue(db.readonly)
+                self.assertEqual(db.get_clients(), [])
+                with self.assertRaises(sqlite3.OperationalError):
+                    db.add_client(Client(name="Макаров Макар", email="MMakarov@google.com", phone="+71234567890"))
+            finally:
+                db.close()
+        with self.assertRaises(ValueError):
+            DB(":memory:", readonly=True)
+
+
+class TestStartup(unittest.TestCase):
+    # Бюджеты холодного запуска, секунды: импорт gui (python -X importtime) и первое окно
+    IMPORT_BUDGET = 0.5
+    WINDOW_BUDGET = 3.0
+
+    def test_gui_import_is_light(self):
+        import_s, modules = bench.import_profile("gui")
+        self.assertEqual({name for name in modules if name.split(".")[0] in bench.HEAVY_MODULES}, set())
+        self.assertLess(import_s, self.IMPORT_BUDGET)
+
+    def test_time_to_first_window(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            try:
+                _, window_s = bench.startup_time(tmp)
+            except subprocess.CalledProcessError as e:
+                if "display" in e.stderr:
+                    self.skipTest("нет дисплея")
+                raise
+        self.assertLess(window_s, self.WINDOW_BUDGET)
+
+
+class TestConcurrency(unittest.TestCase):
+    def test_readers_and_writers(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DB(os.path.join(tmp, "shop.db"))
+            self.assertEqual(db.conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            client = db.add_client(Client(name="Макаров Макар", email="MMakarov@google.com", phone="+71234567890"))
+            product = db.add_product(Product(name="Рыба", price=1200.00))
+            errors = []
+            stop = threading.Event()
+
+            def reader():
+                try:
+                    while not stop.is_set():
+                        db.get_orders()
+                        db.get_clients_page(limit=50)
+                except Exception as e:
+                    errors.append(e)
+
+            def writer():
+                try:
+                    for _ in range(200):
+                        db.add_order(Order(client=client, items=[OrderItem(product, 1)]))
+                except Exception as e:
+                    errors.append(e)
+
+            readers = [threading.Thread(target=reader) for _ in range(4)]
+            writers = [threading.Thread(target=writer) for _ in range(2)]
+            for t in readers + writers:
+                t.start()
+            for t in writers:
+                t.join()
+            stop.set()
+            for t in readers:
+                t.join()
+
+            self.assertEqual(errors, [])
+            self.assertEqual(len(db.get_orders()), 400)
+            db.close()
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
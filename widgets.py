@@ -0,0 +1,225 @@
+import tkinter as tk
+from tkinter import ttk
+
+from db import PAGE_SIZE
+
+
+class PagedTreeview(ttk.Treeview):
+    """
+    Treeview, подгружающий строки страницами по мере прокрутки.
+
+    Сначала загружается одна страница, следующая — когда прокрутка подходит к концу
+    уже загруженных строк, поэтому первый экран отображается сразу при любом размере таблицы.
+
+    После добавления записей список не перезагружается: refresh() запрашивает только строки
+    с id выше наибольшего загруженного (high_water) и вставляет их в конец или, для списка
+    «новые сверху», на место по ключу сортировки: больший id не значит более поздней даты
+    (импорт заказов задним числом). Строки с уже показанным iid обновляются на месте.
+
+    Args:
+        master: родительский виджет; в него же помещается вертикальная полоса прокрутки.
+        fetch_page (callable): fetch_page(after, limit, since=None) -> (строки, ключ следующей страницы
+            или None), где строки — список пар (iid, values), iid — id записи; since — только id > since.
+        page_size (int): размер страницы.
+        new_rows_at (str): 'end' — список упорядочен по возрастанию id, новые строки в конце;
+            'top' — список упорядочен по убыванию sort_key (заказы, новые сверху).
+        sort_key (callable): sort_key(iid, values) — ключ порядка строк в режиме 'top', тот же,
+            что у fetch_page; по умолчанию id.
+        **kwargs: параметры ttk.Treeview.
+    """
+
+    # Доля прокрутки, после которой подгружается следующая страница
+    PREFETCH_AT = 0.9
+
+    def __init__(self, master, fetch_page, page_size=PAGE_SIZE, new_rows_at="end", sort_key=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.fetch_page = fetch_page
+        self.page_size = page_size
+        self.new_rows_at = new_rows_at
+        self.sort_key = sort_key or (lambda iid, values: int(iid))
+        self.high_water = 0
+        self._keys = {}  # iid -> sort_key показанных строк
+        self.scrollbar = ttk.Scrollbar(master, orient=tk.VERTICAL, command=self.yview)
+        self.configure(yscrollcommand=self._on_scroll)
+        self._next_after = None
+        self._has_more = False
+        self._loading = False
+
+    def pack(self, **kwargs):
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        super().pack(**kwargs)
+
+    def reload(self):
+        """Очистка списка и загрузка первой страницы."""
+        self.delete(*self.get_children())
+        self.high_water = 0
+        self._keys.clear()
+        self._next_after = None
+        self._has_more = True
+        self.load_more()
+
+    def load_more(self):
+        """Загрузка следующей страницы, если она есть."""
+        if not self._has_more or self._loading:
+            return
+        self._loading = True
+        try:
+            rows, self._next_after = self.fetch_page(self._next_after, self.page_size)
+            self.upsert(rows)
+            self._has_more = self._next_after is not None
+        finally:
+            self._loading = False
+
+    def show_first_page(self, rows, next_after):
+        """Замена содержимого первой страницей, загруженной заранее (например, в фоновом потоке)."""
+        self.delete(*self.get_children())
+        self.high_water = 0
+        self._keys.clear()
+        self.upsert(rows)
+        self._next_after = next_after
+        self._has_more = next_after is not None
+
+    def refresh(self):
+        """Показ записей, добавленных после последней загрузки, без перезагрузки списка."""
+        if self._loading:
+            return
+        if self.new_rows_at == "end" and self._has_more:
+            return  # новые строки в конце списка придут с очередными страницами
+        if self.new_rows_at == "top" and not self.high_water:
+            self.reload()  # список пуст: первая страница по индексу дешевле выборки всех id > 0
+            return
+        rows, next_after = self.fetch_page(None, self.page_size, since=self.high_water)
+        if self.new_rows_at == "end":
+            self.upsert(rows)
+            self._next_after, self._has_more = next_after, next_after is not None
+        elif next_after is not None:
+            self.reload()  # новых записей больше страницы — проще загрузить список заново
+        else:
+            self._place(rows)
+
+    def upsert(self, rows, index="end"):
+        """
+        Вставка строк (iid, values) начиная с позиции index; строки с уже показанным iid
+        обновляются на месте.
+        """
+        for iid, values in rows:
+            if self.exists(iid):
+                self.item(iid, values=values)
+                continue
+            self.insert("", index, iid=iid, values=values)
+            self._keys[str(iid)] = self.sort_key(iid, values)
+            if index != "end":
+                index += 1
+            self.high_water = max(self.high_water, int(iid))
+
+    def _place(self, rows):
+        """
+        Новые строки списка 'top' — на места по убыванию sort_key. Строка старше последней
+        загруженной не вставляется: она придёт со следующей страницей (keyset по тому же ключу).
+        """
+        keys = [self._keys[iid] for iid in self.get_children()]
+        for iid, values in rows:
+            self.high_water = max(self.high_water, int(iid))
+            if self.exists(iid):
+                self.item(iid, values=values)
+                continue
+            key = self.sort_key(iid, values)
+            # первая показанная строка с ключом меньше нового (ключи по убыванию)
+            low, high = 0, len(keys)
+            while low < high:
+                middle = (low + high) // 2
+                if keys[middle] < key:
+                    high = middle
+                else:
+                    low = middle + 1
+            if low == len(keys) and self._has_more:
+                continue
+            self.insert("", low, iid=iid, values=values)
+            self._keys[str(iid)] = key
+            keys.insert(low, key)
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self._has_more and float(last) >= self.PREFETCH_AT:
+            # видимая область почти (или ещё не) заполнена — догружаем после отрисовки
+            self.after_idle(self.load_more)
+
+
+class SearchCombobox(ttk.Combobox):
+    """
+    Поле выбора записи с автодополнением.
+
+    Выпадающий список не содержит всю таблицу: при вводе (после паузы delay мс) в него
+    подставляются результаты search(text) — поиска по индексу базы с ограничением числа строк.
+    Выбранная запись доступна как selected (объект) и selected_id, без разбора текста строки.
+
+    Args:
+        master: родительский виджет.
+        search (callable): search(text) -> список объектов с атрибутом id.
+        label (callable): текст строки списка для объекта.
+        delay (int): пауза после последнего нажатия клавиши, мс.
+        **kwargs: параметры ttk.Combobox.
+    """
+
+    DELAY_MS = 200
+    # Клавиши, которые не меняют текст и не запускают поиск
+    NAVIGATION_KEYS = ("Up", "Down", "Left", "Right", "Return", "Escape", "Tab", "Shift_L", "Shift_R")
+
+    def __init__(self, master, search, label=str, delay=DELAY_MS, **kwargs):
+        super().__init__(master, postcommand=self._before_post, **kwargs)
+        self.search = search
+        self.label = label
+        self.delay = delay
+        self.selected = None
+        self._items = []
+        self._timer = None
+        self.bind("<KeyRelease>", self._on_key)
+        self.bind("<Return>", self._on_return)
+        self.bind("<<ComboboxSelected>>", self._on_select)
+
+    @property
+    def selected_id(self):
+        return self.selected.id if self.selected is not None else None
+
+    def update_choices(self):
+        """Результаты поиска по введённому тексту — в выпадающий список."""
+        if self._timer is not None:
+            self.after_cancel(self._timer)
+            self._timer = None
+        self._items = self.search(self.get().strip())
+        self["values"] = [self.label(item) for item in self._items]
+
+    def choose(self, item):
+        """Выбор записи программно (например, только что созданной)."""
+        self._items = [item]
+        self["values"] = [self.label(item)]
+        self.current(0)
+        self.selected = item
+
+    def clear(self):
+        self.set("")
+        self.selected = None
+        self._items = []
+        self["values"] = []
+
+    def _on_key(self, event):
+        if event.keysym in self.NAVIGATION_KEYS:
+            return
+        self.selected = None  # текст изменён — прежний выбор больше не действует
+        if self._timer is not None:
+            self.after_cancel(self._timer)
+        self._timer = self.after(self.delay, self.update_choices)
+
+    def _on_return(self, event):
+        # Enter выбирает запись, если введённый текст однозначно её определяет
+        self.update_choices()
+        if len(self._items) == 1:
+            self.choose(self._items[0])
+
+    def _before_post(self):
+        if self._timer is not None or not self._items:
+            self.update_choices()
+
+    def _on_select(self, event):
+        index = self.current()
+        self.selected = self._items[index] if 0 <= index < len(self._items) else None